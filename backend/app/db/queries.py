@@ -1,6 +1,5 @@
 import os
 from PIL import Image
-import json
 from datetime import datetime
 from typing import Dict, List, Optional, Any, Tuple
 import uuid
@@ -17,11 +16,13 @@ from dotenv import load_dotenv
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from db.supabase_client import supabase
-from google.cloud import storage
-from google.oauth2 import service_account
 from tools.logger import logger
+from tools.timing import timed_methods
+from tools.resources import resources
 
 
+# Every public query is timed as a "supabase.<method>" span
+@timed_methods("supabase")
 class SupabaseQueries:
     def __init__(self):
         """Initialize the Supabase client"""
@@ -30,12 +31,9 @@ class SupabaseQueries:
         self.SUPABASE_KEY = os.getenv("SUPABASE_KEY")
         self.BUCKET_NAME = os.getenv("BUCKET_NAME")
 
-        credentials = service_account.Credentials.from_service_account_info(
-            json.loads(os.getenv("GC_CREDENTIAL"))
-        )
-
-        self.client = storage.Client(credentials=credentials)
-        self.bucket = self.client.bucket(self.BUCKET_NAME)
+        # Storage client and bucket are built once per process and shared
+        self.client = resources.storage_client
+        self.bucket = resources.storage_bucket
         self.gcp_container_name = "images"
 
     def get_category_id(self, category_name: str) -> Optional[str]:
@@ -423,6 +421,90 @@ class SupabaseQueries:
 
         raise ValueError(f"Post with ID {post_id} not found.")
 
+    def get_posts_date_and_caption(self, post_ids: List[str]) -> Dict[str, tuple]:
+        """
+        Get the posting date and caption for several posts in one query.
+
+        Args:
+            post_ids (List[uuid]): IDs of the posts
+
+        Returns:
+            Dict mapping post id to (posted_date, caption); missing posts are omitted
+        """
+        if not post_ids:
+            return {}
+        response = (
+            self.supabase.table("posts")
+            .select("id", "posted", "caption")
+            .in_("id", post_ids)
+            .execute()
+        )
+        return {
+            post["id"]: (post["posted"], post["caption"])
+            for post in response.data or []
+        }
+
+    def get_unparsed_posts(self, club_id: str) -> Dict[str, tuple]:
+        """
+        Get the posting date and caption of every unparsed post of a club.
+
+        Args:
+            club_id (uuid): ID of the club
+
+        Returns:
+            Dict mapping post id to (posted_date, caption)
+        """
+        response = (
+            self.supabase.table("posts")
+            .select("id", "posted", "caption")
+            .eq("club_id", club_id)
+            .eq("parsed", False)
+            .execute()
+        )
+        return {
+            post["id"]: (post["posted"], post["caption"])
+            for post in response.data or []
+        }
+
+    def insert_events(self, events: List[dict]) -> List[dict]:
+        """
+        Insert several events in one request.
+
+        Args:
+            events (List[dict]): Event rows, as for insert_event
+
+        Returns:
+            The inserted event data
+        """
+        if not events:
+            return []
+        response = self.supabase.from_("events").insert(events).execute()
+
+        return response.data or []
+
+    def mark_posts_parsed(
+        self, post_ids: List[str], llm_event_counts: Optional[Dict[str, int]] = None
+    ) -> None:
+        """
+        Set parsed=True on several posts, one request per distinct event count.
+
+        Args:
+            post_ids (List[uuid]): IDs of the posts
+            llm_event_counts: Events the LLM returned per post id; None (or a
+                missing id) leaves llm_event_count NULL
+        """
+        if not post_ids:
+            return
+        groups = {}
+        for post_id in post_ids:
+            count = (llm_event_counts or {}).get(post_id)
+            groups.setdefault(count, []).append(post_id)
+        for count, ids in groups.items():
+            values = {"parsed": True}
+            if count is not None:
+                values["llm_event_count"] = count
+            self.supabase.from_("posts").update(values).in_("id", ids).execute()
+
     def insert_event(self, event_data: dict):
         """
         Insert a new event into the events table.
@@ -476,17 +558,71 @@ class SupabaseQueries:
             return response.data[0]["ics_content"]
         return None
 
-    def save_calendar_file(self, club_id: str, ics_content: str) -> str:
+    def get_calendar_file_hashes(self, club_id: str) -> Optional[Dict]:
+        """
+        Get the change-tracking hashes of a club's calendar file
+
+        Args:
+            club_id (str): The UUID of the club
+
+        Returns:
+            Optional[Dict]: id, events_hash and content_hash, or None if the
+            club has no calendar file or the lookup failed
+        """
+        try:
+            response = (
+                self.supabase.from_("calendar_files")
+                .select("id, events_hash, content_hash")
+                .eq("club_id", club_id)
+                .limit(1)
+                .execute()
+            )
+        except Exception as e:
+            logger.error(f"Error fetching calendar hashes for club {club_id}: {e}")
+            return None
+
+        return response.data[0] if response.data else None
+
+    def update_calendar_file_hashes(
+        self, calendar_id: str, events_hash: str, content_hash: str
+    ) -> None:
+        """
+        Record new hashes for a calendar file without rewriting its content
+
+        Args:
+            calendar_id (str): The UUID of the calendar file
+            events_hash (str): Hash of the events it was built from
+            content_hash (str): Hash of its ICS content
+        """
+        self.supabase.from_("calendar_files").update(
+            {"events_hash": events_hash, "content_hash": content_hash}
+        ).eq("id", calendar_id).execute()
+
+    def save_calendar_file(
+        self,
+        club_id: str,
+        ics_content: str,
+        events_hash: Optional[str] = None,
+        content_hash: Optional[str] = None,
+    ) -> str:
         """
         Save the ICS content to the database
 
         Args:
             club_id (str): The UUID of the club
             ics_content (str): The ICS content to save
+            events_hash (str): Hash of the events the content was built from
+            content_hash (str): Hash of the content
 
         Returns:
             str: The UUID of the saved calendar file
         """
+        calendar_data = {"ics_content": ics_content}
+        if events_hash:
+            calendar_data["events_hash"] = events_hash
+        if content_hash:
+            calendar_data["content_hash"] = content_hash
+
         # Check if a calendar file already exists for this club
         existing_response = (
             self.supabase.from_("calendar_files")
@@ -501,7 +637,7 @@ class SupabaseQueries:
             calendar_id = existing_response.data[0]["id"]
             response = (
                 self.supabase.from_("calendar_files")
-                .update({"ics_content": ics_content})
+                .update(calendar_data)
                 .eq("id", calendar_id)
                 .execute()
             )
@@ -511,7 +647,7 @@ class SupabaseQueries:
             # Insert new record
             response = (
                 self.supabase.from_("calendar_files")
-                .insert({"club_id": club_id, "ics_content": ics_content})
+                .insert({"club_id": club_id, **calendar_data})
                 .execute()
             )
 
@@ -522,6 +658,25 @@ class SupabaseQueries:
                 logger.error(f"Failed to create calendar file for club {club_id}")
                 raise Exception(f"Failed to create calendar file for club {club_id}")
 
+    def get_calendar_events(self, club_id: str) -> List[Dict]:
+        """
+        Get the event fields a club's calendar is built from
+
+        Args:
+            club_id (str): The UUID of the club
+
+        Returns:
+            List[Dict]: id, name, date, details, duration and created_at per event
+        """
+        response = (
+            self.supabase.from_("events")
+            .select("id, name, date, details, duration, created_at")
+            .eq("club_id", club_id)
+            .execute()
+        )
+
+        return response.data if response.data else []
+
     def get_events_for_club(self, club_id: str) -> List[Dict]:
         """
         Get all events for a club from the events table
@@ -530,20 +685,103 @@ class SupabaseQueries:
             club_id (str): The UUID of the club
 
         Returns:
-            List[Dict]: List of event records
+            List[Dict]: List of event records, without name_embedding
         """
         response = (
-            self.supabase.from_("events").select("*").eq("club_id", club_id).execute()
+            self.supabase.from_("events")
+            .select(
+                "id, club_id, post_id, name, date, details, duration, parsed, "
+                "canonical_event_id, created_at"
+            )
+            .eq("club_id", club_id)
+            .execute()
         )
 
         return response.data if response.data else []
 
+    def get_events_for_dedup(
+        self, club_id: str, since: Optional[datetime] = None
+    ) -> List[Dict]:
+        """
+        Get the fields duplicate detection needs for a club's events, paged
+
+        Args:
+            club_id (str): The UUID of the club
+            since: Only events with a date at or after this; None for all
+
+        Returns:
+            List[Dict]: id, name, date, details and name_embedding per event
+        """
+        events, page_size = [], 1000
+        while True:
+            query = (
+                self.supabase.from_("events")
+                .select("id, name, date, details, name_embedding")
+                .eq("club_id", club_id)
+            )
+            if since:
+                query = query.gte("date", since.isoformat())
+            response = (
+                query.order("id")
+                .range(len(events), len(events) + page_size - 1)
+                .execute()
+            )
+            page = response.data or []
+            events.extend(page)
+            if len(page) < page_size:
+                return events
+
+    def get_events_for_clustering(self, since: datetime) -> List[Dict]:
+        """
+        Get the fields cross-club clustering needs for events starting after a date
+
+        Args:
+            since: Only events with a date after this
+
+        Returns:
+            List[Dict]: id, club_id, name, details, date, created_at and
+            canonical_event_id per event
+        """
+        events, page_size = [], 1000
+        while True:
+            response = (
+                self.supabase.from_("events")
+                .select(
+                    "id, club_id, name, details, date, created_at, canonical_event_id"
+                )
+                .gte("date", since.isoformat())
+                .order("id")
+                .range(len(events), len(events) + page_size - 1)
+                .execute()
+            )
+            page = response.data or []
+            events.extend(page)
+            if len(page) < page_size:
+                return events
+
+    def set_canonical_event(
+        self, event_ids: List[str], canonical_event_id: Optional[str]
+    ) -> None:
+        """
+        Link events to a canonical event, or mark them canonical with None
+
+        Args:
+            event_ids: Events to update
+            canonical_event_id: Event they duplicate, or None
+        """
+        if not event_ids:
+            return
+        self.supabase.from_("events").update(
+            {"canonical_event_id": canonical_event_id}
+        ).in_("id", list(event_ids)).execute()
+
     def get_all_campus_events(
         self,
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
         limit: int = 100,
         offset: int = 0,
+        dedupe: bool = False,
     ) -> List[Dict]:
         """
         Get all events from all clubs campus-wide with pagination and date filtering
@@ -553,15 +791,20 @@ class SupabaseQueries:
             end_date: Filter events before this date
             limit: Maximum number of events to return (use very high number for all)
             offset: Pagination offset
+            dedupe: Return one row per co-hosted event cluster (its canonical
+                event), with the other hosting clubs under "cohosts"
 
         Returns:
             List[Dict]: List of event records with club information
         """
         cdn_prefix = os.getenv("GCP_URL", "")
 
-        # Fetch events with club info in a single efficient query
+        # Fetch events with club info in a single efficient query; name_embedding
+        # (1,536 floats per row) is left out of the response
         query = self.supabase.from_("events").select(
-            "*, clubs(id, name, instagram_handle, profile_image_path)"
+            "id, club_id, post_id, name, date, details, duration, parsed, "
+            "canonical_event_id, created_at, "
+            "clubs(id, name, instagram_handle, profile_image_path)"
         )
 
         # Apply date filters at database level for efficiency
@@ -569,6 +812,8 @@ class SupabaseQueries:
             query = query.gte("date", start_date.isoformat())
         if end_date:
             query = query.lte("date", end_date.isoformat())
+        if dedupe:
+            query = query.is_("canonical_event_id", "null")
 
         # Order by date (upcoming events first)
         query = query.order("date", desc=False)
@@ -598,8 +843,49 @@ class SupabaseQueries:
                 image_path = event["clubs"]["profile_image_path"]
                 event["clubs"]["profile_image_path"] = f"{cdn_prefix}/{image_path.lstrip('/')}"
 
+        if dedupe and events:
+            cohosts = self.get_event_cohosts([event["id"] for event in events])
+            for event in events:
+                event["cohosts"] = cohosts.get(event["id"], [])
+
         return events
 
+    def get_event_cohosts(self, canonical_ids: List[str]) -> Dict[str, List[Dict]]:
+        """
+        Clubs whose events were linked to each of the given canonical events
+
+        Args:
+            canonical_ids: Canonical event IDs
+
+        Returns:
+            Dict mapping canonical event id to a list of club records
+        """
+        cdn_prefix = os.getenv("GCP_URL", "")
+        rows = []
+        # Ids go in the URL, so query in chunks to stay under request size limits
+        for start in range(0, len(canonical_ids), 200):
+            response = (
+                self.supabase.from_("events")
+                .select(
+                    "canonical_event_id, clubs(id, name, instagram_handle, profile_image_path)"
+                )
+                .in_("canonical_event_id", canonical_ids[start : start + 200])
+                .execute()
+            )
+            rows.extend(response.data or [])
+
+        cohosts = {}
+        for row in rows:
+            club = row.get("clubs")
+            if not club:
+                continue
+            if club.get("profile_image_path"):
+                club["profile_image_path"] = (
+                    f"{cdn_prefix}/{club['profile_image_path'].lstrip('/')}"
+                )
+            cohosts.setdefault(row["canonical_event_id"], []).append(club)
+        return cohosts
+
     def check_if_post_is_scrapped(self, post_id: str) -> bool:
         """Check if a post has already been scrapped"""
         response = (
@@ -896,6 +1182,78 @@ class SupabaseQueries:
 
             return {"clubs": clubs, "total": total_count}
 
+    def get_clubs_by_ids(self, club_ids: List[str]) -> List[Dict]:
+        """Fetch one page of clubs by id, in the order given"""
+        if not club_ids:
+            return []
+        cdn_prefix = os.getenv("GCP_URL", "")
+
+        response = (
+            self.supabase.table("clubs")
+            .select(
+                "id, name, instagram_handle, profile_image_path, description, categories(name)"
+            )
+            .in_("id", club_ids)
+            .execute()
+        )
+        by_id = {club["id"]: club for club in response.data or []}
+        clubs = [by_id[club_id] for club_id in club_ids if club_id in by_id]
+
+        for club in clubs:
+            image_path = club.get("profile_image_path")
+            if image_path:
+                club["profile_image_path"] = f"{cdn_prefix}/{image_path.lstrip('/')}"
+
+        return clubs
+
+    def hybrid_search_page(
+        self,
+        query: str,
+        query_embedding: List[float],
+        offset: int,
+        limit: int,
+        category: Optional[str] = None,
+        semantic_weight: float = 0.5,
+        match_threshold: float = 0.5,
+    ) -> Optional[Dict]:
+        """
+        Hybrid search ranked, filtered and paginated in the database
+
+        Returns:
+            Optional[Dict]: {"clubs": [...], "total": int}, or None if the
+            hybrid_search_page RPC is unavailable
+        """
+        cdn_prefix = os.getenv("GCP_URL", "")
+
+        try:
+            response = self.supabase.rpc(
+                "hybrid_search_page",
+                {
+                    "query_text": query,
+                    "query_embedding": query_embedding,
+                    "match_threshold": match_threshold,
+                    "fulltext_weight": 1 - semantic_weight,
+                    "semantic_weight": semantic_weight,
+                    "filter_category": category,
+                    "page_offset": offset,
+                    "page_limit": limit,
+                },
+            ).execute()
+        except Exception as e:
+            logger.warning(f"hybrid_search_page RPC failed: {str(e)}")
+            return None
+
+        clubs = response.data if response.data else []
+        # Every row carries the total match count from a window function
+        total_count = clubs[0].pop("total_count", len(clubs)) if clubs else 0
+        for club in clubs:
+            club.pop("total_count", None)
+            image_path = club.get("profile_image_path")
+            if image_path:
+                club["profile_image_path"] = f"{cdn_prefix}/{image_path.lstrip('/')}"
+
+        return {"clubs": clubs, "total": total_count}
+
     def get_club_manifest_optimized(
         self, category: Optional[str], limit: int, select_fields: str
     ) -> List[Dict]:
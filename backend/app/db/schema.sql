@@ -38,5 +38,96 @@ CREATE TABLE events (
   details TEXT,
   duration INTERVAL,
   parsed JSONB, -- AI-enhanced event data, pulled from the post
+  name_embedding VECTOR(1536), -- text-embedding-3-small of the name, used for dedup
+  canonical_event_id UUID REFERENCES events(id) ON DELETE SET NULL, -- set on co-hosted duplicates
   created_at TIMESTAMP DEFAULT now()
 );
+
+-- Existing databases: ALTER TABLE events ADD COLUMN IF NOT EXISTS name_embedding VECTOR(1536);
+
+-- Co-hosted events: duplicates posted by other clubs point at the canonical event (NULL = canonical)
+-- ALTER TABLE events ADD COLUMN IF NOT EXISTS canonical_event_id UUID REFERENCES events(id) ON DELETE SET NULL;
+-- CREATE INDEX IF NOT EXISTS events_canonical_event_id_idx ON events (canonical_event_id);
+
+-- Events the LLM returned for each post, before dedup (NULL = never sent to the
+-- LLM, e.g. skipped by the event prefilter); scripts/train_event_prefilter.py labels
+-- ALTER TABLE posts ADD COLUMN IF NOT EXISTS llm_event_count INTEGER;
+
+-- Club embedding change detection: hash of the exact text last embedded
+-- ALTER TABLE clubs ADD COLUMN IF NOT EXISTS embedding_text_hash TEXT;
+
+-- Embeddings of club text segments, shared by content hash so unchanged
+-- segments are never re-embedded (see scripts/populate_embeds.py)
+CREATE TABLE embedding_segments (
+  hash TEXT PRIMARY KEY, -- sha256 of model name and segment text
+  embedding VECTOR(1536) NOT NULL,
+  created_at TIMESTAMP DEFAULT now()
+);
+
+-- Hybrid search ranked, category-filtered and paginated in the database.
+-- Used by /hybrid-search while the in-process vector index is loading.
+CREATE OR REPLACE FUNCTION hybrid_search_page(
+  query_text TEXT,
+  query_embedding VECTOR(1536),
+  match_threshold FLOAT,
+  fulltext_weight FLOAT,
+  semantic_weight FLOAT,
+  filter_category TEXT DEFAULT NULL,
+  page_offset INT DEFAULT 0,
+  page_limit INT DEFAULT 20
+)
+RETURNS TABLE (
+  id UUID,
+  name TEXT,
+  instagram_handle TEXT,
+  profile_image_path TEXT,
+  description TEXT,
+  categories JSONB,
+  score FLOAT,
+  total_count BIGINT
+)
+LANGUAGE sql STABLE AS $$
+  WITH scored AS (
+    SELECT
+      c.id,
+      ts_rank(c.search_vector, plainto_tsquery('english', query_text)) AS text_score,
+      1 - (c.embedding <=> query_embedding) AS semantic_score
+    FROM clubs c
+    WHERE c.embedding IS NOT NULL
+      AND (
+        filter_category IS NULL
+        OR EXISTS (
+          SELECT 1 FROM clubs_categories cc
+          JOIN categories cat ON cat.id = cc.category_id
+          WHERE cc.club_id = c.id AND cat.name = filter_category
+        )
+      )
+  ),
+  matched AS (
+    SELECT id, fulltext_weight * text_score + semantic_weight * semantic_score AS score
+    FROM scored
+    WHERE semantic_score >= match_threshold OR text_score > 0
+  ),
+  ranked AS (
+    SELECT id, score, count(*) OVER () AS total_count
+    FROM matched
+    ORDER BY score DESC
+    OFFSET page_offset LIMIT page_limit
+  )
+  SELECT
+    c.id, c.name, c.instagram_handle, c.profile_image_path, c.description,
+    COALESCE(
+      (SELECT jsonb_agg(jsonb_build_object('name', cat.name))
+       FROM clubs_categories cc JOIN categories cat ON cat.id = cc.category_id
+       WHERE cc.club_id = c.id),
+      '[]'::jsonb
+    ) AS categories,
+    r.score,
+    r.total_count
+  FROM ranked r JOIN clubs c ON c.id = r.id
+  ORDER BY r.score DESC;
+$$;
+
+-- Calendar change tracking: skip rebuilding/rewriting a club's ICS file when nothing changed
+-- ALTER TABLE calendar_files ADD COLUMN IF NOT EXISTS events_hash TEXT;
+-- ALTER TABLE calendar_files ADD COLUMN IF NOT EXISTS content_hash TEXT;
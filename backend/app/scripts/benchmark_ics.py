@@ -0,0 +1,95 @@
+import os
+import sys
+import time
+import random
+import argparse
+import datetime
+
+import pytz
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from tools.ics_writer import parse_duration_string, write_calendar
+
+TIMEZONE = pytz.timezone("America/Los_Angeles")
+
+
+def make_event(i: int) -> dict:
+    """An event row as returned by get_calendar_events"""
+    start = datetime.datetime(2025, 1, 1) + datetime.timedelta(
+        hours=random.randint(0, 24 * 365)
+    )
+    return {
+        "id": f"00000000-0000-4000-8000-{i:012d}",
+        "name": random.choice(
+            ["General Body Meeting", "Boba Social, Round 2", "Resume Workshop"]
+        )
+        + f" #{i}",
+        "date": start.isoformat(),
+        "details": "Join us for snacks; bring a friend!\n" * random.randint(0, 4),
+        "duration": random.choice(["01:00:00", "02:30:00", "1 day 00:00:00", None]),
+        "created_at": "2024-12-01T12:00:00",
+    }
+
+
+def build_with_ics(events: list) -> str:
+    """The previous implementation: ics.Event objects and str(Calendar)"""
+    from ics import Calendar, Event
+
+    calendar = Calendar()
+    for row in events:
+        event = Event()
+        event.name = row["name"]
+        event.begin = TIMEZONE.localize(datetime.datetime.fromisoformat(row["date"]))
+        event.duration = parse_duration_string(row["duration"])
+        if row["details"]:
+            event.description = row["details"]
+        event.uid = f"{row['id']}@instinct"
+        calendar.events.add(event)
+    return calendar.serialize()
+
+
+def build_with_writer(events: list) -> str:
+    return write_calendar(events, TIMEZONE)
+
+
+def bench(build, events: list, rounds: int) -> dict:
+    """Best-of-rounds wall time and output size for one implementation"""
+    best, output = float("inf"), ""
+    for _ in range(rounds):
+        start = time.perf_counter()
+        output = build(events)
+        best = min(best, time.perf_counter() - start)
+    return {"seconds": best, "bytes": len(output.encode("utf-8"))}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the ics library with the streaming ICS writer"
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[10, 1000, 50000],
+        help="Calendar sizes in events",
+    )
+    parser.add_argument("--rounds", type=int, default=3, help="Runs per size")
+    args = parser.parse_args()
+
+    random.seed(42)
+    print(
+        f"{'events':>8}  {'ics lib':>10}  {'writer':>10}  {'speedup':>8}  {'ics KB':>8}  {'writer KB':>9}"
+    )
+    for size in args.sizes:
+        events = [make_event(i) for i in range(size)]
+        rounds = args.rounds if size <= 1000 else 1
+        old = bench(build_with_ics, events, rounds)
+        new = bench(build_with_writer, events, rounds)
+        print(
+            f"{size:>8}  {old['seconds'] * 1000:>8.1f}ms  {new['seconds'] * 1000:>8.1f}ms  "
+            f"{old['seconds'] / new['seconds']:>7.1f}x  {old['bytes'] / 1024:>8.0f}  {new['bytes'] / 1024:>9.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import multiprocessing
+
+import redis
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def make_queue(redis_url=None):
+    """Build a RedisScraperQueue on a real Redis or an in-process fakeredis"""
+    from tools.redis_queue import RedisScraperQueue
+
+    if redis_url:
+        return RedisScraperQueue(redis.from_url(redis_url))
+
+    import fakeredis
+
+    return RedisScraperQueue(fakeredis.FakeRedis())
+
+
+def quiet_logging():
+    """Silence per-job queue logging and detach the Redis log handler"""
+    from tools.logger import RedisLogHandler
+
+    root = logging.getLogger()
+    root.setLevel(logging.ERROR)
+    for handler in root.handlers[:]:
+        if isinstance(handler, RedisLogHandler):
+            root.removeHandler(handler)
+
+
+def timed(name, ops, func, *args):
+    """Run func once and return a result row"""
+    start = time.perf_counter()
+    value = func(*args)
+    seconds = time.perf_counter() - start
+    return {
+        "scenario": name,
+        "ops": ops,
+        "seconds": seconds,
+        "ops_per_sec": ops / seconds if seconds else 0.0,
+        "result": value,
+    }
+
+
+def bench_enqueue_dequeue(queue, jobs):
+    """Enqueue and then drain jobs through the event queue"""
+    from tools.redis_queue import QueueType
+
+    # The event queue has no per-hour rate limit, so draining measures the queue itself
+    queue.redis.flushdb()
+
+    def enqueue():
+        for i in range(jobs):
+            queue.enqueue_job(
+                QueueType.EVENT, {"instagram_handle": f"club_{i}"}, i % 10
+            )
+
+    def dequeue():
+        count = 0
+        while True:
+            job = queue.get_next_job(QueueType.EVENT)
+            if not job:
+                return count
+            queue.mark_job_complete(QueueType.EVENT, job["instagram_handle"])
+            count += 1
+
+    return [
+        timed("enqueue_job", jobs, enqueue),
+        timed("get_next_job + mark_job_complete", jobs, dequeue),
+    ]
+
+
+def bench_queue_status(queue, jobs, rounds=20):
+    """get_queue_status with a full queue and a busy processing hash"""
+    from tools.redis_queue import QueueType
+    from tools import serialization
+
+    queue.redis.flushdb()
+    pipe = queue.redis.pipeline()
+    now = time.time()
+    for i in range(jobs):
+        job = {"instagram_handle": f"club_{i}", "enqueued_at": now, "attempts": 0}
+        pipe.zadd("scraper:queue", {serialization.dumps(job): 0})
+        if i % 10 == 0:
+            job["processing_started"] = now
+            pipe.hset(
+                "scraper:processing", job["instagram_handle"], serialization.dumps(job)
+            )
+    pipe.execute()
+
+    def status():
+        for _ in range(rounds):
+            stats = queue.get_queue_status(QueueType.SCRAPER)
+        return stats.get("queue_count")
+
+    return [timed(f"get_queue_status @ {jobs} jobs", rounds, status)]
+
+
+def bench_requeue_stalled(queue, jobs):
+    """requeue_stalled_jobs with every processing job stalled"""
+    from tools.redis_queue import QueueType
+    from tools import serialization
+
+    queue.redis.flushdb()
+    pipe = queue.redis.pipeline()
+    stalled_at = time.time() - 7200
+    for i in range(jobs):
+        job = {
+            "instagram_handle": f"club_{i}",
+            "enqueued_at": stalled_at,
+            "attempts": 1,
+            "processing_started": stalled_at,
+        }
+        pipe.hset("event:processing", job["instagram_handle"], serialization.dumps(job))
+    pipe.execute()
+
+    return [
+        timed(
+            f"requeue_stalled_jobs @ {jobs} stalled",
+            jobs,
+            queue.requeue_stalled_jobs,
+            QueueType.EVENT,
+            1800,
+        )
+    ]
+
+
+def bench_log_queue(queue, logs):
+    """process_log_queue draining queued log jobs into history"""
+    from tools.redis_queue import QueueType
+
+    queue.redis.flushdb()
+    for i in range(logs):
+        queue.enqueue_job(
+            QueueType.LOG,
+            {"id": f"log_{i}", "level": "info", "message": f"benchmark log {i}"},
+        )
+    queued = queue.redis.zcard("log:queue")
+
+    return [
+        timed(f"process_log_queue @ {queued} logs", queued, queue.process_log_queue)
+    ]
+
+
+def _contention_worker(redis_url, results):
+    """Drain the event queue from a separate process"""
+    from tools.redis_queue import QueueType
+
+    quiet_logging()
+    queue = make_queue(redis_url)
+    handles = []
+    while True:
+        job = queue.get_next_job(QueueType.EVENT)
+        if not job:
+            break
+        handles.append(job["instagram_handle"])
+        queue.mark_job_complete(QueueType.EVENT, job["instagram_handle"])
+    results.put(handles)
+
+
+def bench_contention(queue, redis_url, jobs, workers):
+    """Several worker processes draining one queue; counts double-claimed jobs"""
+    from tools.redis_queue import QueueType
+
+    queue.redis.flushdb()
+    for i in range(jobs):
+        queue.enqueue_job(QueueType.EVENT, {"instagram_handle": f"club_{i}"})
+
+    results = multiprocessing.Queue()
+    procs = [
+        multiprocessing.Process(target=_contention_worker, args=(redis_url, results))
+        for _ in range(workers)
+    ]
+
+    start = time.perf_counter()
+    for proc in procs:
+        proc.start()
+    handles = []
+    for _ in procs:
+        handles.extend(results.get())
+    for proc in procs:
+        proc.join()
+    seconds = time.perf_counter() - start
+
+    return [
+        {
+            "scenario": f"contention ({workers} processes)",
+            "ops": len(handles),
+            "seconds": seconds,
+            "ops_per_sec": len(handles) / seconds if seconds else 0.0,
+            "result": f"{len(handles) - len(set(handles))} duplicate claims",
+        }
+    ]
+
+
+def print_rows(rows, baseline=None):
+    """Print results, with the change against a saved run when given"""
+    baseline = {row["scenario"]: row for row in baseline or []}
+    print(
+        f"{'scenario':<44}{'ops':>8}{'seconds':>10}{'ops/s':>12}{'vs base':>10}  result"
+    )
+    for row in rows:
+        base = baseline.get(row["scenario"])
+        delta = ""
+        if base and base["ops_per_sec"]:
+            delta = f"{row['ops_per_sec'] / base['ops_per_sec'] - 1:+.0%}"
+        print(
+            f"{row['scenario']:<44}{row['ops']:>8}{row['seconds']:>10.3f}"
+            f"{row['ops_per_sec']:>12,.0f}{delta:>10}  {row['result']}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark RedisScraperQueue operations"
+    )
+    parser.add_argument(
+        "--redis-url",
+        default=None,
+        help="Dedicated Redis to benchmark against (it is flushed!). Defaults to fakeredis.",
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="Allow a non-empty Redis database"
+    )
+    parser.add_argument("--jobs", type=int, default=10000, help="Jobs per scenario")
+    parser.add_argument(
+        "--logs", type=int, default=1000, help="Log jobs for process_log_queue"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=4, help="Processes for the contention run"
+    )
+    parser.add_argument("--output", help="Save results as JSON for later comparison")
+    parser.add_argument(
+        "--compare", help="JSON results of an earlier run to compare against"
+    )
+    args = parser.parse_args()
+
+    # The log handler connects on import, point it somewhere harmless if unset
+    os.environ.setdefault("REDIS_URL", args.redis_url or "redis://localhost:6379")
+    quiet_logging()
+
+    queue = make_queue(args.redis_url)
+    if args.redis_url and queue.redis.dbsize() and not args.force:
+        print(
+            "Refusing to flush a non-empty Redis database, use a scratch db or --force"
+        )
+        sys.exit(1)
+
+    print(f"Backend: {args.redis_url or 'fakeredis (in-process)'}")
+    rows = []
+    rows += bench_enqueue_dequeue(queue, args.jobs)
+    rows += bench_queue_status(queue, args.jobs)
+    rows += bench_requeue_stalled(queue, args.jobs)
+    rows += bench_log_queue(queue, args.logs)
+    if args.redis_url:
+        rows += bench_contention(queue, args.redis_url, args.jobs, args.workers)
+    else:
+        print("Skipping contention run: it needs a real redis-server (--redis-url)")
+    queue.redis.flushdb()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    print_rows(rows, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "backend": args.redis_url or "fakeredis",
+                    "jobs": args.jobs,
+                    "timestamp": time.time(),
+                    "results": rows,
+                },
+                f,
+                indent=2,
+                default=str,
+            )
+        print(f"Saved results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import os
+import sys
+import time
+import random
+import argparse
+import datetime
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from tools.serialization import SERIALIZERS, loads
+
+
+def make_job(i: int) -> dict:
+    """A scraper/event job as it sits in the processing hash"""
+    now = time.time()
+    return {
+        "instagram_handle": f"club_{i}.uci",
+        "enqueued_at": now - random.uniform(0, 3600),
+        "attempts": random.randint(0, 3),
+        "processing_started": now,
+        "cookie_attempt": random.randint(0, 1),
+    }
+
+
+def make_log(i: int) -> dict:
+    """A structured log entry as written by RedisLogHandler"""
+    ts = datetime.datetime.now().isoformat()
+    message = random.choice(
+        [
+            f"Started processing scraper job: club_{i}.uci. Attempt: 1",
+            f"Fetched {random.randint(0, 40)} events for club 'club_{i}.uci'.",
+            f"Successfully added event 'General Meeting #{i}'",
+            f"Error scraping club_{i}.uci: Timed out waiting for page load",
+        ]
+    )
+    return {
+        "timestamp": ts,
+        "level": random.choice(["INFO", "INFO", "INFO", "WARNING", "ERROR"]),
+        "message": message,
+        "logger": "tools.logger",
+        "formatted": f"{ts} - INFO - {message}",
+    }
+
+
+def make_status(i: int) -> dict:
+    """A status stream payload"""
+    return {
+        "type": "job_started",
+        "timestamp": time.time(),
+        "data": {
+            "queue": "scraper",
+            "instagram_handle": f"club_{i}.uci",
+            "timestamp": time.time(),
+            "attempt": 1,
+        },
+    }
+
+
+def build_mix(count: int) -> list:
+    """Roughly what a busy Redis holds: mostly logs, then jobs and status updates"""
+    makers = [make_log] * 6 + [make_job] * 3 + [make_status]
+    return [random.choice(makers)(i) for i in range(count)]
+
+
+def bench_codec(serializer, items: list, rounds: int) -> dict:
+    """Measure encode/decode throughput and payload size for one serializer"""
+    encoded = [serializer.dumps(item) for item in items]
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for item in items:
+            serializer.dumps(item)
+    encode_secs = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for payload in encoded:
+            loads(payload)
+    decode_secs = time.perf_counter() - start
+
+    total_ops = len(items) * rounds
+    total_bytes = sum(
+        len(p.encode("utf-8") if isinstance(p, str) else p) for p in encoded
+    )
+    return {
+        "encode_ops_per_sec": total_ops / encode_secs,
+        "decode_ops_per_sec": total_ops / decode_secs,
+        "avg_bytes": total_bytes / len(items),
+        "total_bytes": total_bytes,
+        "encoded": encoded,
+    }
+
+
+def bench_redis_memory(redis_url: str, name: str, encoded: list) -> int:
+    """Write the payloads to a scratch list and report MEMORY USAGE for it"""
+    import redis
+
+    conn = redis.from_url(redis_url)
+    key = f"benchmark:serialization:{name}"
+    conn.delete(key)
+    pipe = conn.pipeline()
+    for chunk_start in range(0, len(encoded), 1000):
+        pipe.rpush(key, *encoded[chunk_start : chunk_start + 1000])
+    pipe.execute()
+    usage = conn.memory_usage(key, samples=0) or 0
+    conn.delete(key)
+    return usage
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark queue/log serializers on a realistic payload mix"
+    )
+    parser.add_argument("--items", type=int, default=5000, help="Payloads in the mix")
+    parser.add_argument("--rounds", type=int, default=5, help="Passes over the mix")
+    parser.add_argument(
+        "--redis-url",
+        default=None,
+        help="Also measure MEMORY USAGE on this Redis (uses scratch keys)",
+    )
+    args = parser.parse_args()
+
+    random.seed(42)
+    items = build_mix(args.items)
+    print(f"Payload mix: {args.items} items x {args.rounds} rounds")
+    if "msgpack" not in SERIALIZERS:
+        print("msgpack is not installed, only JSON will be measured")
+
+    results = {}
+    for name, serializer in SERIALIZERS.items():
+        results[name] = bench_codec(serializer, items, args.rounds)
+        if args.redis_url:
+            results[name]["redis_bytes"] = bench_redis_memory(
+                args.redis_url, name, results[name]["encoded"]
+            )
+
+    header = f"{'format':<10}{'encode/s':>14}{'decode/s':>14}{'avg bytes':>12}"
+    if args.redis_url:
+        header += f"{'redis bytes':>14}"
+    print(header)
+    for name, r in results.items():
+        line = (
+            f"{name:<10}{r['encode_ops_per_sec']:>14,.0f}"
+            f"{r['decode_ops_per_sec']:>14,.0f}{r['avg_bytes']:>12.1f}"
+        )
+        if args.redis_url:
+            line += f"{r['redis_bytes']:>14,}"
+        print(line)
+
+    if "msgpack" in results:
+        baseline = results["json"]["total_bytes"]
+        saved = 1 - results["msgpack"]["total_bytes"] / baseline
+        print(f"msgpack payloads are {saved:.1%} smaller than JSON")
+
+
+if __name__ == "__main__":
+    main()
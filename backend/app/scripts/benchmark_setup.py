@@ -0,0 +1,224 @@
+import os
+import sys
+import json
+import time
+import types
+import logging
+import argparse
+from collections import Counter
+
+import redis
+
+APP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Number of times each stubbed client was constructed
+constructions = Counter()
+
+
+def install_stub_clients(client_ms: float):
+    """
+    Replace the cloud SDKs with stand-ins and Redis with fakeredis
+
+    Building a stub client sleeps client_ms to stand in for the real setup
+    cost (credential parsing, HTTP connection pools) and is counted, so the
+    results show how often each client is built as well as the time taken.
+    """
+    import fakeredis
+
+    def build(name):
+        constructions[name] += 1
+        if client_ms:
+            time.sleep(client_ms / 1000)
+
+    openai = types.ModuleType("openai")
+
+    class OpenAI:
+        def __init__(self, **kwargs):
+            build("openai")
+
+        def with_options(self, **kwargs):
+            build("openai.with_options")
+            return self
+
+    openai.OpenAI = OpenAI
+    openai.RateLimitError = type("RateLimitError", (Exception,), {})
+    openai.APIError = type("APIError", (Exception,), {})
+
+    storage = types.ModuleType("google.cloud.storage")
+
+    class StorageClient:
+        def __init__(self, credentials=None):
+            build("storage.Client")
+
+        def bucket(self, name):
+            return types.SimpleNamespace(name=name)
+
+    storage.Client = StorageClient
+
+    service_account = types.ModuleType("google.oauth2.service_account")
+
+    class Credentials:
+        @classmethod
+        def from_service_account_info(cls, info):
+            build("service_account.Credentials")
+            return cls()
+
+    service_account.Credentials = Credentials
+
+    google = types.ModuleType("google")
+    google.cloud = types.ModuleType("google.cloud")
+    google.oauth2 = types.ModuleType("google.oauth2")
+    google.cloud.storage = storage
+    google.oauth2.service_account = service_account
+
+    supabase = types.ModuleType("supabase")
+    supabase.Client = object
+    supabase.create_client = lambda url, key: build("supabase") or object()
+
+    sys.modules.update(
+        {
+            "openai": openai,
+            "google": google,
+            "google.cloud": google.cloud,
+            "google.cloud.storage": storage,
+            "google.oauth2": google.oauth2,
+            "google.oauth2.service_account": service_account,
+            "supabase": supabase,
+        }
+    )
+
+    server = fakeredis.FakeServer()
+    redis.from_url = lambda *args, **kwargs: fakeredis.FakeRedis(server=server)
+    redis.Redis.from_url = redis.from_url
+
+    for name, value in {
+        "SUPABASE_URL": "http://localhost",
+        "SUPABASE_KEY": "benchmark",
+        "OPENAI": "benchmark",
+        "GC_CREDENTIAL": "{}",
+        "BUCKET_NAME": "benchmark",
+        "REDIS_URL": "redis://localhost:6379",
+    }.items():
+        os.environ.setdefault(name, value)
+
+
+def quiet_logging():
+    """Keep construction logging out of the timings"""
+    from tools.logger import RedisLogHandler
+
+    root = logging.getLogger()
+    root.setLevel(logging.ERROR)
+    for handler in root.handlers[:]:
+        if isinstance(handler, RedisLogHandler):
+            root.removeHandler(handler)
+
+
+def bench_startup(app_dir):
+    """
+    Import both modules and build one of each, as a worker does on startup
+
+    Imports are included because the trees differ in what they import eagerly.
+    """
+    sys.path.insert(0, os.path.abspath(app_dir))
+    start = time.perf_counter()
+    from tools.ai_validation import EventParser
+    from tools.calendar_connection import CalendarConnection
+
+    EventParser()
+    CalendarConnection()
+    row = {
+        "scenario": "startup (imports + one of each)",
+        "ms": (time.perf_counter() - start) * 1000,
+        "clients": dict(constructions),
+    }
+    return row, EventParser, CalendarConnection
+
+
+def bench_construction(name, factory, jobs):
+    """Average time and clients built per construction once the process is warm"""
+    before = Counter(constructions)
+    start = time.perf_counter()
+    for _ in range(jobs):
+        factory()
+    per_job = (time.perf_counter() - start) / jobs
+    job_clients = dict(constructions - before)
+    return {
+        "scenario": f"{name}() per job",
+        "ms": per_job * 1000,
+        "clients": {k: v / jobs for k, v in job_clients.items()},
+    }
+
+
+def print_rows(rows, baseline=None):
+    """Print results, with the change against a saved run when given"""
+    baseline = {row["scenario"]: row for row in baseline or []}
+    print(f"{'scenario':<34}{'ms':>10}{'vs base':>10}  clients built")
+    for row in rows:
+        base = baseline.get(row["scenario"])
+        delta = ""
+        if base and base["ms"]:
+            delta = f"{row['ms'] / base['ms'] - 1:+.0%}"
+        clients = ", ".join(f"{k} x{v:g}" for k, v in sorted(row["clients"].items()))
+        print(f"{row['scenario']:<34}{row['ms']:>10.3f}{delta:>10}  {clients or '-'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark EventParser and CalendarConnection construction with stub clients"
+    )
+    parser.add_argument(
+        "--app-dir",
+        default=APP_DIR,
+        help="backend/app of the tree to measure, e.g. a git worktree of an older commit",
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=200, help="Constructions after the first"
+    )
+    parser.add_argument(
+        "--client-ms",
+        type=float,
+        default=0.0,
+        help="Simulated setup cost of each SDK client, in milliseconds",
+    )
+    parser.add_argument("--output", help="Save results as JSON for later comparison")
+    parser.add_argument(
+        "--compare", help="JSON results of an earlier run to compare against"
+    )
+    args = parser.parse_args()
+
+    install_stub_clients(args.client_ms)
+    startup, EventParser, CalendarConnection = bench_startup(args.app_dir)
+    quiet_logging()
+
+    print(f"Tree: {os.path.abspath(args.app_dir)}")
+    print(f"Simulated client cost: {args.client_ms:g} ms")
+    rows = [
+        startup,
+        bench_construction("EventParser", EventParser, args.jobs),
+        bench_construction("CalendarConnection", CalendarConnection, args.jobs),
+    ]
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    print_rows(rows, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "app_dir": os.path.abspath(args.app_dir),
+                    "client_ms": args.client_ms,
+                    "jobs": args.jobs,
+                    "timestamp": time.time(),
+                    "results": rows,
+                },
+                f,
+                indent=2,
+            )
+        print(f"Saved results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
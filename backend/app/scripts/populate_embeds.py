@@ -1,6 +1,12 @@
 import os
+import json
+import hashlib
 import time
-from openai import OpenAI
+import random
+import argparse
+from datetime import datetime, timezone
+import numpy as np
+from openai import OpenAI, RateLimitError, APIError
 from dotenv import load_dotenv
 from supabase import create_client, Client
 
@@ -16,103 +22,307 @@ supabase: Client = create_client(supabase_url, supabase_key)
 api_key = os.getenv("OPENAI")
 client = OpenAI(api_key=api_key)
 
+EMBEDDING_MODEL = "text-embedding-3-small"
+# text-embedding-3-small accepts 8191 tokens per input and 300k per request;
+# segments stay far below the first, batches below the second (~4 chars/token)
+MAX_BATCH_TOKENS = 100000
+MAX_BATCH_INPUTS = 512
+MAX_RETRIES = 6
+# Content-defined segments: a boundary follows any word whose hash is 0 mod
+# SEGMENT_BOUNDARY_MOD (about 1 in 64 words), bounded by the min/max sizes
+SEGMENT_BOUNDARY_MOD = 64
+SEGMENT_MIN_WORDS = 32
+SEGMENT_MAX_WORDS = 512
+# Supabase filters are sent in the URL, so id lists are queried in chunks
+LOOKUP_CHUNK = 200
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for English text (about 4 characters per token)."""
+    return len(text) // 4 + 1
+
+
 def get_embedding(text: str) -> list:
     """Get embedding from OpenAI API."""
     if not text or text.strip() == "":
         return None
-    
-    try:
-        # Using text-embedding-3-small model (newer and more cost-effective)
-        response = client.embeddings.create(
-            model="text-embedding-3-small",
-            input=text
-        )
-        return response.data[0].embedding
-    except Exception as e:
-        print(f"Error getting embedding: {e}")
-        return None
 
-def update_club_embeddings(batch_size=50):
-    """Update embeddings for all clubs with needs_embedding_update=True."""
+    embeddings = get_embeddings([text])
+    return embeddings[0] if embeddings else None
+
+
+def get_embeddings(texts: list) -> list:
+    """
+    Embed several texts in one API call, backing off on rate limits.
+
+    Returns:
+        list: One embedding per text, in order, or None if the request failed
+    """
+    for attempt in range(MAX_RETRIES):
+        try:
+            response = client.embeddings.create(
+                model=EMBEDDING_MODEL,
+                input=texts
+            )
+            # The API returns one item per input, tagged with its index
+            return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+        except (RateLimitError, APIError) as e:
+            delay = min(60, 2 ** attempt) + random.uniform(0, 1)
+            print(f"Embedding request failed ({e}), retrying in {delay:.1f}s...")
+            time.sleep(delay)
+        except Exception as e:
+            print(f"Error getting embeddings: {e}")
+            return None
+
+    print(f"Giving up on a batch of {len(texts)} texts after {MAX_RETRIES} attempts")
+    return None
+
+
+def build_embedding_text(club: dict) -> str:
+    """Combine all text fields for the embedding."""
+    text_parts = []
+
+    if club.get("name"):
+        text_parts.append(club["name"])
+
+    if club.get("description"):
+        text_parts.append(club["description"])
+
+    if club.get("instagram_handle"):
+        text_parts.append(club["instagram_handle"])
+
+    # Add post captions
+    if club.get("post_texts"):
+        text_parts.append(club["post_texts"])
+
+    # Add event details
+    if club.get("event_texts"):
+        text_parts.append(club["event_texts"])
+
+    return " ".join(text_parts)
+
+
+def token_batches(items: list, max_tokens: int = MAX_BATCH_TOKENS, max_inputs: int = MAX_BATCH_INPUTS):
+    """
+    Group (item, text) pairs into batches under the token and input limits.
+    """
+    batch, batch_tokens = [], 0
+    for item, text in items:
+        tokens = estimate_tokens(text)
+        if batch and (batch_tokens + tokens > max_tokens or len(batch) >= max_inputs):
+            yield batch
+            batch, batch_tokens = [], 0
+        batch.append((item, text))
+        batch_tokens += tokens
+    if batch:
+        yield batch
+
+
+def text_hash(text: str) -> str:
+    """Hash of the exact text embedded, including the model so a model change re-embeds."""
+    return hashlib.sha256(f"{EMBEDDING_MODEL}\n{text}".encode("utf-8")).hexdigest()
+
+
+def split_segments(text: str) -> list:
+    """
+    Split text into content-defined segments.
+
+    Boundaries depend only on the words around them, not on their offset, so
+    adding a post changes the segments it touches and leaves the rest (and
+    their stored embeddings) as they were.
+    """
+    words = text.split()
+    segments, current = [], []
+    for word in words:
+        current.append(word)
+        boundary = int(hashlib.md5(word.encode("utf-8")).hexdigest()[:8], 16) % SEGMENT_BOUNDARY_MOD == 0
+        if (boundary and len(current) >= SEGMENT_MIN_WORDS) or len(current) >= SEGMENT_MAX_WORDS:
+            segments.append(" ".join(current))
+            current = []
+    if current:
+        segments.append(" ".join(current))
+    return segments
+
+
+def pool_embeddings(embeddings: list, weights: list) -> list:
+    """Length-weighted mean of segment embeddings, L2-normalized for cosine search."""
+    matrix = np.asarray(embeddings, dtype=np.float64)
+    pooled = np.average(matrix, axis=0, weights=np.asarray(weights, dtype=np.float64))
+    norm = np.linalg.norm(pooled)
+    return (pooled / norm if norm else pooled).tolist()
+
+
+def fetch_stored_hashes(club_ids: list) -> dict:
+    """embedding_text_hash of each club, to skip clubs whose text is unchanged."""
+    hashes = {}
+    for i in range(0, len(club_ids), LOOKUP_CHUNK):
+        response = supabase.table("clubs") \
+            .select("id, embedding_text_hash") \
+            .in_("id", club_ids[i:i + LOOKUP_CHUNK]) \
+            .execute()
+        for row in response.data or []:
+            hashes[row["id"]] = row.get("embedding_text_hash")
+    return hashes
+
+
+def fetch_segment_embeddings(segment_hashes: list) -> dict:
+    """Embeddings already stored for these segment hashes."""
+    found = {}
+    for i in range(0, len(segment_hashes), LOOKUP_CHUNK):
+        response = supabase.table("embedding_segments") \
+            .select("hash, embedding") \
+            .in_("hash", segment_hashes[i:i + LOOKUP_CHUNK]) \
+            .execute()
+        for row in response.data or []:
+            embedding = row["embedding"]
+            # pgvector columns come back from PostgREST as "[...]" strings
+            found[row["hash"]] = json.loads(embedding) if isinstance(embedding, str) else embedding
+    return found
+
+
+def embed_segments(segments: dict, batch_tokens: int, batch_size: int) -> dict:
+    """
+    Embed the segments not stored yet and save them.
+
+    Args:
+        segments: Segment hash to segment text
+
+    Returns:
+        dict: Segment hash to embedding, for every segment that could be embedded
+    """
+    embeddings = fetch_segment_embeddings(list(segments))
+    missing = [(h, text) for h, text in segments.items() if h not in embeddings]
+    print(f"{len(segments)} segments, {len(embeddings)} reused, {len(missing)} to embed")
+
+    for batch in token_batches(missing, batch_tokens, batch_size):
+        vectors = get_embeddings([text for _, text in batch])
+        if not vectors:
+            continue
+        rows = [{"hash": h, "embedding": v} for (h, _), v in zip(batch, vectors)]
+        try:
+            supabase.table("embedding_segments").upsert(rows, on_conflict="hash").execute()
+        except Exception as e:
+            print(f"Error storing {len(rows)} segment embeddings: {e}")
+        embeddings.update((row["hash"], row["embedding"]) for row in rows)
+
+    return embeddings
+
+
+def bulk_update_embeddings(rows: list):
+    """
+    Write a batch of embeddings with a single upsert.
+
+    name and instagram_handle are included because an upsert is an INSERT ... ON
+    CONFLICT, and the insert half must satisfy the NOT NULL columns.
+    """
+    supabase.table("clubs").upsert(rows, on_conflict="id").execute()
+
+
+def update_club_embeddings(batch_tokens=MAX_BATCH_TOKENS, batch_size=MAX_BATCH_INPUTS):
+    """
+    Update embeddings for all clubs with needs_embedding_update=True.
+
+    Each batch clears the flag as it is written, so an interrupted run resumes
+    where it stopped when started again.
+    """
     print("Starting embedding update process...")
-    
+
     # Get clubs that need embedding updates
     # We'll fetch the raw text used for the search_vector to ensure consistency
-   
     response = supabase.rpc('get_clubs_for_embedding').execute()
-    # If you don't have an RPC function, you can use raw SQL:
-    # response = supabase.query(query).execute()
-    
+
     clubs_to_update = response.data
     total_clubs = len(clubs_to_update)
     print(f"Found {total_clubs} clubs that need embedding updates")
-    
+
+    # Skip clubs whose text is exactly what was embedded last time
+    stored_hashes = fetch_stored_hashes([club["id"] for club in clubs_to_update])
+    changed, unchanged = [], []
+    for club in clubs_to_update:
+        embedding_text = build_embedding_text(club)
+        if not embedding_text.strip():
+            print(f"No text to embed for club {club['id']}")
+            continue
+        digest = text_hash(embedding_text)
+        if stored_hashes.get(club["id"]) == digest:
+            unchanged.append(club)
+        else:
+            changed.append((club, digest, split_segments(embedding_text)))
+    print(f"{len(changed)} clubs changed, {len(unchanged)} unchanged since their last embedding")
+
     updated_count = 0
     error_count = 0
-    
-    # Process in batches to avoid rate limits
-    for i in range(0, total_clubs, batch_size):
-        batch = clubs_to_update[i:i+batch_size]
-        
-        for club in batch:
-            club_id = club["id"]
-            
-            # Combine all text fields for the embedding
-            text_parts = []
-            
-            if club.get("name"):
-                text_parts.append(club["name"])
-            
-            if club.get("description"):
-                text_parts.append(club["description"])
-            
-            if club.get("instagram_handle"):
-                text_parts.append(club["instagram_handle"])
-            
-            # Add post captions
-            if club.get("post_texts"):
-                text_parts.append(club["post_texts"])
-            
-            # Add event details
-            if club.get("event_texts"):
-                text_parts.append(club["event_texts"])
-            
-            embedding_text = " ".join(text_parts)
-            
-            if not embedding_text:
-                print(f"No text to embed for club {club_id}")
-                continue
-            
-            # Get embedding
-            embedding = get_embedding(embedding_text)
-            
-            if embedding:
-                try:
-                    # Update club with embedding
-                    supabase.table("clubs") \
-                        .update({
-                            "embedding": embedding,
-                            "needs_embedding_update": False,
-                            "last_embedding_update": "now()"
-                        }) \
-                        .eq("id", club_id) \
-                        .execute()
-                    
-                    updated_count += 1
-                    print(f"Updated embedding for club {club_id} - {updated_count}/{total_clubs}")
-                except Exception as e:
-                    print(f"Error updating club {club_id}: {e}")
-                    error_count += 1
-            else:
-                print(f"Failed to get embedding for club {club_id}")
+    started = time.time()
+
+    # Unchanged clubs only need their flag cleared
+    for i in range(0, len(unchanged), batch_size):
+        rows = [
+            {
+                "id": club["id"],
+                "name": club["name"],
+                "instagram_handle": club["instagram_handle"],
+                "needs_embedding_update": False,
+            }
+            for club in unchanged[i:i + batch_size]
+        ]
+        try:
+            bulk_update_embeddings(rows)
+        except Exception as e:
+            print(f"Error clearing flags for {len(rows)} clubs: {e}")
+            error_count += len(rows)
+
+    # Embed only the segments no club has had embedded before
+    segments = {}
+    for _, _, club_segments in changed:
+        for segment in club_segments:
+            segments.setdefault(text_hash(segment), segment)
+    segment_embeddings = embed_segments(segments, batch_tokens, batch_size)
+
+    for i in range(0, len(changed), batch_size):
+        # Stamped per batch: the API's vector index refreshes incrementally from
+        # the newest last_embedding_update it has seen, even during this run
+        now = datetime.now(timezone.utc).isoformat()
+        rows = []
+        for club, digest, club_segments in changed[i:i + batch_size]:
+            hashes = [text_hash(segment) for segment in club_segments]
+            if any(h not in segment_embeddings for h in hashes):
+                print(f"Failed to get embedding for club {club['id']}")
                 error_count += 1
-        
-        # Avoid rate limits
-        if i + batch_size < total_clubs:
-            print(f"Sleeping for 2 seconds to avoid rate limits...")
-            time.sleep(2)
-    
+                continue
+            rows.append({
+                "id": club["id"],
+                "name": club["name"],
+                "instagram_handle": club["instagram_handle"],
+                "embedding": pool_embeddings(
+                    [segment_embeddings[h] for h in hashes],
+                    [len(segment.split()) for segment in club_segments],
+                ),
+                "embedding_text_hash": digest,
+                "needs_embedding_update": False,
+                "last_embedding_update": now,
+            })
+        if not rows:
+            continue
+
+        try:
+            bulk_update_embeddings(rows)
+        except Exception as e:
+            print(f"Error updating batch of {len(rows)} clubs: {e}")
+            error_count += len(rows)
+            continue
+
+        updated_count += len(rows)
+        print(f"Updated {updated_count}/{len(changed)} clubs ({time.time() - started:.1f}s)")
+
     print(f"Embedding update complete. Updated: {updated_count}, Errors: {error_count}")
 
+
 if __name__ == "__main__":
-    update_club_embeddings()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Recompute club embeddings in batches")
+    parser.add_argument("--batch-tokens", type=int, default=MAX_BATCH_TOKENS,
+                        help="Estimated tokens per embeddings request")
+    parser.add_argument("--batch-size", type=int, default=MAX_BATCH_INPUTS,
+                        help="Maximum clubs per embeddings request")
+    args = parser.parse_args()
+
+    update_club_embeddings(args.batch_tokens, args.batch_size)
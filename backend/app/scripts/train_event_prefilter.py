@@ -0,0 +1,138 @@
+import os
+import sys
+import argparse
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from tools.event_prefilter import (
+    FEATURE_NAMES,
+    PREFILTER_MODEL_PATH,
+    extract_features,
+)
+
+
+def fetch_all(query_builder, page_size=1000):
+    """Page through a Supabase select until it runs out of rows"""
+    rows, offset = [], 0
+    while True:
+        page = (
+            query_builder().range(offset, offset + page_size - 1).execute().data or []
+        )
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        offset += page_size
+
+
+def load_dataset():
+    """
+    Captions of posts the LLM parsed, labelled by whether it returned any event
+
+    Labels come from posts.llm_event_count, the LLM's own output before
+    events were merged into existing ones. Posts the prefilter skipped have no
+    count and are left out, so the model never learns from its own decisions.
+    """
+    from db.supabase_client import supabase
+
+    posts = fetch_all(
+        lambda: supabase.table("posts")
+        .select("id, caption, llm_event_count")
+        .eq("parsed", True)
+        .not_.is_("llm_event_count", "null")
+        .order("id")
+    )
+
+    captions = [post.get("caption") or "" for post in posts]
+    labels = np.array([post["llm_event_count"] > 0 for post in posts], dtype=np.float64)
+    return captions, labels
+
+
+def train(features, labels, epochs=2000, learning_rate=0.5, l2=1e-3):
+    """Class-balanced logistic regression by batch gradient descent"""
+    positives = labels.sum()
+    negatives = len(labels) - positives
+    sample_weight = np.where(
+        labels == 1,
+        len(labels) / (2 * max(positives, 1)),
+        len(labels) / (2 * max(negatives, 1)),
+    )
+
+    weights = np.zeros(features.shape[1])
+    bias = 0.0
+    for _ in range(epochs):
+        probs = 1 / (1 + np.exp(-(features @ weights + bias)))
+        error = (probs - labels) * sample_weight
+        weights -= learning_rate * (features.T @ error / len(labels) + l2 * weights)
+        bias -= learning_rate * error.mean()
+    return weights, bias
+
+
+def evaluate(probs, labels, threshold):
+    predicted = probs >= threshold
+    tp = int((predicted & (labels == 1)).sum())
+    fp = int((predicted & (labels == 0)).sum())
+    fn = int((~predicted & (labels == 1)).sum())
+    return {
+        "precision": tp / (tp + fp) if tp + fp else 0.0,
+        "recall": tp / (tp + fn) if tp + fn else 0.0,
+        "skipped": float((~predicted).mean()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Train the event prefilter on historical LLM parse outcomes"
+    )
+    parser.add_argument("--output", default=PREFILTER_MODEL_PATH, help="Model file")
+    parser.add_argument(
+        "--target-recall",
+        type=float,
+        default=0.98,
+        help="Pick the highest threshold that keeps at least this recall",
+    )
+    parser.add_argument("--holdout", type=float, default=0.2, help="Test split size")
+    args = parser.parse_args()
+
+    captions, labels = load_dataset()
+    if len(captions) < 50 or labels.sum() == 0:
+        print(f"Not enough labelled posts to train ({len(captions)} posts)")
+        sys.exit(1)
+    print(f"{len(captions)} parsed posts, {int(labels.sum())} with events")
+
+    features = np.stack([extract_features(c) for c in captions])
+    rng = np.random.default_rng(42)
+    order = rng.permutation(len(captions))
+    split = int(len(order) * (1 - args.holdout))
+    train_idx, test_idx = order[:split], order[split:]
+
+    weights, bias = train(features[train_idx], labels[train_idx])
+    probs = 1 / (1 + np.exp(-(features[test_idx] @ weights + bias)))
+
+    threshold = 0.0
+    for candidate in np.arange(0.05, 0.95, 0.01):
+        if evaluate(probs, labels[test_idx], candidate)["recall"] < args.target_recall:
+            break
+        threshold = float(candidate)
+
+    result = evaluate(probs, labels[test_idx], threshold)
+    print(
+        f"Holdout at threshold {threshold:.2f}: precision {result['precision']:.1%}, "
+        f"recall {result['recall']:.1%}, LLM calls skipped {result['skipped']:.1%}"
+    )
+    for name, weight in zip(FEATURE_NAMES, weights):
+        print(f"  {name:<14}{weight:+.2f}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    np.savez(
+        args.output,
+        weights=weights,
+        bias=bias,
+        feature_names=np.array(FEATURE_NAMES),
+        threshold=threshold,
+    )
+    print(f"Saved model to {args.output} with threshold {threshold:.2f}")
+
+
+if __name__ == "__main__":
+    main()
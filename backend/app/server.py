@@ -2,22 +2,32 @@ from tools.ai_validation import get_embedding
 from tools.calendar_connection import CalendarConnection
 from tools.scraper_rotation import ScraperRotation
 from db.supabase_client import supabase
-from db.queries import SupabaseQueries
 import os
 from typing import List, Optional
 from datetime import datetime
 import dotenv
 import uvicorn
 from fastapi import FastAPI, HTTPException, Query, Request, APIRouter
-from fastapi.responses import JSONResponse, Response
+from fastapi.responses import (
+    JSONResponse,
+    PlainTextResponse,
+    Response,
+    StreamingResponse,
+)
 
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, EmailStr
 import os
+import time
 
 # Load environment variables
 dotenv.load_dotenv()
 from tools.logger import logger
+from tools.timing import aggregator as span_timings, span
+from tools import prometheus
+from tools.vector_index import club_index
+from tools.search_cache import ranked_cache
+from tools.resources import resources
 
 azure_blob_cdn = os.getenv("GCP_URL")
 # Initialize dependencies
@@ -55,8 +65,38 @@ app.add_middleware(
     ],  # restrict to needed headers
 )
 
+# Feed Supabase/OpenAI spans into the Prometheus histograms as they are recorded
+span_timings.add_listener(prometheus.observe_span)
+
+
+@app.middleware("http")
+async def prometheus_middleware(request: Request, call_next):
+    """Count requests and time them per route template."""
+    prometheus.HTTP_IN_FLIGHT.inc()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template, not raw path, to keep the series count bounded
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        prometheus.HTTP_IN_FLIGHT.dec()
+        prometheus.HTTP_REQUESTS.inc(labels=(request.method, path, status))
+        prometheus.HTTP_LATENCY.observe(
+            time.perf_counter() - started, (request.method, path)
+        )
+
+
+db = resources.db
 
-db = SupabaseQueries()
+
+@app.on_event("startup")
+async def load_vector_index():
+    """Load club embeddings in the background and keep them refreshed."""
+    club_index.start_background_refresh()
 
 
 class Club(BaseModel):
@@ -329,6 +369,26 @@ async def health_check():
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
 
+@app.get("/metrics")
+async def metrics(
+    format: str = Query("prometheus", description="prometheus or json"),
+    window_minutes: int = Query(60, ge=1, le=2880, description="Window to aggregate"),
+):
+    """
+    Prometheus text exposition of this worker's request, cache, Supabase and
+    OpenAI metrics. format=json returns the span percentiles stored in Redis.
+    """
+    if format != "json":
+        return PlainTextResponse(
+            prometheus.registry.render(), media_type=prometheus.CONTENT_TYPE
+        )
+    return {
+        "window_seconds": window_minutes * 60,
+        "timestamp": datetime.now().isoformat(),
+        "spans": span_timings.summary(window_minutes * 60),
+    }
+
+
 @app.get("/club")
 async def list_clubs(
     page: int = Query(1, description="Page number, starting from 1"),
@@ -499,19 +559,30 @@ async def get_club_calendar(instagram_handle: str):
         # Get club ID
         club_id = club["id"]
 
+        headers = {
+            "Content-Disposition": f"attachment; filename={instagram_handle}_calendar.ics"
+        }
+
         # Get calendar content
         calendar_content = db.get_calendar_file(club_id)
 
         if not calendar_content:
-            raise HTTPException(status_code=404, detail="Calendar file not found")
+            # Not generated yet: stream it from the event rows. The rows are
+            # fetched here so a failed query is still a 500, not a cut-off file
+            events = db.get_calendar_events(club_id)
+            if not events:
+                raise HTTPException(status_code=404, detail="Calendar file not found")
+            return StreamingResponse(
+                calendar.stream_club_calendar(club, events),
+                media_type="text/calendar",
+                headers=headers,
+            )
 
         # Return as ICS file
         return Response(
             content=calendar_content,
             media_type="text/calendar",
-            headers={
-                "Content-Disposition": f"attachment; filename={instagram_handle}_calendar.ics"
-            },
+            headers=headers,
         )
     except HTTPException as http_e:
         raise http_e
@@ -531,11 +602,15 @@ async def get_all_campus_events(
     ),
     limit: int = Query(100, description="Maximum number of events to return"),
     offset: int = Query(0, description="Pagination offset"),
+    dedupe: bool = Query(
+        False,
+        description="Return co-hosted events once, with the other clubs as cohosts",
+    ),
 ):
     """Get all events from all clubs campus-wide with pagination and date filtering."""
     try:
         # Get all campus events in a single efficient query
-        events = db.get_all_campus_events(start_date, end_date, limit, offset)
+        events = db.get_all_campus_events(start_date, end_date, limit, offset, dedupe)
 
         return {"count": len(events), "results": events}
     except Exception as e:
@@ -618,66 +693,114 @@ async def smart_search(
         )
 
 
-@router.get("/hybrid-search")
-async def hybrid_search(
-    q: str = Query(..., description="Search query"),
-    page: int = Query(1, description="Page number starting from 1"),
-    limit: int = Query(20, description="Number of clubs per page"),
-    category: Optional[str] = Query(None, description="Filter by category"),
-    semantic_weight: float = Query(0.5, description="Weight for semantic search (0-1)"),
-):
-    """Hybrid search combining full-text and semantic search on clubs."""
-    try:
-        # Get embedding for semantic search
-        query_embedding = get_embedding(q)
-
-        # If embedding fails, fall back to full-text search
-        if not query_embedding:
-            return await smart_search(q, page, limit, category)
-
-        # Normalize weight (ensure it's between 0 and 1)
-        semantic_weight = max(0, min(1, semantic_weight))
-        fulltext_weight = 1 - semantic_weight
-
-        # Prepare the search query using text_search for full-text and vector comparison for semantic
-        # Use a CTE (Common Table Expression) to handle the hybrid search logic
+def hybrid_search_rpc_ranking(
+    q: str, query_embedding: list, category: Optional[str], semantic_weight: float
+) -> list:
+    """Full ranking from the hybrid_search RPC, as (club id, score) pairs."""
+    with span("supabase.rpc.hybrid_search"):
         response = supabase.rpc(
             "hybrid_search",
             {
                 "query_text": q,
                 "query_embedding": query_embedding,
                 "match_threshold": 0.5,  # Adjust as needed
-                "fulltext_weight": fulltext_weight,
+                "fulltext_weight": 1 - semantic_weight,
                 "semantic_weight": semantic_weight,
             },
         ).execute()
 
-        matches = response.data if response.data else []
+    matches = response.data if response.data else []
+
+    # Filter by category if specified
+    if category:
+        matches = [
+            club
+            for club in matches
+            if any(cat["name"] == category for cat in club.get("categories", []))
+        ]
+
+    return [(club["id"], club.get("score")) for club in matches]
 
-        # Filter by category if specified
-        if category:
-            matches = [
-                club
-                for club in matches
-                if any(cat["name"] == category for cat in club.get("categories", []))
-            ]
 
-        # Manually paginate results
-        total_matches = len(matches)
-        cdn_prefix = os.getenv("GCP_URL", "")
-        start = (page - 1) * limit
-        end = start + limit
-        paginated_matches = matches[start:end]
+@router.get("/hybrid-search")
+async def hybrid_search(
+    q: str = Query(..., description="Search query"),
+    page: int = Query(1, description="Page number starting from 1"),
+    limit: int = Query(20, description="Number of clubs per page"),
+    category: Optional[str] = Query(None, description="Filter by category"),
+    semantic_weight: float = Query(0.5, description="Weight for semantic search (0-1)"),
+):
+    """Hybrid search combining full-text and semantic search on clubs."""
+    try:
+        # Normalize weight (ensure it's between 0 and 1)
+        semantic_weight = max(0, min(1, semantic_weight))
+        offset = (page - 1) * limit
 
-        for club in paginated_matches:
-            image_path = club.get("profile_image_path")
-            if image_path:
-                club["profile_image_path"] = f"{cdn_prefix}/{image_path.lstrip('/')}"
+        # Paging through a search reuses its ranking instead of searching again
+        cache_key = ranked_cache.key("hybrid", q, category, round(semantic_weight, 2))
+        ranked = ranked_cache.get(cache_key)
+
+        if ranked is None:
+            # Get embedding for semantic search
+            query_embedding = get_embedding(q)
+
+            # If embedding fails, fall back to full-text search
+            if not query_embedding:
+                return await smart_search(q, page, limit, category)
+
+            if club_index.ready:
+                # Rank in memory: no database round trip, category filtered before scoring
+                with span("search.vector_index"):
+                    ranked = [
+                        (club["id"], score)
+                        for club, score in club_index.hybrid_search(
+                            q,
+                            query_embedding,
+                            category=category,
+                            semantic_weight=semantic_weight,
+                            match_threshold=0.5,
+                        )
+                    ]
+            else:
+                # Index still loading: rank, filter and paginate in the database
+                result = db.hybrid_search_page(
+                    q, query_embedding, offset, limit, category, semantic_weight
+                )
+                if result is not None:
+                    return {
+                        "count": result["total"],
+                        "results": result["clubs"],
+                        "hasMore": result["total"] > offset + limit,
+                        "page": page,
+                    }
+                ranked = hybrid_search_rpc_ranking(
+                    q, query_embedding, category, semantic_weight
+                )
+            ranked_cache.set(cache_key, ranked)
+
+        # Resolve only the requested page
+        total_matches = len(ranked)
+        page_ids = [club_id for club_id, _ in ranked[offset : offset + limit]]
+        results = club_index.get_clubs(page_ids)
+        if results is None:
+            results = db.get_clubs_by_ids(page_ids)
+        else:
+            cdn_prefix = os.getenv("GCP_URL", "")
+            for club in results:
+                image_path = club.get("profile_image_path")
+                if image_path:
+                    club["profile_image_path"] = (
+                        f"{cdn_prefix}/{image_path.lstrip('/')}"
+                    )
+
+        scores = dict(ranked)
+        for club in results:
+            club["score"] = scores.get(club["id"])
 
         return {
             "count": total_matches,
-            "results": paginated_matches,
-            "hasMore": end < total_matches,
+            "results": results,
+            "hasMore": offset + limit < total_matches,
             "page": page,
         }
     except Exception as e:
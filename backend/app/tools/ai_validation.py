@@ -1,7 +1,7 @@
 import ast
+import numpy as np
 import os
-import dotenv
-from openai import OpenAI
+from openai import OpenAI, RateLimitError
 import json
 from typing import List, Dict, Optional
 import time
@@ -10,39 +10,100 @@ import sys
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from tools.logger import logger
-from db.queries import SupabaseQueries
-from difflib import SequenceMatcher
+from tools.timing import timed, span
+from tools.embedding_cache import embedding_cache
+from tools.resources import resources
+from tools.event_dedup import ClubEventIndex, parse_event_date
+from tools.llm_concurrency import (
+    PARSE_MAX_CONCURRENCY,
+    backoff_delay,
+    chat_limiter,
+    retry_after_seconds,
+)
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+# Shared OpenAI client, created on first use
+def get_openai_client() -> OpenAI:
+    """Return the process-wide OpenAI client"""
+    return resources.openai
 
-def get_embedding(text: str) -> list:
-    """Get embedding from OpenAI API."""
-    client = OpenAI(api_key=os.getenv("OPENAI"))
-    if not text or text.strip() == "":
-        return None
 
+def _create_embedding(text: str) -> Optional[List[float]]:
+    """Call the embeddings API, bypassing the cache"""
     try:
         # Using text-embedding-3-small model (newer and more cost-effective)
-        response = client.embeddings.create(model="text-embedding-3-small", input=text)
+        with span("openai.embedding"):
+            response = get_openai_client().embeddings.create(
+                model=EMBEDDING_MODEL, input=text
+            )
         return response.data[0].embedding
     except Exception as e:
-        print(f"Error getting embedding: {e}")
+        logger.error(f"Error getting embedding: {e}")
         return None
 
 
+def get_embedding(text: str) -> list:
+    """Get embedding for text, served from the embedding cache when possible."""
+    if not text or text.strip() == "":
+        return None
+    return embedding_cache.get_or_compute(EMBEDDING_MODEL, text, _create_embedding)
+
+
+EVENT_MODEL = "gpt-4.1-mini-2025-04-14"
+
+EVENT_SYSTEM_PROMPT = (
+    "You must strictly follow these rules when responding:\n"
+    "1. Respond with **valid, raw JSON only**. Do not include any text, comments, markdown, or extra formatting outside the JSON.\n"
+    "2. The response must be a JSON array.\n"
+    "3. If the input is not a valid club event (meaning the club does not have anything) or cannot be parsed, return an empty array: [].\n"
+    "4. Each item in the array must be a dictionary with **exactly** the following keys:\n"
+    '   - "Name": string (name of the event)\n'
+    '   - "Date": string in ISO 8601 format (e.g., "2025-04-14T18:00:00")\n'
+    '   - "Details": string (optional event information)\n'
+    '   - "Duration": object with "days", "hours", and "minutes" keys\n'
+    "5. If the event spans multiple dates, create one entry\n"
+    "6. Do not include any additional metadata, explanations, or keys not listed above.\n"
+    "7. Use the context date and the content to find the context date for the event."
+)
+
+# Batch mode wraps the same rules: several posts in, one array per post out
+BATCH_SYSTEM_PROMPT = (
+    EVENT_SYSTEM_PROMPT
+    + "\n\nYou will receive several posts as a JSON array of objects with "
+    '"post_id", "context_date" and "caption". Apply the rules above to each post '
+    "separately and respond with a single JSON object that maps every post_id to "
+    "that post's array of events (use [] for posts without events)."
+)
+PARSE_BATCH_MAX_POSTS = int(os.getenv("PARSE_BATCH_MAX_POSTS", "8"))
+# Estimated input tokens of captions per batch request (~4 characters per token)
+PARSE_BATCH_TOKEN_BUDGET = int(os.getenv("PARSE_BATCH_TOKEN_BUDGET", "6000"))
+# Buffered event rows written per bulk insert while parsing a club
+EVENT_WRITE_BATCH_SIZE = int(os.getenv("EVENT_WRITE_BATCH_SIZE", "100"))
+
+
 class EventParser:
     def __init__(self):
-        # Load environment variables (for OpenAI API key)
-        dotenv.load_dotenv()
-        self.client = OpenAI(api_key=os.getenv("OPENAI"))
-        print("API Key Loaded:", os.getenv("OPENAI"))
-
-        self.db = SupabaseQueries()
+        # Clients are shared process-wide; building a parser per job is cheap.
+        # Retries are handled in parse_post so rate limits reach the shared limiter
+        self.client = resources.openai_no_retry
+        self.db = resources.db
+        self.parse_cache = resources.parse_cache
+        self.prefilter = resources.event_prefilter
+
+        # Writes buffered by store_parsed_info until flush_writes
+        self._pending_events = []
+        self._pending_parsed = {}
+        # Club event index kept for the duration of parse_all_posts
+        self._dedup_index = None
 
         # Configure similarity thresholds
         self.name_similarity_threshold = 0.6  # Lower than original 0.7
         self.time_window_hours = 24  # Hours to consider for time proximity
 
+    @timed("parser.parse_post")
     def parse_post(self, post_id: "uuid") -> List[Dict]:
         """
         Parses a post to extract event data using OpenAI's GPT-4 API.
@@ -53,8 +114,7 @@ class EventParser:
         Returns:
             List[Dict]: Parsed events or an empty list if parsing fails.
         """
-        MAX_RETRIES = 3  # Define the number of retries
-        RETRY_DELAY = 2  # Delay (in seconds) between retries
+        MAX_RETRIES = 5  # Define the number of retries
 
         # Load the post data
         try:
@@ -66,33 +126,23 @@ class EventParser:
                     logger.info(f"Parsing attempt {attempt + 1}...")
 
                     # Send request to OpenAI API to extract dates
-                    completion = self.client.chat.completions.create(
-                        model="gpt-4.1-mini-2025-04-14",  # Ensure the model name is correct
-                        messages=[
-                            {
-                                "role": "system",
-                                "content": (
-                                    "You must strictly follow these rules when responding:\n"
-                                    "1. Respond with **valid, raw JSON only**. Do not include any text, comments, markdown, or extra formatting outside the JSON.\n"
-                                    "2. The response must be a JSON array.\n"
-                                    "3. If the input is not a valid club event (meaning the club does not have anything) or cannot be parsed, return an empty array: [].\n"
-                                    "4. Each item in the array must be a dictionary with **exactly** the following keys:\n"
-                                    '   - "Name": string (name of the event)\n'
-                                    '   - "Date": string in ISO 8601 format (e.g., "2025-04-14T18:00:00")\n'
-                                    '   - "Details": string (optional event information)\n'
-                                    '   - "Duration": object with "days", "hours", and "minutes" keys\n'
-                                    "5. If the event spans multiple dates, create one entry\n"
-                                    "6. Do not include any additional metadata, explanations, or keys not listed above.\n"
-                                    "7. Use the context date and the content to find the context date for the event."
-                                ),
-                            },
-                            {
-                                "role": "user",
-                                "content": f"{post_text} context date: {post_date}",
-                            },
-                        ],
-                        temperature=0.3,
-                    )
+                    with chat_limiter:
+                        completion = self.client.chat.completions.create(
+                            model=EVENT_MODEL,
+                            messages=[
+                                {
+                                    "role": "system",
+                                    "content": EVENT_SYSTEM_PROMPT,
+                                },
+                                {
+                                    "role": "user",
+                                    "content": f"{post_text} context date: {post_date}",
+                                },
+                            ],
+                            temperature=0.3,
+                        )
+
+                    chat_limiter.on_success()
 
                     # Process and validate the response
                     response = completion.choices[0].message.content
@@ -107,15 +157,21 @@ class EventParser:
 
                     raise ValueError("Invalid API response format")
 
+                except RateLimitError as e:
+                    retry_after = retry_after_seconds(e)
+                    chat_limiter.on_rate_limit(retry_after)
+                    delay = backoff_delay(attempt, retry_after)
                 except json.JSONDecodeError as e:
                     logger.error(response)
                     logger.error(f"JSON decoding error: {e}")
+                    delay = backoff_delay(attempt)
                 except Exception as e:
                     logger.error(f"Error during API call: {e}")
+                    delay = backoff_delay(attempt, retry_after_seconds(e))
 
                 if attempt < MAX_RETRIES - 1:
-                    logger.warning(f"Retrying in {RETRY_DELAY} seconds...")
-                    time.sleep(RETRY_DELAY)
+                    logger.warning(f"Retrying in {delay:.1f} seconds...")
+                    time.sleep(delay)
 
             # If retries fail, log and return an empty list
             logger.error("Failed to parse post after multiple attempts.")
@@ -128,19 +184,137 @@ class EventParser:
             logger.error(f"Unexpected error: {e}")
             return []
 
+    @staticmethod
+    def valid_events(events) -> bool:
+        """Check that a parsed value is a list of events with a Name and a Date."""
+        return isinstance(events, list) and all(
+            isinstance(event, dict)
+            and isinstance(event.get("Name"), str)
+            and isinstance(event.get("Date"), str)
+            for event in events
+        )
+
+    @staticmethod
+    def pack_batches(
+        posts: List[tuple],
+        max_posts: int = PARSE_BATCH_MAX_POSTS,
+        token_budget: int = PARSE_BATCH_TOKEN_BUDGET,
+    ):
+        """
+        Group (post_id, post_date, caption) tuples into batch requests.
+
+        A batch closes when it has max_posts posts or when the next caption would
+        take the estimated tokens past token_budget.
+        """
+        batch, tokens = [], 0
+        for post in posts:
+            cost = len(post[2] or "") // 4 + 20  # caption plus id/date overhead
+            if batch and (len(batch) >= max_posts or tokens + cost > token_budget):
+                yield batch
+                batch, tokens = [], 0
+            batch.append(post)
+            tokens += cost
+        if batch:
+            yield batch
+
+    def _request_batch(self, posts: List[tuple]) -> Optional[Dict]:
+        """Send one batch request and return the decoded JSON object."""
+        MAX_RETRIES = 3
+
+        payload = json.dumps(
+            [
+                {
+                    "post_id": str(post_id),
+                    "context_date": str(post_date),
+                    "caption": caption or "",
+                }
+                for post_id, post_date, caption in posts
+            ],
+            ensure_ascii=False,
+        )
+
+        for attempt in range(MAX_RETRIES):
+            try:
+                with chat_limiter:
+                    completion = self.client.chat.completions.create(
+                        model=EVENT_MODEL,
+                        messages=[
+                            {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+                            {"role": "user", "content": payload},
+                        ],
+                        temperature=0.3,
+                        response_format={"type": "json_object"},
+                    )
+                chat_limiter.on_success()
+
+                parsed = json.loads(completion.choices[0].message.content)
+                if isinstance(parsed, dict):
+                    return parsed
+                raise ValueError("Batch response is not a JSON object")
+
+            except RateLimitError as e:
+                retry_after = retry_after_seconds(e)
+                chat_limiter.on_rate_limit(retry_after)
+                delay = backoff_delay(attempt, retry_after)
+            except Exception as e:
+                logger.error(f"Error during batch API call: {e}")
+                delay = backoff_delay(attempt, retry_after_seconds(e))
+
+            if attempt < MAX_RETRIES - 1:
+                logger.warning(f"Retrying batch in {delay:.1f} seconds...")
+                time.sleep(delay)
+
+        return None
+
+    @timed("parser.parse_posts_batch")
+    def parse_posts_batch(self, posts: List[tuple]) -> Dict[str, List[Dict]]:
+        """
+        Parse several posts with a single request, sharing one system prompt.
+
+        Each post's array is validated on its own; posts that are missing from
+        the response or fail validation are re-parsed with parse_post. If the
+        batch request fails altogether (e.g. every attempt was rate limited),
+        nothing is returned: the posts stay unparsed for the next run instead
+        of turning into one retried request per post.
+
+        Args:
+            posts (List[tuple]): (post_id, post_date, caption) for each post
+
+        Returns:
+            Dict[str, List[Dict]]: Parsed events per post id
+        """
+        results = {}
+        if len(posts) > 1:
+            parsed = self._request_batch(posts)
+            if parsed is None:
+                logger.warning(
+                    f"Batch request failed, leaving {len(posts)} posts for the next run"
+                )
+                return results
+            for post_id, post_date, caption in posts:
+                events = parsed.get(str(post_id))
+                if self.valid_events(events):
+                    results[post_id] = events
+                    self.parse_cache.store(caption, post_date, events)
+
+        missing = [post for post in posts if post[0] not in results]
+        if missing and len(posts) > 1:
+            logger.warning(
+                f"Batch parse fell back to single requests for {len(missing)} of {len(posts)} posts"
+            )
+        for post_id, post_date, caption in missing:
+            results[post_id] = self.parse_post(post_id)
+            # parse_post also returns [] on failure, so only cache found events
+            if results[post_id] and caption is not None:
+                self.parse_cache.store(caption, post_date, results[post_id])
+        return results
+
     def get_embedding(self, text: str) -> List[float]:
         """
-        Get embeddings for text using OpenAI's embeddings API.
+        Get embeddings for text using OpenAI's embeddings API (cached).
         This enables semantic similarity matching.
         """
-        try:
-            response = self.client.embeddings.create(
-                model="text-embedding-3-small", input=text
-            )
-            return response.data[0].embedding
-        except Exception as e:
-            logger.error(f"Error getting embedding: {e}")
-            return None
+        return get_embedding(text)
 
     def cosine_similarity(self, a: List[float], b: List[float]) -> float:
         """
@@ -158,6 +332,79 @@ class EventParser:
 
         return dot_product / (magnitude_a * magnitude_b)
 
+    @staticmethod
+    def parse_vector(value) -> Optional[List[float]]:
+        """
+        Read a pgvector column, which PostgREST returns as a "[0.1,0.2,...]" string.
+        """
+        if value is None:
+            return None
+        if isinstance(value, str):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                return None
+        return value or None
+
+    def semantic_similarities(
+        self, target_embedding: Optional[List[float]], events: List[Dict]
+    ) -> List[float]:
+        """
+        Cosine similarity of the target against every candidate in one matrix op.
+
+        Candidates without a stored name_embedding (inserted before the column
+        existed) are embedded once and backfilled so the next lookup is free.
+
+        Args:
+            target_embedding: Embedding of the new event name
+            events: Candidate events with name_embedding loaded
+
+        Returns:
+            List[float]: Similarity per event, 0.0 where unavailable
+        """
+        if not target_embedding or not events:
+            return [0.0] * len(events)
+
+        vectors = []
+        for event in events:
+            vector = self.parse_vector(event.get("name_embedding"))
+            if vector is None and event.get("name"):
+                vector = self.get_embedding(event["name"])
+                if vector and event.get("id"):
+                    self.store_event_embedding(event["id"], vector)
+            # Keep the parsed vector so indexed candidates are decoded only once
+            event["name_embedding"] = vector
+            vectors.append(
+                vector if vector and len(vector) == len(target_embedding) else None
+            )
+
+        present = [i for i, v in enumerate(vectors) if v is not None]
+        sims = [0.0] * len(events)
+        if not present:
+            return sims
+
+        matrix = np.asarray([vectors[i] for i in present], dtype=np.float32)
+        target = np.asarray(target_embedding, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(target)
+        scores = np.divide(
+            matrix @ target,
+            norms,
+            out=np.zeros(len(present), np.float32),
+            where=norms > 0,
+        )
+        for i, score in zip(present, scores.tolist()):
+            sims[i] = score
+        return sims
+
+    def store_event_embedding(self, event_id: str, embedding: List[float]) -> None:
+        """Persist a backfilled name embedding for an existing event."""
+        try:
+            self.db.supabase.table("events").update({"name_embedding": embedding}).eq(
+                "id", event_id
+            ).execute()
+        except Exception as e:
+            logger.error(f"Error storing embedding for event {event_id}: {e}")
+
     def parse_date(self, date_str: str) -> Optional[datetime]:
         """
         Try multiple date formats to parse a date string.
@@ -181,6 +428,7 @@ class EventParser:
             logger.error(f"Failed to parse date: {date_str}")
             return None
 
+    @timed("parser.find_similar_event")
     def find_similar_event(
         self, name: str, date_str: str, club_id: str
     ) -> Optional[Dict]:
@@ -199,79 +447,32 @@ class EventParser:
             dict or None: Most similar existing event data if found, None otherwise
         """
         # Parse the input date
-        event_date = self.parse_date(date_str)
+        event_date = parse_event_date(date_str)
         if not event_date:
             return None
 
-        # Calculate date range for filtering
-        date_start = event_date - timedelta(hours=self.time_window_hours / 2)
-        date_end = event_date + timedelta(hours=self.time_window_hours / 2)
-
-        # Format dates for database query
-        date_start_str = date_start.isoformat()
-        date_end_str = date_end.isoformat()
-
-        # Get events for this club within the date range
-        try:
-            response = (
-                self.db.supabase.table("events")
-                .select("id, name, date, details")
-                .eq("club_id", club_id)
-                .gte("date", date_start_str)
-                .lte("date", date_end_str)
-                .execute()
-            )
-
-            events = response.data
-            if not events:
-                logger.info(f"No events found for club {club_id} in date range")
-                return None
-
-            logger.info(f"Found {len(events)} potential matches within time window")
-        except Exception as e:
-            logger.error(f"Error querying events: {e}")
+        # Candidates within the time window come from the in-memory club index
+        matches = self.dedup_index(club_id).candidates(name, event_date)
+        if not matches:
+            logger.info(f"No events found for club {club_id} in date range")
             return None
+        logger.info(f"Found {len(matches)} potential matches within time window")
 
-        # Get embedding for our target event name
-        try:
-            target_embedding = self.get_embedding(name)
-        except:
-            target_embedding = None
+        # One embedding call for the new event; candidates use their stored embeddings
+        target_embedding = self.get_embedding(name)
+        if not target_embedding:
             logger.warning("Could not get embedding for semantic matching")
+        semantic_sims = self.semantic_similarities(
+            target_embedding, [match["event"] for match in matches]
+        )
 
         # Track best matches
         best_match = None
         best_score = 0.0
 
-        for event in events:
-            event_name = event.get("name", "")
-
-            # Calculate string similarity score (0-1)
-            string_sim = SequenceMatcher(None, name.lower(), event_name.lower()).ratio()
-
-            # Calculate time proximity score (0-1)
-            event_datetime = self.parse_date(event.get("date", ""))
-            if event_datetime:
-                time_diff = abs(
-                    (event_datetime - event_date).total_seconds() / 3600
-                )  # hours
-                time_sim = max(
-                    0, 1 - (time_diff / self.time_window_hours)
-                )  # Scale to 0-1
-            else:
-                time_sim = 0.0
-
-            # Calculate semantic similarity if embeddings available (0-1)
-            semantic_sim = 0.0
-            if target_embedding:
-                try:
-                    event_embedding = self.get_embedding(event_name)
-                    if event_embedding:
-                        semantic_sim = self.cosine_similarity(
-                            target_embedding, event_embedding
-                        )
-                except:
-                    semantic_sim = 0.0
+        for match, semantic_sim in zip(matches, semantic_sims):
+            event_name = match["event"].get("name", "")
+            string_sim, time_sim = match["string_sim"], match["time_sim"]
 
             # Compute combined score:
             # 50% string similarity, 30% semantic similarity, 20% time proximity
@@ -285,66 +486,208 @@ class EventParser:
 
             if combined_score > best_score:
                 best_score = combined_score
-                best_match = event
+                best_match = match["event"]
 
         # Apply threshold to combined score
         if best_score >= self.name_similarity_threshold:
             logger.info(
                 f"Found similar event: '{best_match['name']}' with score {best_score:.2f}"
             )
-            return best_match
+            return {k: v for k, v in best_match.items() if k != "name_embedding"}
         else:
             logger.info(f"No similar event found. Best score was {best_score:.2f}")
             return None
 
-    def parse_all_posts(self, username):
+    def dedup_index(
+        self, club_id: str, since: Optional[datetime] = None
+    ) -> ClubEventIndex:
+        """
+        Index of a club's existing events for duplicate checks.
+
+        parse_all_posts loads it once per run and store_parsed_info adds each
+        queued event, so later posts in the run dedup against them too. Outside
+        a run the index is loaded per call.
+
+        Args:
+            club_id: Club to index
+            since: Only index events dated at or after this; None for all
+
+        Returns:
+            ClubEventIndex: Index of the club's events (empty if loading failed)
+        """
+        if self._dedup_index is not None and self._dedup_index.club_id == club_id:
+            return self._dedup_index
+
+        index = ClubEventIndex(club_id, self.time_window_hours)
         try:
-            logger.info("fetching posts to parse...")
-            posts_to_parse = self.db.posts_to_parse(username)
-            logger.info(f"successfully fetched {len(posts_to_parse)} posts to parse!")
+            index.extend(self.db.get_events_for_dedup(club_id, since))
+            logger.info(f"Indexed {index.size} events of club {club_id} for dedup")
+        except Exception as e:
+            logger.error(f"Error loading events for dedup: {e}")
+        return index
+
+    def parse_all_posts(
+        self,
+        username,
+        max_workers: int = PARSE_MAX_CONCURRENCY,
+        batch_size: int = PARSE_BATCH_MAX_POSTS,
+    ):
+        """
+        Parse every unparsed post of a club.
 
-            for post_id in posts_to_parse:
-                # Make sure post_id is a string, not a dict
-                if isinstance(post_id, dict) and "id" in post_id:
-                    post_id = post_id["id"]
+        Captions the event prefilter rejects are marked parsed without a
+        request. The rest are packed into batch requests (up to batch_size
+        captions within the token budget) that run concurrently, bounded by
+        max_workers and by the shared rate-limit-aware limiter. Each post is
+        stored as soon as its batch completes. Storing stays on this thread so
+        duplicate checks see events queued by earlier posts. The club is
+        resolved once, unparsed posts come from a single query, and event
+        rows and parsed flags are written in bulk (see flush_writes).
 
-                logger.info(f"parsing post ID: {post_id}...")
+        Args:
+            username: Instagram handle of the club
+            max_workers: Maximum requests in flight at once
+            batch_size: Maximum posts per request; 1 sends one post per request
+        """
+        try:
+            club_id = self.db.get_club_by_instagram_handle(username)
+            if not club_id:
+                logger.error(f"No club found for {username}")
+                return
+            self._dedup_index = None
 
-                if self.db.check_if_post_is_parsed(post_id):
-                    logger.info(f"post {post_id} already parsed, skipping...")
+            # One query for the unparsed posts with their dates and captions
+            logger.info("fetching posts to parse...")
+            captions = self.db.get_unparsed_posts(club_id)
+            logger.info(f"successfully fetched {len(captions)} posts to parse!")
+            if not captions:
+                return
+
+            # Posts announce events on or after their own date, so only events
+            # from the earliest post (minus the match window) onwards can match
+            post_dates = [parse_event_date(date) for date, _ in captions.values()]
+            post_dates = [date for date in post_dates if date is not None]
+            since = None
+            if post_dates and len(post_dates) == len(captions):
+                since = min(post_dates) - timedelta(hours=self.time_window_hours)
+            self._dedup_index = self.dedup_index(club_id, since)
+
+            # Reposts and cross-posted captions reuse earlier results without an LLM call
+            posts, decisions = [], {}
+            for post_id, (post_date, caption) in captions.items():
+                cached = self.parse_cache.lookup(caption, post_date)
+                if cached is not None:
+                    logger.info(f"post {post_id} matches a cached caption, storing...")
+                    self.store_parsed_info(cached, post_id, club_id, flush=False)
                     continue
 
-                parsed_info = self.parse_post(post_id)
-                logger.info("successfully parsed and storing...")
-
-                club_id = self.db.get_club_by_instagram_handle(username)
-                self.store_parsed_info(parsed_info, post_id, club_id)
-                logger.info("successfully stored.")
+                # Captions with no date, time or event cues skip the LLM
+                predicted, shadow = self.prefilter.check(caption)
+                if not predicted and not shadow:
+                    logger.info(f"post {post_id} has no event cues, marking as parsed")
+                    self.store_parsed_info(
+                        [], post_id, club_id, flush=False, from_llm=False
+                    )
+                    continue
+                decisions[post_id] = (predicted, shadow)
+                posts.append((post_id, post_date, caption))
+
+            if not posts:
+                return
+            batches = list(self.pack_batches(posts, max(1, batch_size)))
+
+            with ThreadPoolExecutor(
+                max_workers=max(1, min(max_workers, len(batches))),
+                thread_name_prefix="post-parser",
+            ) as executor:
+                futures = [
+                    executor.submit(self.parse_posts_batch, batch) for batch in batches
+                ]
+                for future in as_completed(futures):
+                    try:
+                        parsed_posts = future.result()
+                    except Exception as e:
+                        logger.error(f"Error parsing batch of posts: {e}")
+                        continue
+
+                    for post_id, parsed_info in parsed_posts.items():
+                        try:
+                            logger.info(
+                                f"successfully parsed post {post_id}, storing..."
+                            )
+                            self.store_parsed_info(
+                                parsed_info, post_id, club_id, flush=False
+                            )
+                            logger.info("successfully stored.")
+                            self.prefilter.record_outcome(
+                                *decisions[post_id], bool(parsed_info)
+                            )
+                        except Exception as e:
+                            logger.error(f"Error storing parsed post {post_id}: {e}")
         except Exception as e:
             logger.error(f"Unexpected Error: {e}")
             logger.error(f"Error type: {type(e)}")
             import traceback
 
             logger.error(traceback.format_exc())
+        finally:
+            self.flush_writes()
+            self._dedup_index = None
+
+    def flush_writes(self):
+        """
+        Write buffered events and parsed flags in bulk.
+
+        Events go first, so a failed insert leaves its posts unparsed and they
+        are retried on the next run instead of being lost.
+        """
+        events, parsed = self._pending_events, self._pending_parsed
+        self._pending_events, self._pending_parsed = [], {}
 
-    def store_parsed_info(self, parsed_info, post_id, club_id):
+        if events:
+            try:
+                self.db.insert_events(events)
+                logger.info(f"Inserted {len(events)} events")
+            except Exception as e:
+                logger.error(f"Error inserting {len(events)} events: {e}")
+                for event in events:
+                    parsed.pop(event["post_id"], None)
+
+        if parsed:
+            try:
+                self.db.mark_posts_parsed(list(parsed), parsed)
+                logger.info(f"Marked {len(parsed)} posts as parsed")
+            except Exception as e:
+                logger.error(f"Error marking {len(parsed)} posts as parsed: {e}")
+
+    def store_parsed_info(
+        self, parsed_info, post_id, club_id, flush: bool = True, from_llm: bool = True
+    ):
         """
         Store parsed information from a post, avoiding duplicate events using enhanced matching.
+
+        New events and the post's parsed flag are buffered and written in bulk.
+
+        Args:
+            parsed_info: Events extracted from the post
+            post_id: ID of the post
+            club_id: ID of the club that posted it
+            flush: Write immediately; parse_all_posts passes False and flushes
+                once per club (or every EVENT_WRITE_BATCH_SIZE events)
+            from_llm: parsed_info is what the LLM returned. False for posts the
+                prefilter skipped, so they are not used as training labels.
         """
         if not parsed_info:
             # Mark post as parsed even if no events were extracted
-            self.db.update_post_by_id(post_id, {"parsed": True})
             logger.info(f"No events found in post {post_id}, marking as parsed")
-            return
 
-        for event in parsed_info:
+        for event in parsed_info or []:
             existing_event = self.find_similar_event(
                 event["Name"], event["Date"], club_id
             )
 
             if existing_event:
-                # Event already exists, just update the post as parsed
-                self.db.update_post_by_id(post_id, {"parsed": True})
+                # Event already exists, the post is just marked as parsed
                 logger.info(
                     f"Similar event '{existing_event['name']}' found, linking post to it."
                 )
@@ -376,13 +719,21 @@ class EventParser:
                     "parsed": event,
                 }
 
-                # Insert the event
-                new_event = self.db.insert_event(event_data)
-
-                # Update the post as parsed
-                self.db.update_post_by_id(post_id, {"parsed": True})
-
-                logger.info(f"Inserted new event: {event['Name']}")
+                # Store the name embedding so later dedup checks never re-embed it
+                # (already cached from find_similar_event, so no extra API call)
+                name_embedding = self.get_embedding(event["Name"])
+                if name_embedding:
+                    event_data["name_embedding"] = name_embedding
+
+                self._pending_events.append(event_data)
+                if self._dedup_index is not None:
+                    self._dedup_index.add(event_data)
+                logger.info(f"Queued new event: {event['Name']}")
+
+        # The LLM's own count, before merging into existing events
+        self._pending_parsed[post_id] = len(parsed_info or []) if from_llm else None
+        if flush or len(self._pending_events) >= EVENT_WRITE_BATCH_SIZE:
+            self.flush_writes()
 
     def safe_int(self, value, default=0):
         """Convert value safely to integer, handling numeric strings and simple words like 'one'."""
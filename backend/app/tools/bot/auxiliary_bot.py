@@ -2,7 +2,6 @@ import os
 import sys
 import discord
 import redis
-import json
 import time
 import datetime
 import requests
@@ -18,6 +17,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.
 
 # Import custom modules
 from tools.logger import logger
+from tools import serialization
 from db.queries import SupabaseQueries
 
 # Load environment variables
@@ -66,6 +66,7 @@ QUEUE_KEYS = {
 
 # Notification streams
 NOTIFICATION_STREAM = "notifications"
+STREAM_MAXLEN = int(os.getenv("REDIS_STREAM_MAXLEN", "5000"))
 STATUS_STREAM = "status"
 
 # Track posted pending clubs
@@ -142,7 +143,12 @@ def publish_notification(message, data=None):
         }
         
         # Convert to JSON and add to stream
-        redis_conn.xadd(NOTIFICATION_STREAM, {"payload": json.dumps(notification)})
+        redis_conn.xadd(
+            NOTIFICATION_STREAM,
+            {"payload": serialization.dumps(notification)},
+            maxlen=STREAM_MAXLEN,
+            approximate=True
+        )
         return True
     except Exception as e:
         logger.error(f"Error publishing notification: {e}")
@@ -1144,10 +1150,7 @@ async def club_insights_cmd(ctx, instagram_handle: str):
             queue_jobs = redis_conn.zrange(QUEUE_KEYS["scraper"]["queue"], 0, -1)
             for job_json in queue_jobs:
                 try:
-                    # Handle byte strings
-                    if isinstance(job_json, bytes):
-                        job_json = job_json.decode('utf-8')
-                    job = json.loads(job_json)
+                    job = serialization.loads(job_json)
                     if job.get('instagram_handle') == instagram_handle:
                         in_queue = True
                         break
@@ -1159,10 +1162,7 @@ async def club_insights_cmd(ctx, instagram_handle: str):
             processing_jobs = redis_conn.hgetall(QUEUE_KEYS["scraper"]["processing"])
             for _, job_json in processing_jobs.items():
                 try:
-                    # Handle byte strings
-                    if isinstance(job_json, bytes):
-                        job_json = job_json.decode('utf-8')
-                    job = json.loads(job_json)
+                    job = serialization.loads(job_json)
                     if job.get('instagram_handle') == instagram_handle:
                         in_processing = True
                         break
@@ -1174,10 +1174,7 @@ async def club_insights_cmd(ctx, instagram_handle: str):
             failed_jobs = redis_conn.hgetall(QUEUE_KEYS["scraper"]["failed"])
             for _, job_json in failed_jobs.items():
                 try:
-                    # Handle byte strings
-                    if isinstance(job_json, bytes):
-                        job_json = job_json.decode('utf-8')
-                    job = json.loads(job_json)
+                    job = serialization.loads(job_json)
                     if job.get('instagram_handle') == instagram_handle:
                         in_failed = True
                         break
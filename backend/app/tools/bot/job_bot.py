@@ -2,10 +2,10 @@ import os
 import sys
 import discord
 import redis
-import json
 import time
 import datetime
 import traceback
+import socket
 from discord.ext import commands, tasks
 from dotenv import load_dotenv
 from discord import ButtonStyle
@@ -30,8 +30,14 @@ LOG_FILE_PATH = os.path.join(BASE_DIR, 'logs', 'logfile.log')
 
 # Import custom modules
 from tools.logger import logger
+from tools import serialization
+from tools.metrics import MetricsStore
+from tools.parse_cache import ParseCache
+from tools.event_prefilter import EventPrefilter
+from tools.event_clustering import update_canonical_events
+from tools.timing import aggregator as span_timings
 from db.queries import SupabaseQueries
-from redis_queue import RedisScraperQueue, QueueType
+from redis_queue import RedisScraperQueue, QueueType, STREAM_MAXLEN
 
 
 # Load environment variables
@@ -63,6 +69,14 @@ db = SupabaseQueries()
 redis_url = os.getenv('REDIS_URL')
 redis_conn = redis.from_url(redis_url)
 
+# Queue helper for retention and memory reporting
+job_queue = RedisScraperQueue()
+
+# Scraper metrics written by the rotation workers
+metrics = MetricsStore(redis_conn)
+parse_cache = ParseCache(redis_conn)
+event_prefilter = EventPrefilter(metrics)
+
 # Redis queue key names
 QUEUE_KEYS = {
     "scraper": {
@@ -206,7 +220,12 @@ def publish_notification(message, data=None):
         }
         
         # Add to stream with proper payload structure
-        redis_conn.xadd(NOTIFICATION_STREAM, {"payload": json.dumps(notification)})
+        redis_conn.xadd(
+            NOTIFICATION_STREAM,
+            {"payload": serialization.dumps(notification)},
+            maxlen=STREAM_MAXLEN,
+            approximate=True
+        )
         return True
     except Exception as e:
         logger.error(f"Error publishing notification: {e}")
@@ -254,7 +273,7 @@ def get_stalled_jobs(queue_type, timeout_seconds=1800):
         
         for job_id, job_json in all_processing.items():
             try:
-                job = json.loads(job_json)
+                job = serialization.loads(job_json)
                 processing_started = job.get('processing_started', 0)
                 
                 if current_time - processing_started > timeout_seconds:
@@ -293,7 +312,7 @@ def requeue_stalled_jobs(queue_type, timeout_seconds=1800):
                 del job['processing_started']
                 
             # Add to queue with high priority
-            redis_conn.zadd(queue_key, {json.dumps(job): -5})
+            redis_conn.zadd(queue_key, {serialization.dumps(job): -5})
             requeued_count += 1
             
             logger.warning(f"Requeued stalled {queue_type} job: {job_id} after timeout of {timeout_seconds} seconds.")
@@ -323,7 +342,7 @@ def enqueue_club(instagram_handle, priority=0):
             'attempts': 0
         }
         queue_key = QUEUE_KEYS["scraper"]["queue"]
-        redis_conn.zadd(queue_key, {json.dumps(job): priority})
+        redis_conn.zadd(queue_key, {serialization.dumps(job): priority})
         
         publish_notification(
             f"Added club {instagram_handle} to queue",
@@ -352,7 +371,7 @@ def requeue_job(queue_type, job_id):
             return False
         
         # Parse the job
-        job = json.loads(job_data)
+        job = serialization.loads(job_data)
         
         # Remove from processing
         redis_conn.hdel(processing_key, job_id)
@@ -362,7 +381,7 @@ def requeue_job(queue_type, job_id):
         if 'processing_started' in job:
             del job['processing_started']
             
-        redis_conn.zadd(queue_key, {json.dumps(job): -10})
+        redis_conn.zadd(queue_key, {serialization.dumps(job): -10})
         
         logger.info(f"Requeued {queue_type} job: {job_id}")
         publish_notification(f"Manual requeue of {queue_type} job: {job_id}")
@@ -413,45 +432,17 @@ def populate_clubs_queue(limit=40):
 
 def check_rate_limits(window_minutes=30):
     """
-    Check Redis logs for rate limit occurrences and return severity level:
+    Check scraper metrics for rate limit occurrences and return severity level:
     0 = No issues, 1 = Mild (1-2 occurrences), 2 = Severe (3+ occurrences)
     """
-    try:
-        # Fetch all logs from Redis
-        log_entries = redis_conn.lrange('log:history', 0, -1)
-        now = datetime.datetime.now()
-        count = 0
-
-        for entry in reversed(log_entries):
-            try:
-                log_str = entry.decode('utf-8')
-
-                if "Possible rate limit detected" in log_str or "RATE LIMIT DETECTED" in log_str:
-                    # Try to extract the timestamp (format: "YYYY-MM-DDTHH:MM:SS")
-                    timestamp_str = log_str.split(' - ')[0]
-
-                    try:
-                        timestamp = datetime.datetime.fromisoformat(timestamp_str)
-                        if (now - timestamp).total_seconds() <= window_minutes * 60:
-                            count += 1
-                        else:
-                            break  # If the log is older than the window, stop checking
-                    except Exception:
-                        continue  # Skip if timestamp parse fails
-
-            except Exception:
-                continue  # Skip malformed logs
-
-        if count >= 3:
-            return 2  # Severe
-        elif count >= 1:
-            return 1  # Mild
-        else:
-            return 0  # No issues
+    count = metrics.count("rate_limit_hits", window_minutes * 60)
 
-    except Exception as e:
-        logger.error(f"Error checking for rate limits in Redis: {e}")
-        return 0
+    if count >= 3:
+        return 2  # Severe
+    elif count >= 1:
+        return 1  # Mild
+    else:
+        return 0  # No issues
 
 # Check if user has admin role
 def is_admin():
@@ -489,6 +480,7 @@ async def on_ready():
     nightly_summary_check.start()
     clean_old_logs.start()
     requeue_stalled_task.start()
+    cluster_campus_events.start()
     # Add this to bot startup (on_ready event)
     monitor_system_health.start()
     logger.info("System health monitoring started")
@@ -540,7 +532,7 @@ async def passive_error_monitor():
             
             for log_entry in new_logs:
                 try:
-                    log_str = log_entry.decode('utf-8')
+                    log_str = serialization.to_text(log_entry)
                     
                     # Check for rate limits
                     if "RATE LIMIT DETECTED" in log_str:
@@ -606,7 +598,7 @@ async def monitor_and_flush_logs():
             temp_log_file_path = '/tmp/redis_logs_flush.log'
             with open(temp_log_file_path, 'w') as f:
                 for entry in log_entries:
-                    f.write(entry.decode('utf-8') + '\n')
+                    f.write(serialization.to_text(entry) + '\n')
             
             # Send to Discord
             await send_error(
@@ -659,6 +651,17 @@ async def requeue_stalled_task():
         logger.error(f"Error in requeue_stalled_task: {e}")
 
 
+@tasks.loop(minutes=30)
+async def cluster_campus_events():
+    """Link co-hosted events across clubs so campus-wide results show each once 🤝✨"""
+    try:
+        changed = await asyncio.to_thread(update_canonical_events, db)
+        if changed:
+            logger.info(f"Linked {changed} co-hosted events to their canonical events")
+    except Exception as e:
+        logger.error(f"Error in cluster_campus_events: {e}")
+
+
 @tasks.loop(hours=24)
 async def nightly_summary_check():
     """Post system summary once a day at midnight 🌙✨"""
@@ -884,7 +887,7 @@ async def emergency_requeue_cmd(ctx):
                     scraper_requeued = 0
                     
                     for job_id, job_json in scraper_processing.items():
-                        job = json.loads(job_json)
+                        job = serialization.loads(job_json)
                         instagram_handle = job['instagram_handle']
                         
                         # Requeue with high priority
@@ -893,7 +896,7 @@ async def emergency_requeue_cmd(ctx):
                             'enqueued_at': time.time(),
                             'attempts': job.get('attempts', 0) + 1
                         }
-                        redis_conn.zadd(QUEUE_KEYS["scraper"]["queue"], {json.dumps(new_job): -10})
+                        redis_conn.zadd(QUEUE_KEYS["scraper"]["queue"], {serialization.dumps(new_job): -10})
                         redis_conn.hdel(QUEUE_KEYS["scraper"]["processing"], job_id)
                         scraper_requeued += 1
                     
@@ -902,7 +905,7 @@ async def emergency_requeue_cmd(ctx):
                     event_requeued = 0
                     
                     for job_id, job_json in event_processing.items():
-                        job = json.loads(job_json)
+                        job = serialization.loads(job_json)
                         instagram_handle = job['instagram_handle']
                         
                         # Requeue with high priority
@@ -911,7 +914,7 @@ async def emergency_requeue_cmd(ctx):
                             'enqueued_at': time.time(),
                             'attempts': job.get('attempts', 0) + 1
                         }
-                        redis_conn.zadd(QUEUE_KEYS["event"]["queue"], {json.dumps(new_job): -10})
+                        redis_conn.zadd(QUEUE_KEYS["event"]["queue"], {serialization.dumps(new_job): -10})
                         redis_conn.hdel(QUEUE_KEYS["event"]["processing"], job_id)
                         event_requeued += 1
                     
@@ -972,7 +975,7 @@ async def get_logs_cmd(ctx, count: int = 50):
         temp_log_path = '/tmp/current_redis_logs.log'
         with open(temp_log_path, 'w') as f:
             for entry in log_entries:
-                f.write(entry.decode('utf-8') + '\n')
+                f.write(serialization.to_text(entry) + '\n')
         
         await ctx.send(
             content=f"here's the latest **{min(count, len(log_entries))} logs** u asked forrr 📝💖",
@@ -1001,7 +1004,7 @@ async def last_errors_cmd(ctx, count: int = 10):
         # Filter error logs
         error_logs = []
         for entry in log_entries:
-            log_str = entry.decode('utf-8')
+            log_str = serialization.to_text(entry)
             if " ERROR " in log_str or "[RATE LIMIT DETECTED]" in log_str:
                 error_logs.append(log_str)
         
@@ -1092,7 +1095,7 @@ async def pretty_log_cmd(ctx, count: int = 20):
         formatted_logs = []
         for entry in log_entries:
             try:
-                log_data = json.loads(entry.decode('utf-8'))
+                log_data = serialization.loads(entry)
                 timestamp = log_data.get('timestamp', 'Unknown time')
                 level = log_data.get('level', 'INFO')
                 message = log_data.get('message', 'No message')
@@ -1137,62 +1140,30 @@ async def scrape_info_cmd(ctx, hours: int = 1):
             await ctx.send("⏰ please choose between 1 and 48 hours, hun!")
             return
         
-        # Get logs from Redis
-        log_entries = redis_conn.lrange('logs:entries', 0, -1)
-        
-        # Set time threshold
         now = datetime.datetime.now()
-        time_threshold = now - datetime.timedelta(hours=hours)
+        window_seconds = hours * 3600
         
-        # Initialize counters
+        # Read the pre-aggregated scraper metrics for the window
+        counts = metrics.counts(
+            ["clubs_processed", "scrape_success", "scrape_failed", "rate_limit_hits"],
+            window_seconds
+        )
         stats = {
-            "total_clubs_processed": 0,
-            "successful_scrapes": 0,
-            "failed_scrapes": 0,
-            "rate_limits": 0,
-            "processed_clubs": set(),
-            "errors": []
+            "total_clubs_processed": counts["clubs_processed"],
+            "successful_scrapes": counts["scrape_success"],
+            "failed_scrapes": counts["scrape_failed"],
+            "rate_limits": counts["rate_limit_hits"],
+            "processed_clubs": metrics.members("clubs_processed", window_seconds),
+            "errors": [
+                f"{event.get('instagram_handle')}: {event.get('error', '')[:100]}"
+                for event in metrics.recent_events("scrape_errors", window_seconds)
+            ],
         }
+        scrape_time = metrics.histogram("scrape_duration", window_seconds)
+        event_counts = metrics.counts(["event_jobs_success", "event_jobs_failed"], window_seconds)
+        parse_stats = parse_cache.hit_rate(window_seconds)
+        prefilter_stats = event_prefilter.report(window_seconds)
         
-        # Process logs
-        for entry in log_entries:
-            try:
-                log_data = json.loads(entry.decode('utf-8'))
-                timestamp = log_data.get('timestamp')
-                message = log_data.get('message', '')
-                level = log_data.get('level', '')
-                
-                # Parse timestamp
-                log_time = datetime.datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                
-                # Skip if older than threshold
-                if log_time < time_threshold:
-                    continue
-                    
-                # Count club processing
-                if "Processing club" in message:
-                    club = message.split("Processing club ")[1].strip().rstrip('.')
-                    stats["processed_clubs"].add(club)
-                    stats["total_clubs_processed"] += 1
-                
-                # Count successful scrapes
-                if "Successfully scraped" in message:
-                    stats["successful_scrapes"] += 1
-                    
-                # Count failures
-                if level == "ERROR" and "club" in message.lower():
-                    stats["failed_scrapes"] += 1
-                    # Store error details (limited to 5)
-                    if len(stats["errors"]) < 5:
-                        stats["errors"].append(message[:100] + "..." if len(message) > 100 else message)
-                
-                # Count rate limits
-                if "rate limit" in message.lower():
-                    stats["rate_limits"] += 1
-                    
-            except Exception:
-                continue
-                
         # Create embed
         embed = discord.Embed(
             title=f"📊 Scraping Stats (Last {hours} hours)",
@@ -1213,6 +1184,33 @@ async def scrape_info_cmd(ctx, hours: int = 1):
             inline=False
         )
         
+        if scrape_time["count"]:
+            embed.add_field(
+                name="⏱️ Scrape Duration",
+                value=(
+                    f"➔ Average: **{scrape_time['mean']:.1f}s**\n"
+                    f"➔ p50: **≤{scrape_time['p50']:g}s** · p95: **≤{scrape_time['p95']:g}s**"
+                ),
+                inline=False
+            )
+        
+        if event_counts["event_jobs_success"] or event_counts["event_jobs_failed"]:
+            parse_lookups = parse_stats["exact"] + parse_stats["near"] + parse_stats["miss"]
+            precision = prefilter_stats["precision"]
+            recall = prefilter_stats["recall"]
+            embed.add_field(
+                name="🧠 Event Parsing",
+                value=(
+                    f"➔ Event jobs: **{event_counts['event_jobs_success']}** ok · **{event_counts['event_jobs_failed']}** failed\n"
+                    f"➔ Parse cache hit rate: **{parse_stats['hit_rate']:.0%}** of {parse_lookups} posts "
+                    f"({parse_stats['exact']} exact, {parse_stats['near']} near-duplicate)\n"
+                    f"➔ Prefilter skipped: **{prefilter_stats['skipped']}** posts · "
+                    f"precision **{'n/a' if precision is None else f'{precision:.0%}'}** · "
+                    f"est. recall **{'n/a' if recall is None else f'{recall:.0%}'}**"
+                ),
+                inline=False
+            )
+        
         if stats["processed_clubs"]:
             # Show some of the clubs (max 10)
             club_list = list(stats["processed_clubs"])
@@ -1467,7 +1465,7 @@ async def list_failed_cmd(ctx):
     embed = discord.Embed(title="💥 Failed Clubs", color=0xED4245)
 
     for idx, (job_id, job_data) in enumerate(failed_jobs.items(), start=1):
-        job = json.loads(job_data)
+        job = serialization.loads(job_data)
         error = job.get("error", "unknown error")
         embed.add_field(
             name=f"{idx}. {job_id.decode() if isinstance(job_id, bytes) else job_id}",
@@ -1522,12 +1520,95 @@ async def revive_club_cmd(ctx, instagram_handle: str):
         await ctx.send(f"💔 umm `{instagram_handle}` isn't in failed list...")
         return
 
-    job = json.loads(job_json)
+    job = serialization.loads(job_json)
     redis_conn.hdel(QUEUE_KEYS["scraper"]["failed"], instagram_handle)
-    redis_conn.zadd(QUEUE_KEYS["scraper"]["queue"], {json.dumps(job): 0})
+    redis_conn.zadd(QUEUE_KEYS["scraper"]["queue"], {serialization.dumps(job): 0})
 
     await ctx.send(f"✨ revived `{instagram_handle}` back into the queue! she's gonna try again fr 🏃‍♀️")
 
+@job_bot.command(name="spans")
+async def spans_cmd(ctx, minutes: int = 60):
+    """Show per-span latency percentiles for the scrape → parse → calendar pipeline"""
+    try:
+        if minutes <= 0 or minutes > 48 * 60:
+            await ctx.send("⏰ pick between 1 minute and 48 hours (2880 min) pls!")
+            return
+
+        spans = await asyncio.to_thread(span_timings.summary, minutes * 60)
+        if not spans:
+            await ctx.send(f"🤷‍♀️ no span timings in the last {minutes} min... is anything running?")
+            return
+
+        # Spans that eat the most total time first
+        ranked = sorted(spans.items(), key=lambda item: item[1]["sum"], reverse=True)
+
+        embed = discord.Embed(
+            title=f"⏱️ where the time goes (last {minutes} min)",
+            description="p50 / p95 / p99 are bucket upper bounds 💅",
+            color=0x3498DB,
+            timestamp=datetime.datetime.now()
+        )
+        for name, stats in ranked[:25]:
+            embed.add_field(
+                name=name,
+                value=(
+                    f"`{stats['count']}` calls · avg `{stats['mean'] * 1000:.0f}ms`\n"
+                    f"p50 `{stats['p50'] * 1000:.0f}ms` · p95 `{stats['p95'] * 1000:.0f}ms` · p99 `{stats['p99'] * 1000:.0f}ms`"
+                ),
+                inline=False
+            )
+        await ctx.send(embed=embed)
+
+    except Exception as e:
+        logger.error(f"Error in spans command: {e}")
+        await ctx.send(f"🥺 couldn't read span timings: {e}")
+
+@job_bot.command(name="redismem")
+async def redis_memory_cmd(ctx, top: int = 10):
+    """Show Redis memory usage per key family"""
+    try:
+        report = await asyncio.to_thread(job_queue.get_memory_report)
+        if "error" in report:
+            await ctx.send(f"🥺 couldn't read redis memory... 👉 {report['error']}")
+            return
+
+        embed = discord.Embed(
+            title="🧠 redis memory check",
+            description=(
+                f"using **{report['used_memory_human']}** across "
+                f"`{report['keys_scanned']}` keys"
+                + (" (sampled)" if report["truncated"] else "")
+            ),
+            color=0x9B59B6,
+            timestamp=datetime.datetime.now()
+        )
+
+        for family, usage in list(report["families"].items())[:top]:
+            embed.add_field(
+                name=family,
+                value=f"`{usage['bytes'] / 1024:.1f} KB` in `{usage['keys']}` keys",
+                inline=True
+            )
+
+        embed.set_footer(text="use !trimredis to apply retention limits now 🧹")
+        await ctx.send(embed=embed)
+
+    except Exception as e:
+        logger.error(f"Error in redismem command: {e}")
+        await ctx.send(f"🥺 oops, memory report broke: {e}")
+
+@job_bot.command(name="trimredis")
+@is_admin()
+async def trim_redis_cmd(ctx):
+    """Apply retention limits to Redis streams and job history"""
+    try:
+        summary = await asyncio.to_thread(job_queue.apply_retention)
+        lines = "\n".join(f"➔ {name.replace('_', ' ')}: `{count}`" for name, count in summary.items())
+        await ctx.send(f"🧹 redis is lighter now bestie ✨\n{lines}")
+    except Exception as e:
+        logger.error(f"Error in trimredis command: {e}")
+        await ctx.send(f"💔 couldn't trim redis: {e}")
+
 @job_bot.command(name="cleanup")
 @is_admin()
 async def cleanup_cmd(ctx):
@@ -1766,6 +1847,21 @@ async def help_cmd(ctx):
             value="📊 get stats about recent scraping activity (default: last hour)",
             inline=False
         )
+        embed.add_field(
+            name="!spans [minutes]",
+            value="⏱️ latency percentiles for login, scraping, parsing, calendars + supabase calls",
+            inline=False
+        )
+        embed.add_field(
+            name="!redismem [top]",
+            value="🧠 see which redis keys are eating all the memory",
+            inline=False
+        )
+        embed.add_field(
+            name="!trimredis",
+            value="🧹 trim streams + old job history right now (admin only)",
+            inline=False
+        )
         embed.add_field(
             name="!silence [minutes]",
             value="🔕 shush notifications during scraping (default: 30 min)",
@@ -1789,44 +1885,45 @@ health_history = {
     "cpu_percent": deque(maxlen=60),
     "memory_percent": deque(maxlen=60),
     "disk_percent": deque(maxlen=60),
-    "process_memory_mb": deque(maxlen=60),
-    "last_health_id": "0"
+    "process_memory_mb": deque(maxlen=60)
 }
 
+# Consumer group for the health stream, so restarts resume where they left off
+HEALTH_GROUP = "job_bot"
+HEALTH_CONSUMER = f"{socket.gethostname()}:{os.getpid()}"
+
 # Create a new background task for reading health metrics
 @tasks.loop(seconds=30)
 async def monitor_system_health():
     """Background task to monitor system health metrics from Redis stream"""
     try:
-        # Read latest health metrics using the correct method
-        health_metrics = redis_conn.xread({HEALTH_STREAM: health_history["last_health_id"]}, count=10)
+        # Read a batch of health metrics through the consumer group
+        entries = job_queue.consume_stream(HEALTH_STREAM, HEALTH_GROUP, HEALTH_CONSUMER, count=10)
         
-        if not health_metrics:
+        if not entries:
             return
         
-        # Process the stream results correctly
-        for stream_name, messages in health_metrics:
-            for msg_id, msg_data in messages:
-                try:
-                    # Update last ID
-                    health_history["last_health_id"] = msg_id.decode()
-                    
-                    # Parse the payload correctly
-                    data = json.loads(msg_data[b"payload"])  # ✅ Fixed parsing
-                    
-                    # Add to history
-                    timestamp = datetime.datetime.fromisoformat(data.get("timestamp", "")).strftime("%H:%M:%S")
-                    health_history["timestamps"].append(timestamp)
-                    health_history["cpu_percent"].append(data.get("cpu", {}).get("percent", 0))
-                    health_history["memory_percent"].append(data.get("memory", {}).get("percent", 0))
-                    health_history["disk_percent"].append(data.get("disk", {}).get("percent", 0))
-                    health_history["process_memory_mb"].append(data.get("process", {}).get("memory_rss_mb", 0))
-                    
-                    # Check for critical alerts
-                    await process_alerts(data)
-                    
-                except Exception as e:
-                    logger.error(f"Error processing health metric: {e}")
+        for entry in entries:
+            try:
+                data = entry["payload"]
+                if not data:
+                    continue
+                
+                # Add to history
+                timestamp = datetime.datetime.fromisoformat(data.get("timestamp", "")).strftime("%H:%M:%S")
+                health_history["timestamps"].append(timestamp)
+                health_history["cpu_percent"].append(data.get("cpu", {}).get("percent", 0))
+                health_history["memory_percent"].append(data.get("memory", {}).get("percent", 0))
+                health_history["disk_percent"].append(data.get("disk", {}).get("percent", 0))
+                health_history["process_memory_mb"].append(data.get("process", {}).get("memory_rss_mb", 0))
+                
+                # Check for critical alerts
+                await process_alerts(data)
+                
+            except Exception as e:
+                logger.error(f"Error processing health metric: {e}")
+            finally:
+                job_queue.ack_stream(HEALTH_STREAM, HEALTH_GROUP, entry["id"])
                     
     except Exception as e:
         logger.error(f"Error monitoring system health: {e}")
@@ -1868,7 +1965,7 @@ def read_health_metrics(last_id="0", count=10):
             for stream_name, messages in results:
                 for msg_id, msg_data in messages:
                     try:
-                        payload = json.loads(msg_data[b"payload"])
+                        payload = serialization.loads(msg_data[b"payload"])
                         metrics.append({
                             "id": msg_id.decode(),
                             "payload": payload
@@ -1,57 +1,28 @@
 import os
 import sys
-import uuid
-from datetime import datetime, timedelta
 import pytz
-from typing import Optional, List, Dict
-from ics import Calendar, Event
+from typing import Optional, List, Dict, Iterator
+import hashlib
+import json
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from db.queries import SupabaseQueries
+from tools.resources import resources
 from tools.logger import logger
-import re
-
-def parse_duration_string(duration_str: str) -> timedelta:
-    """
-    Parses Supabase/Postgres INTERVAL string into timedelta.
-    Supports formats like '2 days 04:30:00', '04:30:00', etc.
-    """
-    if not duration_str:
-        return timedelta(hours=1)  # Default duration
-    
-    duration_str = duration_str.strip().lower()
-    
-    # Case: "2 days 04:30:00"
-    if 'day' in duration_str:
-        day_match = re.search(r'(\d+)\s*day', duration_str)
-        time_match = re.search(r'(\d+):(\d+):(\d+)', duration_str)
-        days = int(day_match.group(1)) if day_match else 0
-        if time_match:
-            hours, minutes, seconds = map(int, time_match.groups())
-        else:
-            hours = minutes = seconds = 0
-        return timedelta(days=days, hours=hours, minutes=minutes, seconds=seconds)
-    
-    # Case: "04:30:00"
-    time_match = re.search(r'(\d+):(\d+):(\d+)', duration_str)
-    if time_match:
-        hours, minutes, seconds = map(int, time_match.groups())
-        return timedelta(hours=hours, minutes=minutes, seconds=seconds)
+from tools.timing import timed
+from tools import ics_writer
 
-    # Fallback if somehow it's just "45m" etc.
-    h_match = re.search(r'(\d+)h', duration_str)
-    m_match = re.search(r'(\d+)m', duration_str)
+# Bump when the VEVENT output changes so cached blocks and hashes are invalidated
+CALENDAR_FORMAT_VERSION = "2"
+VEVENT_CACHE_TTL_SECONDS = int(os.getenv("VEVENT_CACHE_TTL_DAYS", "30")) * 86400
 
-    hours = int(h_match.group(1)) if h_match else 0
-    minutes = int(m_match.group(1)) if m_match else 0
-
-    return timedelta(hours=hours, minutes=minutes)
+# Fields that affect an event's VEVENT block
+_EVENT_FIELDS = ("id", "name", "date", "details", "duration", "location", "url", "uid", "created_at")
 
 
 class CalendarConnection:
     def __init__(self):
         """Initialize the CalendarConnection with Supabase client"""
-        self.supabase = SupabaseQueries()
+        self.supabase = resources.db
         # Default timezone if none is specified for the club
         self.default_timezone = pytz.timezone('America/Los_Angeles')
         logger.info("Initialized CalendarConnection.")
@@ -73,10 +44,72 @@ class CalendarConnection:
             logger.warning(f"Unknown timezone {tz_name}, using default")
             return self.default_timezone
 
-    def create_calendar_file(self, username: str) -> Optional[str]:
+    @staticmethod
+    def event_fingerprint(db_event: Dict, club_timezone) -> str:
+        """Hash of everything that goes into an event's VEVENT block"""
+        fields = {field: db_event.get(field) for field in _EVENT_FIELDS}
+        raw = json.dumps([CALENDAR_FORMAT_VERSION, str(club_timezone), fields], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _vevent_blocks(self, events: List[Dict], fingerprints: List[str], club_timezone) -> List[str]:
+        """
+        Serialized VEVENT blocks for the events, reusing cached blocks.
+
+        Blocks are cached in Redis by fingerprint, so only new or edited
+        events are serialized. Redis errors fall back to serializing every
+        block.
+        """
+        keys = [f"calendar:vevent:{fingerprint}" for fingerprint in fingerprints]
+        try:
+            cached = resources.redis.mget(keys) if keys else []
+        except Exception as e:
+            logger.error(f"Error reading cached calendar events: {e}")
+            cached = [None] * len(keys)
+
+        blocks, fresh = [], {}
+        for db_event, key, block in zip(events, keys, cached):
+            if block is not None:
+                blocks.append(block.decode("utf-8") if isinstance(block, bytes) else block)
+                continue
+            try:
+                block = ics_writer.vevent(db_event, club_timezone)
+            except Exception as e:
+                logger.error(f"Error while adding event {db_event.get('id', 'unknown id')}: {e}")
+                continue
+            if block is None:
+                continue
+            blocks.append(block)
+            fresh[key] = block
+
+        if fresh:
+            try:
+                pipe = resources.redis.pipeline(transaction=False)
+                for key, block in fresh.items():
+                    pipe.set(key, block, ex=VEVENT_CACHE_TTL_SECONDS)
+                pipe.execute()
+            except Exception as e:
+                logger.error(f"Error caching calendar events: {e}")
+
+        logger.info(f"Serialized {len(blocks)} events ({len(fresh)} rebuilt, {len(blocks) - len(fresh)} reused)")
+        return blocks
+
+    @timed("calendar.create_calendar_file")
+    def create_calendar_file(self, username: str, incremental: bool = True) -> Optional[str]:
         """
         Create or update a calendar file for a club based on its username.
         Properly handles timezones for consistent event times.
+
+        In incremental mode the calendar is rebuilt only when the club's events
+        changed (tracked by a hash of the event fingerprints), unchanged events
+        reuse their cached VEVENT blocks, and the stored file is not rewritten
+        when the output is byte-identical.
+
+        Args:
+            username: Instagram handle of the club
+            incremental: Skip unchanged work; False always rebuilds and saves
+
+        Returns:
+            Optional[str]: ID of the calendar file, or None on failure
         """
         logger.info(f"Starting calendar creation for club: {username}")
         
@@ -96,130 +129,74 @@ class CalendarConnection:
         club_timezone = self._get_club_timezone(club_data)
         logger.info(f"Using timezone {club_timezone} for club {username}")
         
-        calendar = Calendar()
-        
         try:
-            events = self.supabase.get_events_for_club(club_id)
+            events = self.supabase.get_calendar_events(club_id)
             logger.info(f"Fetched {len(events)} events for club '{username}'.")
         except Exception as e:
             logger.error(f"Error fetching events for {username}: {e}")
             return None
-        
+
+        # Stable order so identical events always produce identical output
+        events.sort(key=lambda e: (str(e.get("date") or ""), str(e.get("id") or "")))
+        fingerprints = [self.event_fingerprint(event, club_timezone) for event in events]
+        events_hash = hashlib.sha256("\n".join(fingerprints).encode("utf-8")).hexdigest()
+
+        stored = self.supabase.get_calendar_file_hashes(club_id) if incremental else None
+        if stored and stored.get("events_hash") == events_hash:
+            logger.info(f"Events unchanged for '{username}', keeping existing calendar")
+            return stored["id"]
+
         if not events:
             logger.warning(f"No events found for club '{username}'. Creating empty calendar.")
-            return self.supabase.save_calendar_file(club_id, str(calendar))
-        
-        # Process each event
-        
 
-        for db_event in events:
-            try:
-                event_name = db_event.get('name', 'Unnamed Event')
-                logger.info(f"Adding event: {event_name}")
-                
-                new_event = Event()
-                new_event.name = event_name
-                
-                # Convert string date to datetime with proper timezone
-                event_date = db_event.get("date")
-                if not event_date:
-                    logger.warning(f"Event {event_name} has no date, skipping")
-                    continue
-                    
-                # Handle date string conversion
-                if isinstance(event_date, str):
-                    try:
-                        # Try to parse with timezone info
-                        if 'Z' in event_date:
-                            # UTC date
-                            utc_date = datetime.fromisoformat(event_date.replace('Z', '+00:00'))
-                            # Convert to club's timezone
-                            event_date = utc_date.astimezone(club_timezone)
-                        elif '+' in event_date or '-' in event_date and 'T' in event_date:
-                            # Already has timezone info
-                            event_date = datetime.fromisoformat(event_date)
-                        else:
-                            # No timezone info, assume club's timezone
-                            naive_date = datetime.fromisoformat(event_date)
-                            event_date = club_timezone.localize(naive_date)
-                    except ValueError:
-                        # Fallback for other date formats
-                        logger.warning(f"Could not parse date {event_date} for event {event_name}, using current date")
-                        event_date = club_timezone.localize(datetime.now())
-                
-                # Ensure event date has timezone info
-                if event_date.tzinfo is None:
-                    event_date = club_timezone.localize(event_date)
-                
-                new_event.begin = event_date
-                
-                # Handle duration with better error handling
-                if db_event.get("duration"):
-                    try:
-                        duration = parse_duration_string(db_event["duration"])
-                        new_event.duration = duration
-                        logger.info(f"Set duration for event '{event_name}' to {duration} from '{db_event['duration']}'")
-                    except Exception as e:
-                        logger.warning(f"Could not parse duration '{db_event['duration']}' for event '{event_name}': {e}")
-                        # Default fallback if parsing fails
-                        new_event.duration = timedelta(hours=1)
-                        logger.info(f"Defaulted to 1 hour duration for '{event_name}'")
-                else:
-                    # No duration provided at all → safe fallback
-                    new_event.duration = timedelta(hours=1)
-                    logger.info(f"No duration provided for '{event_name}', defaulted to 1 hour")
-
-                # Add additional details
-                if db_event.get("details"):
-                    new_event.description = db_event["details"]
-                
-                # Add location if available
-                if db_event.get("location"):
-                    new_event.location = db_event["location"]
-                    
-                # Add URL if available
-                if db_event.get("url"):
-                    new_event.url = db_event["url"]
-                
-                # Generate UID for the event if not already set
-                new_event.uid = db_event.get("uid") or str(uuid.uuid4())
-                
-                calendar.events.add(new_event)
-                logger.info(f"Successfully added event '{event_name}'")
-                
-            except Exception as e:
-                logger.error(f"Error while adding event {db_event.get('id', 'unknown id')}: {e}")
-                continue
+        ics_content = ics_writer.assemble_calendar(self._vevent_blocks(events, fingerprints, club_timezone))
+        content_hash = hashlib.sha256(ics_content.encode("utf-8")).hexdigest()
 
         # Save the full calendar
         try:
-            ics_content = str(calendar)
-            calendar_id = self.supabase.save_calendar_file(club_id, ics_content)
-            logger.info(f"Calendar file successfully created/updated for '{username}' with {len(calendar.events)} events")
+            if stored and stored.get("content_hash") == content_hash:
+                self.supabase.update_calendar_file_hashes(stored["id"], events_hash, content_hash)
+                logger.info(f"Calendar output unchanged for '{username}', skipped rewrite")
+                return stored["id"]
+
+            calendar_id = self.supabase.save_calendar_file(club_id, ics_content, events_hash, content_hash)
+            logger.info(f"Calendar file successfully created/updated for '{username}' with {len(events)} events")
             return calendar_id
         except Exception as e:
             logger.error(f"Error saving calendar for {username}: {e}")
             return None
 
-    def get_calendar_for_club(self, club_id: str) -> Optional[Calendar]:
+    def get_calendar_for_club(self, club_id: str) -> Optional[str]:
         """
-        Get the calendar object for a club
+        Get the stored ICS content for a club, without parsing it into objects
         """
-        logger.info(f"Fetching calendar for club ID: {club_id}")
-        
         try:
             ics_content = self.supabase.get_calendar_file(club_id)
-            if ics_content:
-                calendar = Calendar(ics_content)
-                logger.info(f"Successfully parsed calendar for club ID: {club_id}")
-                return calendar
-            else:
+            if not ics_content:
                 logger.warning(f"No calendar file found for club ID: {club_id}")
-                return None
+            return ics_content
         except Exception as e:
-            logger.error(f"Error parsing calendar file for club {club_id}: {e}")
+            logger.error(f"Error fetching calendar file for club {club_id}: {e}")
             return None
 
+    def stream_club_calendar(self, club_data: Dict, events: List[Dict]) -> Iterator[str]:
+        """
+        Build a club's calendar straight from its event rows, piece by piece.
+
+        Used to serve a calendar that has not been generated yet. The caller
+        fetches the events first (see get_calendar_events), so a failed query
+        becomes an error response instead of a truncated file.
+
+        Args:
+            club_data: Club row with id (and optionally timezone)
+            events: The club's event rows
+
+        Yields:
+            str: Calendar text chunks
+        """
+        events = sorted(events, key=lambda e: (str(e.get("date") or ""), str(e.get("id") or "")))
+        yield from ics_writer.stream_calendar(events, self._get_club_timezone(club_data))
+
 if __name__ == "__main__":
 
 
@@ -0,0 +1,159 @@
+import os
+import sys
+import array
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+import redis
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from tools.logger import logger
+from tools.prometheus import record_cache
+
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "2048"))
+EMBEDDING_CACHE_TTL_DAYS = int(os.getenv("EMBEDDING_CACHE_TTL_DAYS", "30"))
+
+
+class EmbeddingCache:
+    """
+    Two-level cache for text embeddings: an in-process LRU in front of Redis.
+
+    Entries are keyed by a SHA-256 of the model name and the normalized text,
+    so "Coding " and "coding" share an entry and switching models never
+    returns stale vectors. Redis stores vectors as packed float32, which is
+    about a quarter of the size of JSON and is shared by every API worker.
+    """
+
+    def __init__(
+        self,
+        redis_client: Optional[redis.Redis] = None,
+        max_entries: int = EMBEDDING_CACHE_SIZE,
+        ttl_seconds: int = EMBEDDING_CACHE_TTL_DAYS * 86400,
+        prefix: str = "embedding",
+    ):
+        """
+        Args:
+            redis_client: Redis client to use. Defaults to a client for REDIS_URL.
+            max_entries: Embeddings kept in the in-process LRU
+            ttl_seconds: Expiry of Redis entries
+            prefix: Redis key prefix
+        """
+        self._redis = redis_client
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def redis(self) -> redis.Redis:
+        if self._redis is None:
+            self._redis = redis.from_url(
+                os.getenv("REDIS_URL", "redis://localhost:6379")
+            )
+        return self._redis
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Unicode-normalize, lowercase and collapse whitespace"""
+        return " ".join(unicodedata.normalize("NFKC", text).lower().split())
+
+    def key(self, model: str, text: str) -> str:
+        digest = hashlib.sha256(
+            f"{model}\n{self.normalize(text)}".encode("utf-8")
+        ).hexdigest()
+        return f"{self.prefix}:{digest}"
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        """
+        Look up an embedding, promoting Redis hits into the in-process LRU
+
+        Args:
+            model: Embedding model name
+            text: Text that was embedded
+
+        Returns:
+            Optional[List[float]]: Cached embedding, or None on a miss
+        """
+        key = self.key(model, text)
+        with self._lock:
+            embedding = self._memory.get(key)
+            if embedding is not None:
+                self._memory.move_to_end(key)
+        record_cache("embedding_memory", embedding is not None)
+        if embedding is not None:
+            return embedding
+
+        try:
+            raw = self.redis.get(key)
+        except Exception as e:
+            logger.error(f"Error reading embedding cache: {e}")
+            return None
+        record_cache("embedding_redis", raw is not None)
+        if raw is None:
+            return None
+
+        embedding = array.array("f", raw).tolist()
+        self._remember(key, embedding)
+        return embedding
+
+    def set(self, model: str, text: str, embedding: List[float]) -> None:
+        """
+        Store an embedding in both levels
+
+        Args:
+            model: Embedding model name
+            text: Text that was embedded
+            embedding: Embedding vector
+        """
+        key = self.key(model, text)
+        self._remember(key, embedding)
+        try:
+            self.redis.set(
+                key, array.array("f", embedding).tobytes(), ex=self.ttl_seconds
+            )
+        except Exception as e:
+            logger.error(f"Error writing embedding cache: {e}")
+
+    def get_or_compute(
+        self, model: str, text: str, compute: Callable[[str], Optional[List[float]]]
+    ) -> Optional[List[float]]:
+        """
+        Return the cached embedding or compute, cache and return it
+
+        Args:
+            model: Embedding model name
+            text: Text to embed
+            compute: Called with the text as given on a miss; may return None.
+                Only the cache key is normalized.
+
+        Returns:
+            Optional[List[float]]: Embedding, or None if compute failed
+        """
+        embedding = self.get(model, text)
+        if embedding is not None:
+            return embedding
+
+        embedding = compute(text)
+        if embedding:
+            self.set(model, text, embedding)
+        return embedding
+
+    def _remember(self, key: str, embedding: List[float]) -> None:
+        with self._lock:
+            self._memory[key] = embedding
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def clear_memory(self) -> None:
+        """Drop the in-process level (Redis entries expire on their own)"""
+        with self._lock:
+            self._memory.clear()
+
+
+# Process-wide cache shared by get_embedding and EventParser
+embedding_cache = EmbeddingCache()
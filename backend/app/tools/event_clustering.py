@@ -0,0 +1,216 @@
+import os
+import re
+import sys
+import hashlib
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from tools.logger import logger
+from tools.event_dedup import parse_event_date, trigram_similarity, trigrams
+
+# Start times further apart than this are never the same co-hosted event
+CLUSTER_TIME_WINDOW_HOURS = float(os.getenv("CLUSTER_TIME_WINDOW_HOURS", "2"))
+# Minimum combined name/details similarity for two events to be linked
+CLUSTER_SIMILARITY_THRESHOLD = float(os.getenv("CLUSTER_SIMILARITY_THRESHOLD", "0.6"))
+# Events older than this are left as they are
+CLUSTER_LOOKBACK_DAYS = int(os.getenv("CLUSTER_LOOKBACK_DAYS", "30"))
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def _words(text: str) -> frozenset:
+    return frozenset(w for w in re.findall(r"\w+", (text or "").lower()) if len(w) > 2)
+
+
+class EventClusterer:
+    """
+    Groups co-hosted events posted by different clubs.
+
+    Candidates come from MinHash LSH over name trigrams, keyed by time bucket
+    so only events starting within the time window are compared. Each
+    candidate pair from different clubs is scored by name trigram similarity,
+    blended with details word overlap when both have details, and linked when
+    the score reaches the threshold. Linked events form clusters (union-find);
+    the earliest-created event of a cluster is its canonical event.
+
+    A cluster never holds two events of the same club: within a club,
+    find_similar_event already decided they are different events.
+    """
+
+    def __init__(
+        self,
+        window_hours: float = CLUSTER_TIME_WINDOW_HOURS,
+        threshold: float = CLUSTER_SIMILARITY_THRESHOLD,
+        num_perm: int = 32,
+        bands: int = 16,
+    ):
+        """
+        Args:
+            window_hours: Maximum start time difference within a cluster
+            threshold: Minimum similarity for a link
+            num_perm: MinHash signature length
+            bands: LSH bands; more bands find more candidates
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.window = timedelta(hours=window_hours)
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+
+        rng = np.random.RandomState(7)
+        self._a = rng.randint(1, _MAX_HASH, num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, _MAX_HASH, num_perm, dtype=np.uint64)
+
+    def signature(self, grams: frozenset) -> np.ndarray:
+        """MinHash signature of a trigram set"""
+        hashes = np.array(
+            [
+                int.from_bytes(
+                    hashlib.blake2b(g.encode("utf-8"), digest_size=4).digest(), "big"
+                )
+                for g in grams
+            ]
+            or [0],
+            dtype=np.uint64,
+        )
+        permuted = (np.outer(self._a, hashes) + self._b[:, None]) % _MERSENNE_PRIME
+        return (permuted & _MAX_HASH).min(axis=1).astype(np.uint32)
+
+    def similarity(self, a: Dict, b: Dict) -> float:
+        """Name similarity, blended 70/30 with details overlap when both have details"""
+        name_sim = trigram_similarity(a["grams"], b["grams"])
+        if not a["words"] or not b["words"]:
+            return name_sim
+        details_sim = len(a["words"] & b["words"]) / len(a["words"] | b["words"])
+        return 0.7 * name_sim + 0.3 * details_sim
+
+    def cluster(self, events: List[Dict]) -> Dict[str, Optional[str]]:
+        """
+        Canonical event for every event
+
+        Args:
+            events: Rows with id, club_id, name, details, date and created_at
+
+        Returns:
+            Dict: event id -> canonical event id, or None for canonical events
+        """
+        items = []
+        for event in events:
+            date = parse_event_date(event.get("date"))
+            if date is None:
+                continue
+            items.append(
+                {
+                    "event": event,
+                    "date": date,
+                    "grams": trigrams(event.get("name", "")),
+                    "words": _words(event.get("details", "")),
+                }
+            )
+
+        # LSH tables per time bucket; a match can sit in the neighbouring bucket
+        bucket_seconds = max(1.0, self.window.total_seconds())
+        tables = defaultdict(list)
+        keys = []
+        for i, item in enumerate(items):
+            bucket = int(item["date"].timestamp() // bucket_seconds)
+            sig = self.signature(item["grams"])
+            bands = [
+                hashlib.blake2b(
+                    sig[band * self.rows : (band + 1) * self.rows].tobytes(),
+                    digest_size=8,
+                ).digest()
+                for band in range(self.bands)
+            ]
+            keys.append((bucket, bands))
+            for band, digest in enumerate(bands):
+                tables[(bucket, band, digest)].append(i)
+
+        parent = list(range(len(items)))
+        # Clubs in each cluster, keyed by its root
+        clubs = [{item["event"].get("club_id")} for item in items]
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        compared = set()
+        links = 0
+        for i, (bucket, bands) in enumerate(keys):
+            for neighbour in (bucket - 1, bucket, bucket + 1):
+                for band, digest in enumerate(bands):
+                    for j in tables.get((neighbour, band, digest), ()):
+                        if j <= i or (i, j) in compared:
+                            continue
+                        compared.add((i, j))
+                        a, b = items[i], items[j]
+                        if a["event"].get("club_id") == b["event"].get("club_id"):
+                            continue
+                        if abs(a["date"] - b["date"]) > self.window:
+                            continue
+                        if self.similarity(a, b) >= self.threshold:
+                            root_i, root_j = find(i), find(j)
+                            # Links are transitive, so refuse a merge that
+                            # would put two events of one club in a cluster
+                            if root_i != root_j and not clubs[root_i] & clubs[root_j]:
+                                parent[root_j] = root_i
+                                clubs[root_i] |= clubs[root_j]
+                                links += 1
+
+        members = defaultdict(list)
+        for i in range(len(items)):
+            members[find(i)].append(items[i]["event"])
+
+        canonical = {}
+        for group in members.values():
+            head = min(group, key=lambda e: (str(e.get("created_at") or ""), e["id"]))
+            for event in group:
+                canonical[event["id"]] = None if event is head else head["id"]
+
+        logger.info(
+            f"Clustered {len(items)} events: {len(compared)} candidate pairs, "
+            f"{links} links, {len(members)} clusters"
+        )
+        return canonical
+
+
+def update_canonical_events(db, lookback_days: int = CLUSTER_LOOKBACK_DAYS) -> int:
+    """
+    Re-cluster recent and upcoming events and store canonical_event_id
+
+    Args:
+        db: SupabaseQueries instance
+        lookback_days: Only events starting after now minus this many days
+
+    Returns:
+        int: Number of events whose canonical event changed
+    """
+    try:
+        since = datetime.now() - timedelta(days=lookback_days)
+        events = db.get_events_for_clustering(since)
+        canonical = EventClusterer().cluster(events)
+
+        # Group changed rows by their new canonical id so each group is one update
+        changes = defaultdict(list)
+        for event in events:
+            target = canonical.get(event["id"])
+            if event["id"] in canonical and event.get("canonical_event_id") != target:
+                changes[target].append(event["id"])
+
+        for target, event_ids in changes.items():
+            db.set_canonical_event(event_ids, target)
+
+        changed = sum(len(ids) for ids in changes.values())
+        logger.info(f"Updated canonical event for {changed} events")
+        return changed
+    except Exception as e:
+        logger.error(f"Error clustering campus events: {e}")
+        return 0
@@ -0,0 +1,130 @@
+import os
+import re
+import sys
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from tools.logger import logger
+
+
+def parse_event_date(date_str) -> Optional[datetime]:
+    """
+    Parse an event date from the database or the LLM.
+
+    Timezone info is dropped because events.date is a plain TIMESTAMP and
+    LLM dates are naive local times; mixing the two would make comparisons fail.
+
+    Args:
+        date_str: ISO date, "YYYY-MM-DD HH:MM:SS" or "YYYY-MM-DD"
+
+    Returns:
+        Optional[datetime]: Naive datetime, or None if it cannot be parsed
+    """
+    if isinstance(date_str, datetime):
+        return date_str.replace(tzinfo=None)
+    if not date_str:
+        return None
+    try:
+        return datetime.fromisoformat(str(date_str).replace("Z", "+00:00")).replace(
+            tzinfo=None
+        )
+    except ValueError:
+        logger.error(f"Failed to parse date: {date_str}")
+        return None
+
+
+def trigrams(text: str) -> frozenset:
+    """Character trigrams of each lowercased word, padded at word edges"""
+    grams = set()
+    for word in re.findall(r"\w+", (text or "").lower()):
+        padded = f"  {word} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+def trigram_similarity(a: frozenset, b: frozenset) -> float:
+    """Dice coefficient of two trigram sets (0-1); word order does not matter"""
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+class ClubEventIndex:
+    """
+    In-memory index of one club's events for duplicate detection.
+
+    Events are bucketed by half the matching window, so the candidates for a
+    date are the events of at most three buckets. Names are pre-split into
+    trigram sets; comparing two sets is much cheaper than SequenceMatcher and
+    tolerates reordered words ("Spring GBM" vs "GBM - Spring"). The stored
+    event dicts keep their name_embedding, so semantic scores can be computed
+    from the index without another query.
+    """
+
+    def __init__(self, club_id: str, window_hours: float = 24):
+        """
+        Args:
+            club_id: Club the events belong to
+            window_hours: Width of the time window that counts as "same time"
+        """
+        self.club_id = club_id
+        self.window = timedelta(hours=window_hours)
+        self.bucket_seconds = max(1.0, window_hours * 3600 / 2)
+        self._buckets = defaultdict(list)
+        self.size = 0
+
+    def _bucket(self, date: datetime) -> int:
+        return int(date.timestamp() // self.bucket_seconds)
+
+    def add(self, event: Dict) -> None:
+        """
+        Add an existing or newly queued event
+
+        Args:
+            event: Event row with at least name and date
+        """
+        date = parse_event_date(event.get("date"))
+        if date is None:
+            return
+        self._buckets[self._bucket(date)].append(
+            (date, trigrams(event.get("name", "")), event)
+        )
+        self.size += 1
+
+    def extend(self, events: Iterable[Dict]) -> "ClubEventIndex":
+        for event in events:
+            self.add(event)
+        return self
+
+    def candidates(self, name: str, date: datetime) -> List[Dict]:
+        """
+        Events within half the window of a date, with their scores
+
+        Args:
+            name: Name of the new event
+            date: Date of the new event
+
+        Returns:
+            List[Dict]: One dict per candidate with the event, string_sim
+            (trigram similarity) and time_sim (1 minus the time difference as
+            a share of the window), closest first
+        """
+        half = self.window / 2
+        target = trigrams(name)
+        matches = []
+        for bucket in range(self._bucket(date - half), self._bucket(date + half) + 1):
+            for event_date, grams, event in self._buckets.get(bucket, ()):
+                distance = abs(event_date - date)
+                if distance > half:
+                    continue
+                matches.append(
+                    {
+                        "event": event,
+                        "string_sim": trigram_similarity(target, grams),
+                        "time_sim": max(0.0, 1 - distance / self.window),
+                    }
+                )
+        matches.sort(key=lambda m: -m["time_sim"])
+        return matches
@@ -0,0 +1,206 @@
+import os
+import re
+import sys
+import random
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from tools.logger import logger
+from tools.metrics import MetricsStore
+
+# Posts scoring below this are marked parsed without calling the LLM. When
+# unset, a trained model's tuned threshold is used, else DEFAULT_THRESHOLD
+PREFILTER_THRESHOLD = (
+    float(os.environ["PREFILTER_THRESHOLD"])
+    if os.getenv("PREFILTER_THRESHOLD")
+    else None
+)
+DEFAULT_THRESHOLD = 0.15
+# Share of skipped posts still sent to the LLM to measure recall
+PREFILTER_SHADOW_RATE = float(os.getenv("PREFILTER_SHADOW_RATE", "0.05"))
+PREFILTER_MODEL_PATH = os.getenv(
+    "PREFILTER_MODEL_PATH",
+    os.path.join(os.path.dirname(__file__), "..", "models", "event_prefilter.npz"),
+)
+
+_MONTHS = (
+    r"jan(uary)?|feb(ruary)?|mar(ch)?|apr(il)?|may|june?|july?|aug(ust)?|"
+    r"sep(t(ember)?)?|oct(ober)?|nov(ember)?|dec(ember)?"
+)
+_WEEKDAYS = r"mon(day)?|tue(s(day)?)?|wed(nesday)?|thu(rs(day)?)?|fri(day)?|sat(urday)?|sun(day)?"
+
+# (feature name, pattern); each feature is 1.0 when the pattern occurs
+FEATURE_PATTERNS = [
+    ("month_day", rf"\b({_MONTHS})\.?\s+\d{{1,2}}(st|nd|rd|th)?\b"),
+    ("numeric_date", r"\b\d{1,2}/\d{1,2}(/\d{2,4})?\b"),
+    ("weekday", rf"\b({_WEEKDAYS})\b"),
+    ("clock_time", r"\b\d{1,2}(:\d{2})?\s*(am|pm|a\.m\.|p\.m\.)|\b\d{1,2}:\d{2}\b"),
+    (
+        "relative_day",
+        r"\b(today|tonight|tomorrow|this (week|weekend)|next (week|weekend))\b",
+    ),
+    (
+        "location",
+        r"\b(room|hall|rm|building|bldg|center|lounge|park|plaza|location|zoom|discord)\b",
+    ),
+    (
+        "invite",
+        r"\b(join us|come (out|by|join)|see you|don'?t miss|rsvp|sign ?up|register|tickets?|"
+        r"free food|pizza|boba|snacks)\b",
+    ),
+    (
+        "event_noun",
+        r"\b(meeting|gbm|general body|workshop|social|mixer|info ?session|fundraiser|"
+        r"tournament|hackathon|showcase|performance|concert|tabling|event)\b",
+    ),
+    (
+        "recap",
+        r"\b(recap|thank(s| you) (to|for)|throwback|tbt|spotlight|meet (our|the)|"
+        r"congrat(s|ulations)|was (so|a)|we had)\b",
+    ),
+]
+FEATURE_NAMES = [name for name, _ in FEATURE_PATTERNS] + ["log_length"]
+_COMPILED = [re.compile(pattern, re.IGNORECASE) for _, pattern in FEATURE_PATTERNS]
+
+# Hand-set weights used until a model is trained on our own parse outcomes
+DEFAULT_WEIGHTS = np.array(
+    [2.5, 2.0, 1.5, 2.5, 1.5, 0.8, 1.0, 1.0, -1.5, 0.2], dtype=np.float64
+)
+DEFAULT_BIAS = -3.0
+
+
+def extract_features(caption: str) -> np.ndarray:
+    """
+    Feature vector for a caption: one flag per pattern plus the log length
+
+    Args:
+        caption: Post caption
+
+    Returns:
+        np.ndarray: Features in FEATURE_NAMES order
+    """
+    caption = caption or ""
+    flags = [1.0 if regex.search(caption) else 0.0 for regex in _COMPILED]
+    return np.array(flags + [np.log1p(len(caption)) / 5], dtype=np.float64)
+
+
+class EventPrefilter:
+    """
+    Cheap local check of whether a caption announces an event.
+
+    A logistic model over date/time regexes and event/recap lexicons scores
+    each caption. Posts below the threshold skip the LLM, except for a small
+    shadow sample that is parsed anyway so recall can be measured against the
+    LLM. Weights come from scripts/train_event_prefilter.py when a trained
+    model file exists, otherwise from hand-set defaults.
+    """
+
+    def __init__(
+        self,
+        metrics: Optional[MetricsStore] = None,
+        threshold: Optional[float] = PREFILTER_THRESHOLD,
+        shadow_rate: float = PREFILTER_SHADOW_RATE,
+        model_path: str = PREFILTER_MODEL_PATH,
+    ):
+        """
+        Args:
+            metrics: Metrics store for skip and confusion counters
+            threshold: Minimum probability for a post to go to the LLM; None
+                uses the model file's tuned threshold, or DEFAULT_THRESHOLD
+            shadow_rate: Share of skipped posts sent to the LLM anyway
+            model_path: Trained weights (.npz with weights and bias)
+        """
+        self.metrics = metrics or MetricsStore()
+        self.threshold = DEFAULT_THRESHOLD
+        self.shadow_rate = shadow_rate
+        self.weights, self.bias = DEFAULT_WEIGHTS, DEFAULT_BIAS
+        self.trained = False
+
+        if model_path and os.path.exists(model_path):
+            try:
+                model = np.load(model_path)
+                if list(model["feature_names"]) == FEATURE_NAMES:
+                    self.weights = model["weights"]
+                    self.bias = float(model["bias"])
+                    self.trained = True
+                    if "threshold" in model.files:
+                        self.threshold = float(model["threshold"])
+                else:
+                    logger.warning("Event prefilter model has other features, ignoring")
+            except Exception as e:
+                logger.error(f"Error loading event prefilter model: {e}")
+
+        if threshold is not None:
+            self.threshold = threshold
+
+    def score(self, caption: str) -> float:
+        """Probability (0-1) that the caption announces at least one event"""
+        logit = float(extract_features(caption) @ self.weights + self.bias)
+        return 1.0 / (1.0 + np.exp(-logit))
+
+    def check(self, caption: str) -> Tuple[bool, bool]:
+        """
+        Decide whether a caption should be sent to the LLM
+
+        Args:
+            caption: Post caption
+
+        Returns:
+            Tuple[bool, bool]: (predicted to have events, sent as a shadow sample).
+            Send the post to the LLM when either is True.
+        """
+        predicted = bool(self.score(caption) >= self.threshold)
+        shadow = not predicted and random.random() < self.shadow_rate
+        if not predicted and not shadow:
+            self.metrics.incr("prefilter_skipped")
+        return predicted, shadow
+
+    def record_outcome(self, predicted: bool, shadow: bool, had_events: bool) -> None:
+        """
+        Compare a prefilter decision with the LLM's result
+
+        Args:
+            predicted: Prefilter decision for the post
+            shadow: Whether the post was a shadow sample of a skip
+            had_events: Whether the LLM found events
+        """
+        if predicted:
+            self.metrics.incr("prefilter_tp" if had_events else "prefilter_fp")
+        elif shadow:
+            self.metrics.incr(
+                "prefilter_shadow_fn" if had_events else "prefilter_shadow_tn"
+            )
+
+    def report(self, window_seconds: float) -> Dict[str, float]:
+        """
+        Precision, and recall estimated from the shadow sample, over a window
+
+        Returns:
+            Dict: skipped count, precision and recall (None when there is no data)
+        """
+        counts = self.metrics.counts(
+            [
+                "prefilter_skipped",
+                "prefilter_tp",
+                "prefilter_fp",
+                "prefilter_shadow_fn",
+                "prefilter_shadow_tn",
+            ],
+            window_seconds,
+        )
+        tp, fp = counts["prefilter_tp"], counts["prefilter_fp"]
+        shadow_fn = counts["prefilter_shadow_fn"]
+        shadow_total = shadow_fn + counts["prefilter_shadow_tn"]
+        skipped = counts["prefilter_skipped"]
+
+        # Scale the shadow false negatives up to every skipped post
+        estimated_fn = (
+            shadow_fn / shadow_total * (skipped + shadow_total) if shadow_total else 0.0
+        )
+        return {
+            "skipped": skipped,
+            "precision": tp / (tp + fp) if tp + fp else None,
+            "recall": tp / (tp + estimated_fn) if tp + estimated_fn else None,
+        }
@@ -0,0 +1,266 @@
+import os
+import re
+import sys
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional
+from zoneinfo import ZoneInfo
+
+import pytz
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from tools.logger import logger
+
+CRLF = "\r\n"
+PRODID = "-//Instinct//Club Calendar//EN"
+# Lines longer than this many octets are folded (RFC 5545 3.1)
+MAX_LINE_OCTETS = 75
+
+
+_ESCAPED = re.compile(r"[\\;,\r\n]")
+
+
+def escape_text(value) -> str:
+    """Escape a TEXT value: backslash, semicolon, comma and newlines (RFC 5545 3.3.11)"""
+    text = str(value)
+    if not _ESCAPED.search(text):
+        return text
+    text = text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+    return text.replace("\r\n", "\\n").replace("\r", "\\n").replace("\n", "\\n")
+
+
+def fold_line(line: str) -> str:
+    """
+    Fold a content line into CRLF-terminated chunks of at most 75 octets
+
+    Continuation lines start with a space. Multi-byte UTF-8 characters are
+    never split across lines.
+
+    Args:
+        line: Unfolded content line, without line ending
+
+    Returns:
+        str: Folded line ending in CRLF
+    """
+    if len(line) <= MAX_LINE_OCTETS and line.isascii():
+        return line + CRLF
+    encoded = line.encode("utf-8")
+    if len(encoded) <= MAX_LINE_OCTETS:
+        return line + CRLF
+
+    parts, start, limit = [], 0, MAX_LINE_OCTETS
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        # Back off to the start of a UTF-8 character
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(encoded[start:end].decode("utf-8"))
+        start = end
+        # Continuation lines spend one octet on the leading space
+        limit = MAX_LINE_OCTETS - 1
+    return (CRLF + " ").join(parts) + CRLF
+
+
+def format_utc(value: datetime) -> str:
+    """DATE-TIME in UTC form, e.g. 20250106T030000Z"""
+    v = value.astimezone(timezone.utc)
+    return f"{v.year:04d}{v.month:02d}{v.day:02d}T{v.hour:02d}{v.minute:02d}{v.second:02d}Z"
+
+
+@lru_cache(maxsize=64)
+def _zone(name: str):
+    """zoneinfo equivalent of a pytz zone; attaching it is much cheaper than localize"""
+    try:
+        return ZoneInfo(name)
+    except Exception:
+        return None
+
+
+def format_duration(value: timedelta) -> str:
+    """DURATION value, e.g. PT1H30M or P1DT2H"""
+    seconds = int(value.total_seconds())
+    sign = "-" if seconds < 0 else ""
+    days, rest = divmod(abs(seconds), 86400)
+    hours, rest = divmod(rest, 3600)
+    minutes, seconds = divmod(rest, 60)
+
+    result = f"{sign}P"
+    if days:
+        result += f"{days}D"
+    if hours or minutes or seconds or not days:
+        result += "T"
+        if hours:
+            result += f"{hours}H"
+        if minutes:
+            result += f"{minutes}M"
+        if seconds or not (hours or minutes):
+            result += f"{seconds}S"
+    return result
+
+
+def parse_duration_string(duration_str: str) -> timedelta:
+    """
+    Parses Supabase/Postgres INTERVAL string into timedelta.
+    Supports formats like '2 days 04:30:00', '04:30:00', etc.
+    """
+    if not duration_str:
+        return timedelta(hours=1)  # Default duration
+
+    duration_str = duration_str.strip().lower()
+
+    days_match = re.search(r"(\d+)\s*day", duration_str)
+    time_match = re.search(r"(\d+):(\d+):(\d+)", duration_str)
+    if days_match or time_match:
+        days = int(days_match.group(1)) if days_match else 0
+        hours, minutes, seconds = (
+            map(int, time_match.groups()) if time_match else (0, 0, 0)
+        )
+        return timedelta(days=days, hours=hours, minutes=minutes, seconds=seconds)
+
+    # Fallback if somehow it's just "45m" etc.
+    h_match = re.search(r"(\d+)h", duration_str)
+    m_match = re.search(r"(\d+)m", duration_str)
+
+    hours = int(h_match.group(1)) if h_match else 0
+    minutes = int(m_match.group(1)) if m_match else 0
+
+    return timedelta(hours=hours, minutes=minutes)
+
+
+def event_start(value, club_timezone) -> Optional[datetime]:
+    """
+    Timezone-aware start of an event
+
+    Dates with an offset or Z keep it; naive dates are in the club's timezone.
+    Wall times the clock passes twice (fall back) or skips (spring forward)
+    resolve to standard time, as pytz localize(is_dst=False) did before: the
+    later 01:30 on the fall-back day, and 02:30 on the spring-forward day
+    read with the standard offset (03:30 daylight time).
+
+    Args:
+        value: ISO string or datetime from the events table
+        club_timezone: pytz timezone of the club
+
+    Returns:
+        Optional[datetime]: Aware datetime, or None if it cannot be parsed
+    """
+    if not value:
+        return None
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if value.tzinfo is None:
+        zone = _zone(str(club_timezone))
+        if zone is None:
+            return club_timezone.localize(value, is_dst=False)
+        value = value.replace(tzinfo=zone, fold=0)
+        if value.dst():
+            # fold=1 is the standard-time reading when the time is ambiguous;
+            # for ordinary daylight times both folds are the same
+            later = value.replace(fold=1)
+            if not later.dst():
+                value = later
+    return value
+
+
+def vevent(db_event: Dict, club_timezone) -> Optional[str]:
+    """
+    Serialize one event row as a VEVENT block
+
+    Start times are written in UTC, so no VTIMEZONE components are needed.
+    DTSTAMP comes from created_at (or the start time) rather than the clock,
+    so the same row always produces the same bytes.
+
+    Args:
+        db_event: Row with id, name, date and optionally details, duration,
+            location, url, uid and created_at
+        club_timezone: pytz timezone for naive dates
+
+    Returns:
+        Optional[str]: CRLF-terminated, folded VEVENT lines, or None when the
+        event has no usable date
+    """
+    name = db_event.get("name") or "Unnamed Event"
+    start = event_start(db_event.get("date"), club_timezone)
+    if start is None:
+        logger.warning(f"Event {name} has no usable date, skipping")
+        return None
+
+    try:
+        duration = (
+            parse_duration_string(db_event["duration"])
+            if db_event.get("duration")
+            else timedelta(hours=1)
+        )
+    except Exception as e:
+        logger.warning(f"Could not parse duration '{db_event['duration']}': {e}")
+        duration = timedelta(hours=1)
+
+    if db_event.get("uid"):
+        uid = db_event["uid"]
+    else:
+        uid = f"{db_event.get('id')}@instinct"
+    stamp = event_start(db_event.get("created_at"), pytz.utc) or start
+
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{escape_text(uid)}",
+        f"DTSTAMP:{format_utc(stamp)}",
+        f"DTSTART:{format_utc(start)}",
+        f"DURATION:{format_duration(duration)}",
+        f"SUMMARY:{escape_text(name)}",
+    ]
+    if db_event.get("details"):
+        lines.append(f"DESCRIPTION:{escape_text(db_event['details'])}")
+    if db_event.get("location"):
+        lines.append(f"LOCATION:{escape_text(db_event['location'])}")
+    if db_event.get("url"):
+        lines.append(f"URL:{db_event['url']}")
+    lines.append("END:VEVENT")
+    return "".join(fold_line(line) for line in lines)
+
+
+def calendar_header(name: Optional[str] = None) -> str:
+    """VCALENDAR opening lines, with X-WR-CALNAME when a name is given"""
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", f"PRODID:{PRODID}", "CALSCALE:GREGORIAN"]
+    if name:
+        lines.append(f"X-WR-CALNAME:{escape_text(name)}")
+    return "".join(fold_line(line) for line in lines)
+
+
+CALENDAR_FOOTER = "END:VCALENDAR" + CRLF
+
+
+def stream_calendar(
+    events: Iterable[Dict], club_timezone, name: Optional[str] = None
+) -> Iterator[str]:
+    """
+    Yield a calendar piece by piece: header, one VEVENT per event, footer
+
+    Nothing is buffered, so it can feed a streaming HTTP response directly.
+
+    Args:
+        events: Event rows
+        club_timezone: pytz timezone for naive dates
+        name: Calendar display name
+    """
+    yield calendar_header(name)
+    for db_event in events:
+        block = vevent(db_event, club_timezone)
+        if block:
+            yield block
+    yield CALENDAR_FOOTER
+
+
+def write_calendar(
+    events: Iterable[Dict], club_timezone, name: Optional[str] = None
+) -> str:
+    """Whole calendar as one string; see stream_calendar"""
+    return "".join(stream_calendar(events, club_timezone, name))
+
+
+def assemble_calendar(blocks: List[str], name: Optional[str] = None) -> str:
+    """Wrap already serialized VEVENT blocks in a VCALENDAR"""
+    return calendar_header(name) + "".join(blocks) + CALENDAR_FOOTER
@@ -31,15 +31,23 @@ sys.path.append(
     )
 )
 from tools.logger import logger
+from tools.timing import timed
 
 from db.queries import SupabaseQueries
 import datetime
 
 
 class RateLimitDetected(Exception):
-    """Raised when a potential rate limit is detected during scraping."""
+    """Raised when a potential rate limit is detected during scraping.
 
-    pass
+    detected is True when Instagram's rate-limit page was actually seen and
+    False for generic scrape failures (private or deleted accounts, network
+    errors), which should not count towards worker cooldowns.
+    """
+
+    def __init__(self, message="", detected=True):
+        super().__init__(message)
+        self.detected = detected
 
 
 class InstagramScraper:
@@ -274,6 +282,7 @@ class InstagramScraper:
         except Exception as e:
             logger.error(f"Error while swapping cookies: {e}")
 
+    @timed("scraper.login")
     def login(self) -> None:
         """
         Main method to log into Instagram with credentials. Creates a cookies.json file to store cookies.
@@ -357,6 +366,7 @@ class InstagramScraper:
             logger.error(f"Enter a valid username {club_username}")
             return False
 
+    @timed("scraper.get_club_info")
     def get_club_info(self, club_username: str) -> Dict[str, any]:
         """Main scraper method to get club info
         :param club_username: the instagram tag of the club
@@ -397,6 +407,7 @@ class InstagramScraper:
             logger.error(f"Error fetching club info: {e}")
             self._driver_quit()
 
+    @timed("scraper.get_post_info")
     def get_post_info(
         self, post_url: str
     ) -> Tuple[Optional[str], Optional[str], Optional[str]]:
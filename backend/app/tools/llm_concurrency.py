@@ -0,0 +1,122 @@
+import os
+import sys
+import time
+import random
+import threading
+from typing import Optional
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from tools.logger import logger
+
+PARSE_MAX_CONCURRENCY = int(os.getenv("PARSE_MAX_CONCURRENCY", "4"))
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """
+    Delay requested by the API in a rate limit response, if any
+
+    Reads the retry-after-ms and retry-after headers that OpenAI sends with 429s.
+
+    Args:
+        error: Exception raised by the client
+
+    Returns:
+        Optional[float]: Seconds to wait, or None if the response gave no hint
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+def backoff_delay(
+    attempt: int,
+    retry_after: Optional[float] = None,
+    base: float = 1.0,
+    cap: float = 60.0,
+) -> float:
+    """
+    Exponential backoff with full jitter, never shorter than retry_after
+
+    Args:
+        attempt: Zero-based attempt number
+        retry_after: Server-requested delay, if any
+        base: Delay scale for the first retry
+        cap: Upper bound for the exponential part
+
+    Returns:
+        float: Seconds to sleep
+    """
+    delay = random.uniform(0, min(cap, base * 2**attempt))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit that adapts to rate limiting (AIMD).
+
+    Each success raises the limit by 1/limit, so about one extra slot per
+    round of calls. A rate limit halves it and pauses every caller until the
+    server's retry-after has passed. Use it as a context manager around each
+    API call.
+    """
+
+    def __init__(self, max_limit: int = PARSE_MAX_CONCURRENCY, min_limit: int = 1):
+        """
+        Args:
+            max_limit: Highest number of concurrent calls
+            min_limit: Lowest number of concurrent calls
+        """
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = float(self.max_limit)
+        self._active = 0
+        self._resume_at = 0.0
+        self._cond = threading.Condition()
+
+    def __enter__(self):
+        with self._cond:
+            while True:
+                wait = self._resume_at - time.time()
+                if wait <= 0 and self._active < int(self.limit):
+                    break
+                self._cond.wait(timeout=wait if wait > 0 else None)
+            self._active += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+        return False
+
+    def on_success(self) -> None:
+        """Additive increase after a successful call"""
+        with self._cond:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+    def on_rate_limit(self, retry_after: Optional[float] = None) -> None:
+        """Multiplicative decrease, and a shared pause for retry_after seconds"""
+        with self._cond:
+            self.limit = max(self.min_limit, self.limit / 2)
+            if retry_after:
+                self._resume_at = max(self._resume_at, time.time() + retry_after)
+            logger.warning(
+                f"Rate limited by OpenAI, concurrency now {int(self.limit)}"
+                + (f", pausing {retry_after:.1f}s" if retry_after else "")
+            )
+
+
+# Shared by every EventParser in the process so the learned limit carries over
+chat_limiter = AdaptiveLimiter()
@@ -1,16 +1,38 @@
 import logging
 import os
-import json
 import sys
+import time
+import queue
+import threading
 from datetime import datetime
 from logging.handlers import TimedRotatingFileHandler
 import redis
 import dotenv
 
+from tools import serialization
+
 class RedisLogHandler(logging.Handler):
-    """Simple Redis logging handler that pushes logs to a Redis list"""
+    """
+    Redis logging handler that pushes logs to a Redis list.
+
+    Records are formatted on the calling thread and put on a bounded in-memory
+    buffer; a background thread writes them in batches with a single pipelined
+    LPUSH + LTRIM, so logging never waits on a Redis round trip.
+    """
+    
+    DROP_OLDEST = 'drop_oldest'
+    DROP_NEWEST = 'drop_newest'
     
-    def __init__(self, max_entries=1000):
+    def __init__(self, max_entries=1000, buffer_size=10000, batch_size=200,
+                 flush_interval=0.5, drop_policy=DROP_OLDEST):
+        """
+        Args:
+            max_entries: Length the Redis list is trimmed to
+            buffer_size: Records held in memory before the drop policy applies
+            batch_size: Maximum records written per pipeline
+            flush_interval: Seconds the writer waits to fill a batch
+            drop_policy: 'drop_oldest' or 'drop_newest' when the buffer is full
+        """
         super().__init__()
         dotenv.load_dotenv()
         self.redis_url = os.getenv('REDIS_URL')
@@ -18,10 +40,31 @@ class RedisLogHandler(logging.Handler):
         self.redis_conn = redis.from_url(self.redis_url)
         self.max_entries = max_entries
         self.log_key = 'logs:entries'
+        
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.drop_policy = drop_policy
+        self.buffer = queue.Queue(maxsize=buffer_size)
+        self.dropped = 0
+        self._reported_dropped = 0
+        self._write_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._start_writer()
+    
+    def _start_writer(self):
+        """Start the background writer thread for this process"""
+        self._pid = os.getpid()
+        self._writer = threading.Thread(target=self._writer_loop, name='redis-log-writer', daemon=True)
+        self._writer.start()
 
     def emit(self, record):
-        """Process a log record and send it to Redis"""
+        """Format a log record and buffer it for the writer thread"""
         try:
+            # A forked child does not inherit the writer thread
+            if self._pid != os.getpid():
+                self.redis_conn = redis.from_url(self.redis_url)
+                self._start_writer()
+            
             # Format the log message
             log_entry = self.format(record)
             
@@ -37,19 +80,107 @@ class RedisLogHandler(logging.Handler):
             # Add exception info if available
             if record.exc_info:
                 structured_entry['exception'] = self.formatter.formatException(record.exc_info)
-            # Convert to JSON string
-            json_entry = json.dumps(structured_entry)
-            
-            # Push to Redis list
-            self.redis_conn.lpush(self.log_key, json_entry)
-            
-            # Trim the list if needed
-            self.redis_conn.ltrim(self.log_key, 0, self.max_entries - 1)
+            # Serialize with the configured queue format
+            self._enqueue(serialization.dumps(structured_entry))
                 
         except Exception as e:
             # Last resort fallback to print
-            print(f"Failed to push log to Redis: {e}")
+            print(f"Failed to buffer log for Redis: {e}")
             print(f"Original log: {record.getMessage()}")
+    
+    def _enqueue(self, entry):
+        """Add an entry to the buffer, applying the drop policy when it is full"""
+        try:
+            self.buffer.put_nowait(entry)
+            return
+        except queue.Full:
+            pass
+        
+        if self.drop_policy == self.DROP_NEWEST:
+            self.dropped += 1
+            return
+        
+        # Make room by discarding the oldest buffered entry
+        try:
+            self.buffer.get_nowait()
+            self.dropped += 1
+        except queue.Empty:
+            pass
+        try:
+            self.buffer.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+    
+    def _writer_loop(self):
+        """Background thread: wait for records and write them in batches"""
+        while not self._stop_event.is_set():
+            try:
+                first = self.buffer.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.buffer.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+    
+    def _write(self, batch):
+        """Push a batch with one pipelined LPUSH + LTRIM"""
+        if not batch:
+            return
+        
+        # Leave a marker in the log when records were dropped under backpressure
+        dropped = self.dropped - self._reported_dropped
+        if dropped:
+            self._reported_dropped += dropped
+            message = f"Dropped {dropped} log records (Redis log buffer full)"
+            batch.append(serialization.dumps({
+                'timestamp': datetime.now().isoformat(),
+                'level': 'WARNING',
+                'message': message,
+                'logger': __name__,
+                'formatted': f"{datetime.now().isoformat()} - WARNING - {message}"
+            }))
+        
+        try:
+            with self._write_lock:
+                pipe = self.redis_conn.pipeline(transaction=False)
+                # LPUSH with several values leaves the newest record at the head
+                pipe.lpush(self.log_key, *batch)
+                pipe.ltrim(self.log_key, 0, self.max_entries - 1)
+                pipe.execute()
+        except Exception as e:
+            print(f"Failed to push {len(batch)} logs to Redis: {e}")
+    
+    def _drain(self):
+        """Take everything currently buffered"""
+        batch = []
+        while True:
+            try:
+                batch.append(self.buffer.get_nowait())
+            except queue.Empty:
+                return batch
+    
+    def flush(self):
+        """Write all buffered records now"""
+        batch = self._drain()
+        for i in range(0, len(batch), self.batch_size):
+            self._write(batch[i:i + self.batch_size])
+    
+    def close(self):
+        """Stop the writer thread and flush what is left"""
+        self._stop_event.set()
+        if self._writer.is_alive() and self._writer is not threading.current_thread():
+            self._writer.join(timeout=self.flush_interval * 2 + 1)
+        self.flush()
+        super().close()
 
 # Configure logging system
 def setup_logging(log_level=logging.INFO):
@@ -0,0 +1,341 @@
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Any
+
+import redis
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from tools.logger import logger
+from tools import serialization
+
+# Upper bounds (seconds) of the histogram bins; the last bin catches everything else
+DEFAULT_HISTOGRAM_BOUNDS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+    60,
+    120,
+    300,
+    600,
+)
+
+
+class MetricsStore:
+    """
+    Time-bucketed counters, sets and histograms stored in Redis.
+
+    Every write lands in the bucket for the current time window and the bucket
+    keys expire on their own, so queries only touch the buckets inside the
+    requested window instead of scanning log history.
+
+    Key layout (bucket is the window start as a unix timestamp):
+        metrics:counter:{name}:{bucket}   integer
+        metrics:set:{name}:{bucket}       set of members
+        metrics:hist:{name}:{bucket}      hash of count, sum and per-bin counts
+        metrics:events:{name}             capped list of recent events
+    """
+
+    def __init__(
+        self,
+        redis_client: Optional[redis.Redis] = None,
+        bucket_seconds: int = 60,
+        retention_seconds: int = 48 * 3600,
+        histogram_bounds=DEFAULT_HISTOGRAM_BOUNDS,
+        prefix: str = "metrics",
+    ):
+        """
+        Args:
+            redis_client: Redis client to use. Defaults to a client for REDIS_URL.
+            bucket_seconds: Width of a time bucket
+            retention_seconds: How long buckets are kept before they expire
+            histogram_bounds: Upper bounds of the histogram bins, ascending
+            prefix: Key prefix for all metric keys
+        """
+        if redis_client is None:
+            redis_client = redis.from_url(
+                os.getenv("REDIS_URL", "redis://localhost:6379")
+            )
+        self.redis = redis_client
+        self.bucket_seconds = bucket_seconds
+        self.retention_seconds = retention_seconds
+        self.histogram_bounds = tuple(histogram_bounds)
+        self.prefix = prefix
+
+    # ---------- Helpers ----------
+
+    def _bucket(self, timestamp: Optional[float] = None) -> int:
+        """Return the start of the bucket containing timestamp"""
+        timestamp = time.time() if timestamp is None else timestamp
+        return int(timestamp // self.bucket_seconds) * self.bucket_seconds
+
+    def _buckets(self, window_seconds: float, now: Optional[float] = None) -> List[int]:
+        """All bucket starts covering the last window_seconds"""
+        now = time.time() if now is None else now
+        first = self._bucket(now - window_seconds)
+        return list(range(first, self._bucket(now) + 1, self.bucket_seconds))
+
+    def _key(self, kind: str, name: str, bucket: int) -> str:
+        return f"{self.prefix}:{kind}:{name}:{bucket}"
+
+    def _bin_field(self, value: float) -> str:
+        """Histogram field for the bin a value falls into"""
+        for bound in self.histogram_bounds:
+            if value <= bound:
+                return f"le_{bound}"
+        return "le_inf"
+
+    # ---------- Writes ----------
+
+    def incr(
+        self, name: str, amount: int = 1, timestamp: Optional[float] = None
+    ) -> None:
+        """
+        Increment a counter in the current bucket
+
+        Args:
+            name: Counter name
+            amount: Amount to add
+            timestamp: Event time. Defaults to now.
+        """
+        try:
+            key = self._key("counter", name, self._bucket(timestamp))
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.incrby(key, amount)
+            pipe.expire(key, self.retention_seconds)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Error incrementing metric {name}: {e}")
+
+    def add_member(
+        self, name: str, member: str, timestamp: Optional[float] = None
+    ) -> None:
+        """
+        Add a member (e.g. a club handle) to the set for the current bucket
+
+        Args:
+            name: Set name
+            member: Member to add
+            timestamp: Event time. Defaults to now.
+        """
+        try:
+            key = self._key("set", name, self._bucket(timestamp))
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.sadd(key, member)
+            pipe.expire(key, self.retention_seconds)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Error adding to metric set {name}: {e}")
+
+    def observe(
+        self, name: str, value: float, timestamp: Optional[float] = None
+    ) -> None:
+        """
+        Record a value (usually a duration in seconds) in a histogram
+
+        Args:
+            name: Histogram name
+            value: Observed value
+            timestamp: Event time. Defaults to now.
+        """
+        self.observe_many(name, [value], timestamp)
+
+    def observe_many(
+        self, name: str, values: List[float], timestamp: Optional[float] = None
+    ) -> None:
+        """
+        Record several values in a histogram with a single pipeline
+
+        Args:
+            name: Histogram name
+            values: Observed values
+            timestamp: Event time for all values. Defaults to now.
+        """
+        if not values:
+            return
+        try:
+            bins = {}
+            for value in values:
+                field = self._bin_field(value)
+                bins[field] = bins.get(field, 0) + 1
+
+            key = self._key("hist", name, self._bucket(timestamp))
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.hincrby(key, "count", len(values))
+            pipe.hincrbyfloat(key, "sum", sum(values))
+            for field, amount in bins.items():
+                pipe.hincrby(key, field, amount)
+            pipe.expire(key, self.retention_seconds)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Error observing metric {name}: {e}")
+
+    def record_event(self, name: str, data: Dict, max_events: int = 50) -> None:
+        """
+        Keep a short list of recent events (e.g. error messages) for display
+
+        Args:
+            name: Event list name
+            data: Event details; a timestamp is added
+            max_events: Number of events kept
+        """
+        try:
+            key = f"{self.prefix}:events:{name}"
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.lpush(key, serialization.dumps({**data, "timestamp": time.time()}))
+            pipe.ltrim(key, 0, max_events - 1)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Error recording metric event {name}: {e}")
+
+    # ---------- Queries ----------
+
+    def count(self, name: str, window_seconds: float) -> int:
+        """
+        Sum of a counter over the last window_seconds
+
+        Args:
+            name: Counter name
+            window_seconds: Length of the window
+
+        Returns:
+            int: Total over the window
+        """
+        try:
+            keys = [
+                self._key("counter", name, b) for b in self._buckets(window_seconds)
+            ]
+            return sum(int(v) for v in self.redis.mget(keys) if v is not None)
+        except Exception as e:
+            logger.error(f"Error reading metric {name}: {e}")
+            return 0
+
+    def counts(self, names: List[str], window_seconds: float) -> Dict[str, int]:
+        """Sum several counters over the same window in one round trip"""
+        try:
+            buckets = self._buckets(window_seconds)
+            keys = [self._key("counter", n, b) for n in names for b in buckets]
+            values = self.redis.mget(keys)
+            totals = {}
+            for i, name in enumerate(names):
+                chunk = values[i * len(buckets) : (i + 1) * len(buckets)]
+                totals[name] = sum(int(v) for v in chunk if v is not None)
+            return totals
+        except Exception as e:
+            logger.error(f"Error reading metrics {names}: {e}")
+            return {name: 0 for name in names}
+
+    def members(self, name: str, window_seconds: float) -> List[str]:
+        """
+        Distinct members of a set over the last window_seconds
+
+        Args:
+            name: Set name
+            window_seconds: Length of the window
+
+        Returns:
+            List[str]: Distinct members
+        """
+        try:
+            keys = [self._key("set", name, b) for b in self._buckets(window_seconds)]
+            return sorted(
+                m.decode() if isinstance(m, bytes) else m
+                for m in self.redis.sunion(keys)
+            )
+        except Exception as e:
+            logger.error(f"Error reading metric set {name}: {e}")
+            return []
+
+    def histogram(self, name: str, window_seconds: float) -> Dict[str, Any]:
+        """
+        Merge histogram buckets over the last window_seconds
+
+        Args:
+            name: Histogram name
+            window_seconds: Length of the window
+
+        Returns:
+            Dict: count, sum, mean, p50, p95, p99 (estimated from the bins) and bins
+        """
+        summary = {
+            "count": 0,
+            "sum": 0.0,
+            "mean": 0.0,
+            "p50": 0.0,
+            "p95": 0.0,
+            "p99": 0.0,
+        }
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for b in self._buckets(window_seconds):
+                pipe.hgetall(self._key("hist", name, b))
+
+            bins = {}
+            for raw in pipe.execute():
+                for field, value in raw.items():
+                    field = field.decode() if isinstance(field, bytes) else field
+                    if field == "count":
+                        summary["count"] += int(value)
+                    elif field == "sum":
+                        summary["sum"] += float(value)
+                    else:
+                        bins[field] = bins.get(field, 0) + int(value)
+
+            if summary["count"]:
+                summary["mean"] = summary["sum"] / summary["count"]
+                for label, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+                    summary[label] = self._quantile(bins, summary["count"], q)
+            summary["bins"] = bins
+            return summary
+
+        except Exception as e:
+            logger.error(f"Error reading metric histogram {name}: {e}")
+            return summary
+
+    def _quantile(self, bins: Dict[str, int], total: int, q: float) -> float:
+        """Upper bound of the bin that holds the q-th quantile"""
+        target = q * total
+        seen = 0
+        for bound in self.histogram_bounds:
+            seen += bins.get(f"le_{bound}", 0)
+            if seen >= target:
+                return float(bound)
+        return float("inf")
+
+    def recent_events(
+        self, name: str, window_seconds: float, limit: int = 5
+    ) -> List[Dict]:
+        """
+        Most recent events within the window, newest first
+
+        Args:
+            name: Event list name
+            window_seconds: Length of the window
+            limit: Maximum number of events returned
+
+        Returns:
+            List[Dict]: Events
+        """
+        try:
+            cutoff = time.time() - window_seconds
+            events = []
+            for raw in self.redis.lrange(f"{self.prefix}:events:{name}", 0, -1):
+                event = serialization.loads(raw)
+                if event.get("timestamp", 0) < cutoff:
+                    break
+                events.append(event)
+                if len(events) >= limit:
+                    break
+            return events
+        except Exception as e:
+            logger.error(f"Error reading metric events {name}: {e}")
+            return []
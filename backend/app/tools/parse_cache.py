@@ -0,0 +1,239 @@
+import os
+import re
+import sys
+import hashlib
+import unicodedata
+from typing import Dict, List, Optional
+
+import numpy as np
+import redis
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from tools.logger import logger
+from tools.metrics import MetricsStore
+from tools.prometheus import CACHE_REQUESTS
+from tools import serialization
+
+PARSE_CACHE_TTL_DAYS = int(os.getenv("PARSE_CACHE_TTL_DAYS", "30"))
+# Minimum estimated Jaccard similarity for a caption to reuse another's events
+PARSE_CACHE_NEAR_THRESHOLD = float(os.getenv("PARSE_CACHE_NEAR_THRESHOLD", "0.8"))
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+class ParseCache:
+    """
+    Reuses event extraction results for identical and near-identical captions.
+
+    Exact hits are keyed by the normalized caption and the context day. Near
+    duplicates (reposts with a changed emoji, link or hashtag) are found with
+    MinHash over word 3-shingles and LSH banding: captions that agree on any
+    band are candidates, and a candidate is used only when its estimated
+    Jaccard similarity reaches the threshold. Candidates must share the context
+    day, because relative dates like "this Friday" resolve against it.
+
+    Key layout:
+        parse:entry:{hash}                  events and MinHash signature
+        parse:lsh:{day}:{band}:{band_hash}  set of entry hashes
+    """
+
+    def __init__(
+        self,
+        redis_client: Optional[redis.Redis] = None,
+        num_perm: int = 64,
+        bands: int = 16,
+        threshold: float = PARSE_CACHE_NEAR_THRESHOLD,
+        ttl_seconds: int = PARSE_CACHE_TTL_DAYS * 86400,
+        prefix: str = "parse",
+    ):
+        """
+        Args:
+            redis_client: Redis client to use. Defaults to a client for REDIS_URL.
+            num_perm: MinHash signature length
+            bands: LSH bands; num_perm must be divisible by it
+            threshold: Minimum estimated Jaccard similarity for a near hit
+            ttl_seconds: Lifetime of cached results
+            prefix: Redis key prefix
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        if redis_client is None:
+            redis_client = redis.from_url(
+                os.getenv("REDIS_URL", "redis://localhost:6379")
+            )
+        self.redis = redis_client
+        self.metrics = MetricsStore(redis_client)
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+        # Fixed seed so signatures are comparable across processes and restarts.
+        # a and b stay below 2**32 so a * x + b fits in uint64 for 32-bit x.
+        rng = np.random.RandomState(1)
+        self._a = rng.randint(1, _MAX_HASH, num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, _MAX_HASH, num_perm, dtype=np.uint64)
+
+    # ---------- Hashing ----------
+
+    @staticmethod
+    def normalize(caption: str) -> str:
+        """Lowercase, drop links, mentions and punctuation, collapse whitespace"""
+        text = unicodedata.normalize("NFKC", caption or "").lower()
+        text = re.sub(r"https?://\S+|@\w+", " ", text)
+        text = re.sub(r"[^\w\s:/]", " ", text)
+        return " ".join(text.split())
+
+    @staticmethod
+    def context_day(context_date) -> str:
+        return str(context_date or "")[:10]
+
+    def entry_hash(self, normalized: str, day: str) -> str:
+        return hashlib.sha256(f"{day}\n{normalized}".encode("utf-8")).hexdigest()
+
+    def signature(self, normalized: str) -> np.ndarray:
+        """MinHash signature over word 3-shingles"""
+        words = normalized.split()
+        shingles = {" ".join(words[i : i + 3]) for i in range(max(1, len(words) - 2))}
+        hashes = np.array(
+            [
+                int.from_bytes(
+                    hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "big"
+                )
+                for s in shingles
+            ],
+            dtype=np.uint64,
+        )
+        # (a * x + b) mod p for every permutation and shingle, min per permutation
+        permuted = (np.outer(self._a, hashes) + self._b[:, None]) % _MERSENNE_PRIME
+        return (permuted & _MAX_HASH).min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray, day: str) -> List[str]:
+        keys = []
+        for band in range(self.bands):
+            chunk = signature[band * self.rows : (band + 1) * self.rows].tobytes()
+            digest = hashlib.blake2b(chunk, digest_size=8).hexdigest()
+            keys.append(f"{self.prefix}:lsh:{day}:{band}:{digest}")
+        return keys
+
+    # ---------- Lookups ----------
+
+    def _record(self, result: str) -> None:
+        CACHE_REQUESTS.inc(labels=("parse", "miss" if result == "miss" else "hit"))
+        self.metrics.incr(f"parse_cache_{result}")
+
+    def lookup(self, caption: str, context_date) -> Optional[List[Dict]]:
+        """
+        Cached events for an identical or near-identical caption
+
+        Args:
+            caption: Post caption
+            context_date: Posting date the events were resolved against
+
+        Returns:
+            Optional[List[Dict]]: Events, or None on a miss
+        """
+        normalized = self.normalize(caption)
+        if not normalized:
+            return None
+        day = self.context_day(context_date)
+
+        try:
+            raw = self.redis.get(
+                f"{self.prefix}:entry:{self.entry_hash(normalized, day)}"
+            )
+            if raw is not None:
+                self._record("exact")
+                return serialization.loads(raw)["events"]
+
+            signature = self.signature(normalized)
+            pipe = self.redis.pipeline(transaction=False)
+            for key in self._band_keys(signature, day):
+                pipe.smembers(key)
+            candidates = set().union(*pipe.execute())
+            if candidates:
+                entries = self.redis.mget(
+                    [
+                        f"{self.prefix}:entry:{c.decode() if isinstance(c, bytes) else c}"
+                        for c in candidates
+                    ]
+                )
+                best, best_similarity = None, 0.0
+                for raw in entries:
+                    if raw is None:
+                        continue
+                    entry = serialization.loads(raw)
+                    similarity = float(
+                        np.mean(np.asarray(entry["signature"], np.uint32) == signature)
+                    )
+                    if similarity > best_similarity:
+                        best, best_similarity = entry, similarity
+                if best is not None and best_similarity >= self.threshold:
+                    self._record("near")
+                    return best["events"]
+        except Exception as e:
+            logger.error(f"Error reading parse cache: {e}")
+            return None
+
+        self._record("miss")
+        return None
+
+    def store(self, caption: str, context_date, events: List[Dict]) -> None:
+        """
+        Cache the events extracted from a caption
+
+        Args:
+            caption: Post caption
+            context_date: Posting date the events were resolved against
+            events: Validated extraction result (an empty list is a valid result)
+        """
+        normalized = self.normalize(caption)
+        if not normalized:
+            return
+        day = self.context_day(context_date)
+        digest = self.entry_hash(normalized, day)
+        signature = self.signature(normalized)
+
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.set(
+                f"{self.prefix}:entry:{digest}",
+                serialization.dumps(
+                    {"events": events, "signature": signature.tolist()}
+                ),
+                ex=self.ttl_seconds,
+            )
+            for key in self._band_keys(signature, day):
+                pipe.sadd(key, digest)
+                pipe.expire(key, self.ttl_seconds)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Error writing parse cache: {e}")
+
+    def hit_rate(self, window_seconds: float) -> Dict[str, float]:
+        """
+        Exact hits, near hits, misses and hit rate over a window
+
+        Args:
+            window_seconds: Length of the window
+
+        Returns:
+            Dict: exact, near and miss counts and the combined hit rate (0-1)
+        """
+        counts = self.metrics.counts(
+            ["parse_cache_exact", "parse_cache_near", "parse_cache_miss"],
+            window_seconds,
+        )
+        exact = counts["parse_cache_exact"]
+        near = counts["parse_cache_near"]
+        miss = counts["parse_cache_miss"]
+        total = exact + near + miss
+        return {
+            "exact": exact,
+            "near": near,
+            "miss": miss,
+            "hit_rate": (exact + near) / total if total else 0.0,
+        }
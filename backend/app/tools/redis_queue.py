@@ -1,5 +1,4 @@
 import redis
-import json
 import time
 import os
 import sys
@@ -10,7 +9,7 @@ from typing import Dict, List, Optional, Any, Union
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from tools.logger import logger
-
+from tools import serialization
 
 class QueueType(Enum):
     SCRAPER = "scraper"
@@ -20,13 +19,41 @@ class QueueType(Enum):
 
 dotenv.load_dotenv()
 
+# Retention settings, overridable through the environment
+STREAM_MAXLEN = int(os.getenv("REDIS_STREAM_MAXLEN", "5000"))
+COMPLETED_TTL_DAYS = int(os.getenv("REDIS_COMPLETED_TTL_DAYS", "7"))
+FAILED_RETENTION_DAYS = int(os.getenv("REDIS_FAILED_RETENTION_DAYS", "30"))
+STATS_TTL_DAYS = int(os.getenv("REDIS_STATS_TTL_DAYS", "90"))
+# Stream consumers idle this long with nothing pending are removed from their group
+CONSUMER_IDLE_HOURS = int(os.getenv("REDIS_CONSUMER_IDLE_HOURS", "24"))
+
 import psutil
 import platform
+import random
 import datetime
 
 # Add these imports at the top of your redis_queue.py file
 
 
+def retry_backoff_seconds(
+    attempt: int, base_delay: float = 60, max_delay: float = 3600
+) -> float:
+    """
+    Exponential backoff with jitter for retrying a failed job
+
+    Args:
+        attempt: The attempt number that just failed (1-based)
+        base_delay: Delay in seconds after the first failure
+        max_delay: Upper bound for the delay in seconds
+
+    Returns:
+        float: Seconds to wait before the job becomes ready again
+    """
+    delay = min(max_delay, base_delay * (2 ** max(0, attempt - 1)))
+    # Jitter keeps retries from several failed jobs from landing together
+    return delay * random.uniform(0.5, 1.5)
+
+
 class SystemHealthMonitor:
     """Utility class to gather system health metrics"""
 
@@ -137,9 +164,17 @@ class SystemHealthMonitor:
 
 
 class RedisScraperQueue:
-    def __init__(self):
-        redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
-        self.redis = redis.from_url(redis_url)
+
+    def __init__(self, redis_client: Optional[redis.Redis] = None):
+        """
+        Args:
+            redis_client: Existing Redis client to use (e.g. fakeredis in benchmarks).
+                Defaults to a client for REDIS_URL.
+        """
+        if redis_client is None:
+            redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
+            redis_client = redis.from_url(redis_url)
+        self.redis = redis_client
 
         # Initialize all queue keys with prefixes
         self._init_queue_keys()
@@ -163,12 +198,16 @@ class RedisScraperQueue:
                 "failed": "scraper:failed",
                 "rate_limit": "scraper:rate_limit",
                 "completed": "scraper:completed",
+                "delayed": "scraper:delayed",
+                "stats": "scraper:stats",
             },
             QueueType.EVENT: {
                 "queue": "event:queue",
                 "processing": "event:processing",
                 "failed": "event:failed",
                 "completed": "event:completed",
+                "delayed": "event:delayed",
+                "stats": "event:stats",
             },
             QueueType.LOG: {
                 "queue": "log:queue",
@@ -211,7 +250,7 @@ class RedisScraperQueue:
 
             # Use pipeline for better performance
             with self.redis.pipeline() as pipe:
-                pipe.zadd(queue_key, {json.dumps(job): priority})
+                pipe.zadd(queue_key, {serialization.dumps(job): priority})
 
                 # For logs, maintain a reasonable history length
                 if queue_type == QueueType.LOG:
@@ -269,15 +308,12 @@ class RedisScraperQueue:
             if not jobs:
                 return None
 
+            # Keep the raw member, it is needed to remove the job from the zset
             job_json, priority = jobs[0]
 
-            # If bytes, decode to str
-            if isinstance(job_json, bytes):
-                job_json = job_json.decode("utf-8")
-
             # Always try to parse
             try:
-                job = json.loads(job_json)
+                job = serialization.loads(job_json)
             except Exception as e:
                 logger.error(
                     f"Failed to parse job JSON from queue: {e} | job_json={job_json}"
@@ -299,7 +335,7 @@ class RedisScraperQueue:
             # For scraper and event queues, track by instagram_handle
             if queue_type != QueueType.LOG and "instagram_handle" in job:
                 self.redis.hset(
-                    processing_key, job["instagram_handle"], json.dumps(job)
+                    processing_key, job["instagram_handle"], serialization.dumps(job)
                 )
                 logger.info(
                     f"Started processing {queue_type.value} job: {job['instagram_handle']}. Attempt: {job['attempts']}"
@@ -307,7 +343,7 @@ class RedisScraperQueue:
             else:
                 # For logs, use a unique ID
                 job_id = job.get("id", f"log_{int(time.time())}")
-                self.redis.hset(processing_key, job_id, json.dumps(job))
+                self.redis.hset(processing_key, job_id, serialization.dumps(job))
                 logger.info(f"Started processing {queue_type.value} job: {job_id}.")
 
             # Publish status update
@@ -350,14 +386,21 @@ class RedisScraperQueue:
                 )
                 return False
 
-            # Move to completed if we track completed jobs for this queue type
+            pipe = self.redis.pipeline()
+
+            # Completed jobs go into a daily bucket that expires on its own,
+            # the long-term history is kept as rollup counters
             if completed_key:
-                job = json.loads(job_json)
+                job = serialization.loads(job_json)
                 job["completed_at"] = time.time()
-                self.redis.hset(completed_key, job_id, json.dumps(job))
+                bucket_key = f"{completed_key}:{self._day_bucket(job['completed_at'])}"
+                pipe.hset(bucket_key, job_id, serialization.dumps(job))
+                pipe.expire(bucket_key, COMPLETED_TTL_DAYS * 86400)
+                self._incr_rollup(pipe, queue_type, "completed", job["completed_at"])
 
             # Remove from processing
-            self.redis.hdel(processing_key, job_id)
+            pipe.hdel(processing_key, job_id)
+            pipe.execute()
 
             # Publish status update
             self.publish_status(
@@ -380,15 +423,23 @@ class RedisScraperQueue:
         job_id: str,
         error: Optional[str] = None,
         retry: bool = True,
+        retry_delay: Optional[float] = None,
+        updates: Optional[Dict] = None,
     ) -> bool:
         """
         Mark a job as failed
 
+        Retries are not pushed straight back onto the live queue. They are
+        scheduled on the delayed queue with exponential backoff, so workers
+        keep processing other jobs while the failed one cools down.
+
         Args:
             queue_type: The type of queue
             job_id: For scraper/event queues, this is instagram_handle. For logs, this is log ID.
             error: Optional error message
             retry: Whether to retry the job (up to max attempts)
+            retry_delay: Seconds to wait before retrying. Defaults to exponential backoff.
+            updates: Optional fields to merge into the job before it is retried or stored
 
         Returns:
             bool: True if successful, False otherwise
@@ -405,7 +456,8 @@ class RedisScraperQueue:
                 )
                 return False
 
-            job = json.loads(job_json)
+            job = serialization.loads(job_json)
+            job.update(updates or {})
             job["error"] = str(error)
             job["failed_at"] = time.time()
 
@@ -415,12 +467,22 @@ class RedisScraperQueue:
             max_attempts = 3  # Could make this configurable
 
             # Retry if requested and not exceeded max attempts
+            scheduled = False
             if retry and job.get("attempts", 0) < max_attempts:
-                self.enqueue_job(
-                    queue_type, job, priority=-10
-                )  # High priority for retries
+                if retry_delay is None:
+                    retry_delay = retry_backoff_seconds(job.get("attempts", 1))
+                scheduled = self.schedule_job(
+                    queue_type, job, retry_delay, priority=-10
+                )  # High priority for retries once they are due
+                if not scheduled:
+                    # Keep the job in the failed hash rather than losing it
+                    logger.error(
+                        f"Could not schedule retry for {queue_type.value} job {job_id}, storing it as failed"
+                    )
+
+            if scheduled:
                 logger.warning(
-                    f"{queue_type.value} job {job_id} failed, retrying (attempt {job.get('attempts', 0)}). Error: {error}"
+                    f"{queue_type.value} job {job_id} failed, retrying in {retry_delay:.0f}s (attempt {job.get('attempts', 0)}). Error: {error}"
                 )
 
                 # Publish status update for retry
@@ -431,14 +493,17 @@ class RedisScraperQueue:
                         "job_id": job_id,
                         "attempts": job.get("attempts", 0),
                         "max_attempts": max_attempts,
+                        "retry_in_seconds": round(retry_delay, 1),
                         "error": str(error),
                         "timestamp": time.time(),
                     },
                 )
             else:
                 # Mark as permanently failed
-
-                self.redis.hset(failed_key, job_id, json.dumps(job))
+                pipe = self.redis.pipeline()
+                pipe.hset(failed_key, job_id, serialization.dumps(job))
+                self._incr_rollup(pipe, queue_type, "failed", job["failed_at"])
+                pipe.execute()
                 logger.error(
                     f"{queue_type.value} job {job_id} permanently failed after {max_attempts} attempts. Error: {error}"
                 )
@@ -512,6 +577,187 @@ class RedisScraperQueue:
             logger.error(f"Error requeuing stalled {queue_type.value} jobs: {e}")
             return 0
 
+    # ---------- Delayed Job Methods ----------
+
+    def schedule_job(
+        self,
+        queue_type: QueueType,
+        job_data: Dict,
+        delay_seconds: float,
+        priority: int = 0,
+    ) -> bool:
+        """
+        Schedule a job to enter the live queue after a delay
+
+        Delayed jobs live in a sorted set scored by their ready-at time.
+        promote_due_jobs moves them into the live queue once they are due.
+
+        Args:
+            queue_type: The type of queue (SCRAPER or EVENT)
+            job_data: The job data to schedule
+            delay_seconds: Seconds from now until the job is ready
+            priority: Priority the job gets once it is promoted
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        try:
+            delayed_key = self.queue_keys[queue_type].get("delayed")
+            if not delayed_key:
+                logger.error(f"{queue_type.value} queue does not support delayed jobs")
+                return False
+
+            if "instagram_handle" not in job_data:
+                logger.error(
+                    f"Cannot schedule job without instagram_handle: {job_data}"
+                )
+                return False
+
+            now = time.time()
+            ready_at = now + max(0, delay_seconds)
+            job = {
+                **job_data,
+                "scheduled_at": now,
+                "ready_at": ready_at,
+                "priority": priority,
+                "attempts": job_data.get("attempts", 0),
+            }
+            job.pop("processing_started", None)
+
+            self.redis.zadd(delayed_key, {serialization.dumps(job): ready_at})
+
+            logger.info(
+                f"Scheduled {queue_type.value} job {job['instagram_handle']} to run in {delay_seconds:.0f}s"
+            )
+            return True
+
+        except Exception as e:
+            logger.error(f"Error scheduling job on {queue_type.value} queue: {e}")
+            return False
+
+    def reschedule_job(
+        self,
+        queue_type: QueueType,
+        job_id: str,
+        delay_seconds: float,
+        updates: Optional[Dict] = None,
+        priority: int = 0,
+    ) -> bool:
+        """
+        Move a job from processing back onto the delayed queue
+
+        Unlike mark_job_failed this does not count as a failure, so callers
+        can use it for cooldowns (e.g. switching cookie accounts).
+
+        Args:
+            queue_type: The type of queue (SCRAPER or EVENT)
+            job_id: The instagram_handle of the job in processing
+            delay_seconds: Seconds from now until the job is ready again
+            updates: Optional fields to merge into the job
+            priority: Priority the job gets once it is promoted
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        try:
+            processing_key = self.queue_keys[queue_type]["processing"]
+
+            job_json = self.redis.hget(processing_key, job_id)
+            if not job_json:
+                logger.warning(
+                    f"Job {job_id} not found in {queue_type.value} processing queue, cannot reschedule."
+                )
+                return False
+
+            job = serialization.loads(job_json)
+            job.update(updates or {})
+
+            if not self.schedule_job(queue_type, job, delay_seconds, priority):
+                return False
+
+            self.redis.hdel(processing_key, job_id)
+
+            self.publish_status(
+                "job_rescheduled",
+                {
+                    "queue": queue_type.value,
+                    "job_id": job_id,
+                    "delay_seconds": round(delay_seconds, 1),
+                    "timestamp": time.time(),
+                },
+            )
+            return True
+
+        except Exception as e:
+            logger.error(f"Error rescheduling {queue_type.value} job {job_id}: {e}")
+            return False
+
+    def promote_due_jobs(self, queue_type: QueueType, limit: int = 100) -> int:
+        """
+        Move delayed jobs whose ready-at time has passed into the live queue
+
+        Safe to call from several processes: ZREM only succeeds for one
+        caller, and only that caller enqueues the job.
+
+        Args:
+            queue_type: The type of queue (SCRAPER or EVENT)
+            limit: Maximum number of jobs to promote in one call
+
+        Returns:
+            int: Number of jobs promoted
+        """
+        try:
+            delayed_key = self.queue_keys[queue_type].get("delayed")
+            if not delayed_key:
+                return 0
+
+            queue_key = self.queue_keys[queue_type]["queue"]
+            now = time.time()
+
+            due_jobs = self.redis.zrangebyscore(
+                delayed_key, "-inf", now, start=0, num=limit
+            )
+            promoted_count = 0
+
+            for job_json in due_jobs:
+                # Claim the job; another promoter may have taken it already
+                if not self.redis.zrem(delayed_key, job_json):
+                    continue
+
+                try:
+                    job = serialization.loads(job_json)
+                except Exception as e:
+                    logger.error(
+                        f"Failed to parse delayed job JSON: {e} | job_json={job_json}"
+                    )
+                    continue
+
+                priority = job.pop("priority", 0)
+                job.pop("ready_at", None)
+                job["enqueued_at"] = now
+
+                self.redis.zadd(queue_key, {serialization.dumps(job): priority})
+                promoted_count += 1
+
+            if promoted_count > 0:
+                logger.info(
+                    f"Promoted {promoted_count} delayed {queue_type.value} jobs to the live queue."
+                )
+                self.publish_status(
+                    "delayed_jobs_promoted",
+                    {
+                        "queue": queue_type.value,
+                        "count": promoted_count,
+                        "timestamp": now,
+                    },
+                )
+
+            return promoted_count
+
+        except Exception as e:
+            logger.error(f"Error promoting delayed {queue_type.value} jobs: {e}")
+            return 0
+
     def get_stalled_jobs(
         self, queue_type: QueueType, timeout_seconds: int = 1800
     ) -> List[Dict]:
@@ -534,7 +780,7 @@ class RedisScraperQueue:
 
             for job_id, job_json in all_processing.items():
                 try:
-                    job = json.loads(job_json)
+                    job = serialization.loads(job_json)
                     processing_started = job.get("processing_started", 0)
 
                     if current_time - processing_started > timeout_seconds:
@@ -563,16 +809,20 @@ class RedisScraperQueue:
         try:
             queue_key = self.queue_keys[queue_type]["queue"]
             processing_key = self.queue_keys[queue_type]["processing"]
+            delayed_key = self.queue_keys[queue_type].get("delayed")
 
             # Count jobs before flushing
             queue_count = self.redis.zcard(queue_key)
             processing_count = len(self.redis.hkeys(processing_key))
+            delayed_count = self.redis.zcard(delayed_key) if delayed_key else 0
 
             # Flush the queue
             self.redis.delete(queue_key)
             self.redis.delete(processing_key)
+            if delayed_key:
+                self.redis.delete(delayed_key)
 
-            total_removed = queue_count + processing_count
+            total_removed = queue_count + processing_count + delayed_count
 
             # Publish status update
             self.publish_status(
@@ -581,6 +831,7 @@ class RedisScraperQueue:
                     "queue": queue_type.value,
                     "queue_count": queue_count,
                     "processing_count": processing_count,
+                    "delayed_count": delayed_count,
                     "total_removed": total_removed,
                     "timestamp": time.time(),
                 },
@@ -610,10 +861,17 @@ class RedisScraperQueue:
 
             # Get counts for different queues
             for purpose, key in self.queue_keys[queue_type].items():
-                if purpose == "queue":
+                if purpose in ["queue", "delayed"]:
                     stats[f"{purpose}_count"] = self.redis.zcard(key)
-                elif purpose in ["processing", "failed", "completed"]:
-                    stats[f"{purpose}_count"] = len(self.redis.hkeys(key))
+                elif purpose in ["processing", "failed"]:
+                    stats[f"{purpose}_count"] = self.redis.hlen(key)
+                elif purpose == "stats":
+                    # Completed jobs are only counted, not kept forever
+                    totals = self.get_rollup_stats(queue_type)
+                    today = self.get_rollup_stats(queue_type, self._day_bucket())
+                    stats["completed_count"] = totals.get("completed", 0)
+                    stats["completed_today"] = today.get("completed", 0)
+                    stats["failed_today"] = today.get("failed", 0)
                 elif purpose == "rate_limit" and queue_type == QueueType.SCRAPER:
                     current_time = time.time()
                     stats["rate_limited_last_hour"] = len(
@@ -629,6 +887,210 @@ class RedisScraperQueue:
             logger.error(f"Error getting {queue_type.value} queue status: {e}")
             return {"error": str(e)}
 
+    # ---------- Retention Methods ----------
+
+    @staticmethod
+    def _day_bucket(timestamp: Optional[float] = None) -> str:
+        """Return the UTC day bucket (YYYYMMDD) for a timestamp"""
+        return datetime.datetime.fromtimestamp(
+            timestamp or time.time(), datetime.timezone.utc
+        ).strftime("%Y%m%d")
+
+    def _incr_rollup(
+        self, pipe, queue_type: QueueType, field: str, timestamp: float, amount: int = 1
+    ) -> None:
+        """Queue rollup counter increments for a finished job on a pipeline"""
+        stats_key = self.queue_keys[queue_type].get("stats")
+        if not stats_key:
+            return
+
+        daily_key = f"{stats_key}:{self._day_bucket(timestamp)}"
+        pipe.hincrby(daily_key, field, amount)
+        pipe.expire(daily_key, STATS_TTL_DAYS * 86400)
+        pipe.hincrby(f"{stats_key}:total", field, amount)
+
+    def get_rollup_stats(
+        self, queue_type: QueueType, day: Optional[str] = None
+    ) -> Dict[str, int]:
+        """
+        Get rollup counters for a queue
+
+        Args:
+            queue_type: The type of queue
+            day: Day bucket (YYYYMMDD). Defaults to the all-time totals.
+
+        Returns:
+            Dict[str, int]: Counter name to value
+        """
+        stats_key = self.queue_keys[queue_type].get("stats")
+        if not stats_key:
+            return {}
+
+        try:
+            raw = self.redis.hgetall(f"{stats_key}:{day or 'total'}")
+            return {
+                (k.decode() if isinstance(k, bytes) else k): int(v)
+                for k, v in raw.items()
+            }
+        except Exception as e:
+            logger.error(f"Error reading {queue_type.value} rollup stats: {e}")
+            return {}
+
+    def apply_retention(self) -> Dict[str, int]:
+        """
+        Enforce retention limits on streams and job history
+
+        Trims the streams to STREAM_MAXLEN, drops permanently failed jobs older
+        than FAILED_RETENTION_DAYS, expires old rate-limit records and folds the
+        legacy unbounded completed hashes into the rollup counters. Daily
+        completed buckets expire on their own. Consumers are named
+        hostname:pid, so each restart leaves one behind; those idle for
+        CONSUMER_IDLE_HOURS with no pending entries are deleted.
+
+        Returns:
+            Dict[str, int]: Number of entries removed per category
+        """
+        summary = {
+            "stream_entries_trimmed": 0,
+            "failed_pruned": 0,
+            "legacy_completed_folded": 0,
+            "rate_limit_pruned": 0,
+            "idle_consumers_removed": 0,
+        }
+
+        try:
+            for stream in (
+                self.notification_stream,
+                self.status_stream,
+                self.health_stream,
+            ):
+                summary["stream_entries_trimmed"] += self.redis.xtrim(
+                    stream, maxlen=STREAM_MAXLEN, approximate=True
+                )
+                summary["idle_consumers_removed"] += self._remove_idle_consumers(stream)
+
+            failed_cutoff = time.time() - FAILED_RETENTION_DAYS * 86400
+            completed_cutoff = time.time() - COMPLETED_TTL_DAYS * 86400
+
+            for queue_type in (QueueType.SCRAPER, QueueType.EVENT):
+                keys = self.queue_keys[queue_type]
+
+                # Permanently failed jobs are only useful for a while
+                stale_failed = []
+                for job_id, job_json in self.redis.hscan_iter(keys["failed"]):
+                    try:
+                        failed_at = serialization.loads(job_json).get("failed_at", 0)
+                    except (TypeError, ValueError):
+                        failed_at = 0
+                    if failed_at < failed_cutoff:
+                        stale_failed.append(job_id)
+                if stale_failed:
+                    summary["failed_pruned"] += self.redis.hdel(
+                        keys["failed"], *stale_failed
+                    )
+
+                # Older deployments kept every completed job in one hash
+                legacy_key = keys["completed"]
+                if self.redis.type(legacy_key) in (b"hash", "hash"):
+                    pipe = self.redis.pipeline()
+                    for job_id, job_json in self.redis.hscan_iter(legacy_key):
+                        try:
+                            completed_at = serialization.loads(job_json).get(
+                                "completed_at"
+                            )
+                        except (TypeError, ValueError):
+                            completed_at = None
+                        completed_at = completed_at or time.time()
+
+                        self._incr_rollup(pipe, queue_type, "completed", completed_at)
+                        if completed_at >= completed_cutoff:
+                            bucket_key = (
+                                f"{legacy_key}:{self._day_bucket(completed_at)}"
+                            )
+                            pipe.hset(bucket_key, job_id, job_json)
+                            pipe.expire(bucket_key, COMPLETED_TTL_DAYS * 86400)
+                        summary["legacy_completed_folded"] += 1
+                    pipe.delete(legacy_key)
+                    pipe.execute()
+
+            summary["rate_limit_pruned"] = self.redis.zremrangebyscore(
+                self.queue_keys[QueueType.SCRAPER]["rate_limit"],
+                0,
+                time.time() - 3600,
+            )
+
+            logger.info(f"Applied Redis retention: {summary}")
+            return summary
+
+        except Exception as e:
+            logger.error(f"Error applying Redis retention: {e}")
+            return summary
+
+    def _remove_idle_consumers(self, stream: str) -> int:
+        """Delete consumers of a stream's groups that are idle and own no pending entries"""
+        if not self.redis.exists(stream):
+            return 0
+        removed = 0
+        idle_ms = CONSUMER_IDLE_HOURS * 3600 * 1000
+        for group in self.redis.xinfo_groups(stream):
+            group_name = group["name"]
+            for consumer in self.redis.xinfo_consumers(stream, group_name):
+                # Entries a dead consumer left pending are reclaimed by consume_stream
+                # first; deleting the consumer now would drop them from the PEL
+                if consumer["pending"] or consumer["idle"] < idle_ms:
+                    continue
+                self.redis.xgroup_delconsumer(stream, group_name, consumer["name"])
+                removed += 1
+        return removed
+
+    def get_memory_report(self, sample_limit: int = 10000) -> Dict:
+        """
+        Report Redis memory usage grouped by key family
+
+        Keys are grouped by their first two segments, so daily buckets such as
+        scraper:completed:20250101 are reported under scraper:completed:*.
+
+        Args:
+            sample_limit: Maximum number of keys to inspect
+
+        Returns:
+            Dict: Total used memory and per-family key count and bytes
+        """
+        try:
+            families = {}
+            scanned = 0
+            for key in self.redis.scan_iter(count=500):
+                if scanned >= sample_limit:
+                    break
+                scanned += 1
+
+                name = key.decode() if isinstance(key, bytes) else key
+                parts = name.split(":")
+                family = ":".join(parts[:2]) + (":*" if len(parts) > 2 else "")
+
+                entry = families.setdefault(family, {"keys": 0, "bytes": 0})
+                entry["keys"] += 1
+                entry["bytes"] += self.redis.memory_usage(key, samples=0) or 0
+
+            info = self.redis.info("memory")
+            return {
+                "used_memory_bytes": info.get("used_memory", 0),
+                "used_memory_human": info.get("used_memory_human", ""),
+                "keys_scanned": scanned,
+                "truncated": scanned >= sample_limit,
+                "families": dict(
+                    sorted(
+                        families.items(),
+                        key=lambda item: item[1]["bytes"],
+                        reverse=True,
+                    )
+                ),
+            }
+
+        except Exception as e:
+            logger.error(f"Error building Redis memory report: {e}")
+            return {"error": str(e)}
+
     # ---------- Stream Methods for Event-Driven Architecture ----------
 
     def publish_notification(self, message: str, data: Dict = None) -> bool:
@@ -651,7 +1113,10 @@ class RedisScraperQueue:
 
             # Add to stream with * to auto-generate ID
             self.redis.xadd(
-                self.notification_stream, {"payload": json.dumps(notification)}
+                self.notification_stream,
+                {"payload": serialization.dumps(notification)},
+                maxlen=STREAM_MAXLEN,
+                approximate=True,
             )
             return True
 
@@ -674,7 +1139,12 @@ class RedisScraperQueue:
             status = {"type": status_type, "timestamp": time.time(), "data": data or {}}
 
             # Add to stream with * to auto-generate ID
-            self.redis.xadd(self.status_stream, {"payload": json.dumps(status)})
+            self.redis.xadd(
+                self.status_stream,
+                {"payload": serialization.dumps(status)},
+                maxlen=STREAM_MAXLEN,
+                approximate=True,
+            )
             return True
 
         except Exception as e:
@@ -700,7 +1170,7 @@ class RedisScraperQueue:
                 for stream_name, messages in results:
                     for msg_id, msg_data in messages:
                         try:
-                            payload = json.loads(msg_data[b"payload"])
+                            payload = serialization.loads(msg_data[b"payload"])
                             notifications.append(
                                 {"id": msg_id.decode(), "payload": payload}
                             )
@@ -732,7 +1202,7 @@ class RedisScraperQueue:
                 for stream_name, messages in results:
                     for msg_id, msg_data in messages:
                         try:
-                            payload = json.loads(msg_data[b"payload"])
+                            payload = serialization.loads(msg_data[b"payload"])
                             status_updates.append(
                                 {"id": msg_id.decode(), "payload": payload}
                             )
@@ -745,6 +1215,162 @@ class RedisScraperQueue:
             logger.error(f"Error reading status updates: {e}")
             return []
 
+    # ---------- Consumer Group Methods ----------
+
+    def ensure_consumer_group(
+        self, stream: str, group: str, start_id: str = "$"
+    ) -> bool:
+        """
+        Create a consumer group on a stream if it does not exist yet
+
+        Args:
+            stream: Stream name
+            group: Consumer group name
+            start_id: First entry the group delivers. "$" skips existing history.
+
+        Returns:
+            bool: True if the group exists, False otherwise
+        """
+        try:
+            self.redis.xgroup_create(stream, group, id=start_id, mkstream=True)
+            logger.info(f"Created consumer group {group} on {stream}")
+            return True
+        except redis.exceptions.ResponseError as e:
+            if "BUSYGROUP" in str(e):
+                return True
+            logger.error(f"Error creating consumer group {group} on {stream}: {e}")
+            return False
+
+    @staticmethod
+    def _decode_entry(msg_id, msg_data) -> Optional[Dict]:
+        """Decode a raw stream entry into an id/payload dict"""
+        if isinstance(msg_id, bytes):
+            msg_id = msg_id.decode()
+        if not msg_data:
+            # Entry was trimmed from the stream while still pending
+            return None
+        try:
+            return {"id": msg_id, "payload": serialization.loads(msg_data[b"payload"])}
+        except Exception as e:
+            logger.error(f"Error parsing stream entry {msg_id}: {e}")
+            return {"id": msg_id, "payload": None}
+
+    def consume_stream(
+        self,
+        stream: str,
+        group: str,
+        consumer: str,
+        count: int = 10,
+        block_ms: Optional[int] = None,
+        min_idle_ms: int = 60000,
+    ) -> List[Dict]:
+        """
+        Read a batch of entries from a stream as part of a consumer group
+
+        Entries left pending by a consumer that died (idle for longer than
+        min_idle_ms) are reclaimed first, then new entries are read. Every
+        returned entry must be acknowledged with ack_stream once handled.
+
+        Args:
+            stream: Stream name
+            group: Consumer group name
+            consumer: Name of this consumer within the group
+            count: Maximum number of entries to return
+            block_ms: Milliseconds to block waiting for new entries, None to not block
+            min_idle_ms: Idle time after which another consumer's pending entry is reclaimed
+
+        Returns:
+            List[Dict]: Entries with "id" and "payload" (None if the payload was unreadable)
+        """
+        try:
+            raw_entries = []
+            empty_ids = []
+
+            claimed = self.redis.xautoclaim(
+                stream, group, consumer, min_idle_ms, start_id="0-0", count=count
+            )
+            raw_entries.extend(claimed[1])
+
+            remaining = count - len(raw_entries)
+            if remaining > 0:
+                results = self.redis.xreadgroup(
+                    group, consumer, {stream: ">"}, count=remaining, block=block_ms
+                )
+                for _, messages in results or []:
+                    raw_entries.extend(messages)
+
+            entries = []
+            for msg_id, msg_data in raw_entries:
+                entry = self._decode_entry(msg_id, msg_data)
+                if entry is None:
+                    empty_ids.append(msg_id)
+                else:
+                    entries.append(entry)
+
+            # Nothing left to process for trimmed entries, drop them from the PEL
+            if empty_ids:
+                self.redis.xack(stream, group, *empty_ids)
+
+            return entries
+
+        except redis.exceptions.ResponseError as e:
+            if "NOGROUP" in str(e):
+                self.ensure_consumer_group(stream, group)
+                return []
+            logger.error(f"Error consuming {stream} as {group}/{consumer}: {e}")
+            return []
+        except Exception as e:
+            logger.error(f"Error consuming {stream} as {group}/{consumer}: {e}")
+            return []
+
+    def ack_stream(self, stream: str, group: str, *entry_ids: str) -> int:
+        """
+        Acknowledge handled stream entries for a consumer group
+
+        Args:
+            stream: Stream name
+            group: Consumer group name
+            entry_ids: IDs of the handled entries
+
+        Returns:
+            int: Number of entries acknowledged
+        """
+        if not entry_ids:
+            return 0
+        try:
+            return self.redis.xack(stream, group, *entry_ids)
+        except Exception as e:
+            logger.error(f"Error acknowledging entries on {stream} for {group}: {e}")
+            return 0
+
+    def get_stream_backlog(self, stream: str, group: str) -> Dict:
+        """
+        Get pending (delivered but unacknowledged) entry counts for a consumer group
+
+        Args:
+            stream: Stream name
+            group: Consumer group name
+
+        Returns:
+            Dict: Total pending entries and pending entries per consumer
+        """
+        try:
+            pending = self.redis.xpending(stream, group)
+            return {
+                "pending": pending.get("pending", 0),
+                "consumers": {
+                    (
+                        c["name"].decode()
+                        if isinstance(c["name"], bytes)
+                        else c["name"]
+                    ): c["pending"]
+                    for c in pending.get("consumers", [])
+                },
+            }
+        except Exception as e:
+            logger.error(f"Error reading pending entries on {stream} for {group}: {e}")
+            return {"pending": 0, "consumers": {}}
+
     # ---------- Log Queue Methods ----------
 
     def log_message(
@@ -794,7 +1420,7 @@ class RedisScraperQueue:
 
             for log_json in all_logs:
                 try:
-                    log = json.loads(log_json)
+                    log = serialization.loads(log_json)
 
                     # Apply filters
                     if level and log.get("level") != level:
@@ -830,7 +1456,7 @@ class RedisScraperQueue:
                     break
 
                 # Add to history
-                self.redis.lpush(log_history_key, json.dumps(log_entry))
+                self.redis.lpush(log_history_key, serialization.dumps(log_entry))
 
                 # Trim history to last 1000 logs
                 self.redis.ltrim(log_history_key, 0, 999)
@@ -879,11 +1505,8 @@ class RedisScraperQueue:
             _, job_json, _ = result
 
             # Parse job data
-            if isinstance(job_json, bytes):
-                job_json = job_json.decode("utf-8")
-
             try:
-                job = json.loads(job_json)
+                job = serialization.loads(job_json)
 
                 # Mark as processing
                 job["processing_started"] = time.time()
@@ -892,7 +1515,7 @@ class RedisScraperQueue:
                 self.redis.hset(
                     self.queue_keys[QueueType.SCRAPER]["processing"],
                     job["instagram_handle"],
-                    json.dumps(job),
+                    serialization.dumps(job),
                 )
 
                 # Record for rate limiting
@@ -907,8 +1530,8 @@ class RedisScraperQueue:
                 )
                 return job
 
-            except json.JSONDecodeError:
-                logger.error(f"Failed to parse job JSON from queue: {job_json}")
+            except ValueError:
+                logger.error(f"Failed to parse job from queue: {job_json!r}")
                 return None
 
         except Exception as e:
@@ -940,7 +1563,7 @@ class RedisScraperQueue:
                 self.enqueue_club(instagram_handle, priority=-10)
                 return True
 
-            job = json.loads(job_json)
+            job = serialization.loads(job_json)
             self.redis.hdel(
                 self.queue_keys[QueueType.SCRAPER]["processing"], instagram_handle
             )
@@ -1006,7 +1629,12 @@ class RedisScraperQueue:
                 health_data = SystemHealthMonitor.get_system_health()
 
             # Add to stream with * to auto-generate ID
-            self.redis.xadd(self.health_stream, {"payload": json.dumps(health_data)})
+            self.redis.xadd(
+                self.health_stream,
+                {"payload": serialization.dumps(health_data)},
+                maxlen=STREAM_MAXLEN,
+                approximate=True,
+            )
             logger.debug(f"Published system health metrics to {self.health_stream}")
             return True
 
@@ -1033,7 +1661,7 @@ class RedisScraperQueue:
                 for stream_name, messages in results:
                     for msg_id, msg_data in messages:
                         try:
-                            payload = json.loads(msg_data[b"payload"])
+                            payload = serialization.loads(msg_data[b"payload"])
                             metrics.append({"id": msg_id.decode(), "payload": payload})
                         except Exception as e:
                             logger.error(f"Error parsing health metric: {e}")
@@ -1057,7 +1685,7 @@ class RedisScraperQueue:
 
             if results:
                 msg_id, msg_data = results[0]
-                payload = json.dumps(msg_data[b"payload"])
+                payload = serialization.loads(msg_data[b"payload"])
                 return {"id": msg_id.decode(), "payload": payload}
 
             return {}
@@ -1227,4 +1855,3 @@ class RedisScraperQueue:
 
         except Exception as e:
             logger.error(f"Error checking health alerts: {e}")
-
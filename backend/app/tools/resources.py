@@ -0,0 +1,119 @@
+import os
+import sys
+import json
+import threading
+
+import dotenv
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from tools.logger import logger
+from tools.timing import span
+
+# Read once per process instead of on every parser/worker construction
+dotenv.load_dotenv()
+
+
+class Resources:
+    """
+    Process-wide container of clients that are expensive to build.
+
+    Every client is created on first use, exactly once, under a lock, so
+    worker threads, the event parser, the calendar builder and the API share
+    one Supabase wrapper, one Cloud Storage client (GC_CREDENTIAL is parsed
+    once), one OpenAI client and one Redis connection pool. The underlying
+    clients are thread-safe. Each creation is timed as a "resources.<name>"
+    span.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._instances = {}
+
+    def _get(self, name: str, factory):
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._lock:
+            instance = self._instances.get(name)
+            if instance is None:
+                with span(f"resources.{name}"):
+                    instance = factory()
+                self._instances[name] = instance
+                logger.info(f"Initialized shared {name} client")
+            return instance
+
+    @property
+    def redis(self):
+        import redis
+
+        return self._get(
+            "redis",
+            lambda: redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379")),
+        )
+
+    @property
+    def storage_client(self):
+        def build():
+            from google.cloud import storage
+            from google.oauth2 import service_account
+
+            credentials = service_account.Credentials.from_service_account_info(
+                json.loads(os.getenv("GC_CREDENTIAL"))
+            )
+            return storage.Client(credentials=credentials)
+
+        return self._get("storage_client", build)
+
+    @property
+    def storage_bucket(self):
+        return self._get(
+            "storage_bucket",
+            lambda: self.storage_client.bucket(os.getenv("BUCKET_NAME")),
+        )
+
+    @property
+    def openai(self):
+        def build():
+            from openai import OpenAI
+
+            return OpenAI(api_key=os.getenv("OPENAI"))
+
+        return self._get("openai", build)
+
+    @property
+    def openai_no_retry(self):
+        """OpenAI client without built-in retries, sharing the same connection pool"""
+        return self._get(
+            "openai_no_retry", lambda: self.openai.with_options(max_retries=0)
+        )
+
+    @property
+    def db(self):
+        def build():
+            from db.queries import SupabaseQueries
+
+            return SupabaseQueries()
+
+        return self._get("db", build)
+
+    @property
+    def parse_cache(self):
+        def build():
+            from tools.parse_cache import ParseCache
+
+            return ParseCache(self.redis)
+
+        return self._get("parse_cache", build)
+
+    @property
+    def event_prefilter(self):
+        def build():
+            from tools.event_prefilter import EventPrefilter
+
+            return EventPrefilter(self.parse_cache.metrics)
+
+        return self._get("event_prefilter", build)
+
+
+# Shared by every worker thread, parser, calendar builder and API handler
+resources = Resources()
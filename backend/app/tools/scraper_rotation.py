@@ -6,6 +6,7 @@ import random
 import dotenv
 import threading
 import signal
+import socket
 from typing import List, Dict, Optional, Any, Union
 import schedule
 import json
@@ -13,12 +14,19 @@ import json
 # Import your existing tools
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from tools.logger import logger
-from db.queries import SupabaseQueries
+from tools import serialization
+from tools.metrics import MetricsStore
+from tools.resources import resources
+from tools.timing import span
 from tools.insta_scraper import RateLimitDetected
 from tools.ai_validation import EventParser
 from tools.calendar_connection import CalendarConnection
-from tools.redis_queue import RedisScraperQueue, QueueType, SystemHealthMonitor
-
+from tools.redis_queue import (
+    RedisScraperQueue,
+    QueueType,
+    SystemHealthMonitor,
+    STREAM_MAXLEN,
+)
 
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
 LOG_FILE_PATH = os.path.join(BASE_DIR, "logs", "logfile.log")
@@ -28,14 +36,16 @@ class ScraperRotation:
     def __init__(self):
         """Initialize the scraper rotation manager"""
         dotenv.load_dotenv()
-        self.db = SupabaseQueries()
+        self.db = resources.db
         self.clubs_per_session = 10
         self.cooldown_hours = 24  # Don't scrape same club more than once every 3 days
         self.session_cooldown_hours = 2  # Wait between sessions
         self.max_threads = (
             1  # Start with 1 thread (can be increased based on Heroku dyno)
         )
+        self.max_cookie_attempts = 2  # Cookie accounts to rotate through per job
         self.queue = RedisScraperQueue()
+        self.metrics = MetricsStore(self.queue.redis)
 
         # Control flags
         self.running = False
@@ -49,9 +59,9 @@ class ScraperRotation:
         self.monitor_thread = None
         self.log_processor_thread = None
 
-        # Stream reading positions
-        self.last_notification_id = "0"
-        self.last_status_id = "0"
+        # Stream consumer group; instances share the group and split the entries
+        self.stream_group = "scraper_rotation"
+        self.consumer_name = f"{socket.gethostname()}:{os.getpid()}"
 
         # Status tracking
         self.status = {
@@ -227,11 +237,13 @@ class ScraperRotation:
                     time.sleep(5)
                     continue
 
-                # Check if we're rate limited
+                # Check if we're rate limited. The cooldown is account-wide, so
+                # there is nothing else to scrape; wait on the stop event so
+                # stop() is not held up by the cooldown.
                 if self.rate_limited and time.time() < self.rate_limit_end_time:
                     remaining = int(self.rate_limit_end_time - time.time())
-                    logger.info(f"Rate limited. Sleeping for {remaining} more seconds.")
-                    time.sleep(min(remaining, 60))
+                    logger.info(f"Rate limited. Waiting {remaining} more seconds.")
+                    self.stop_event.wait(min(remaining, 60))
                     continue
                 elif self.rate_limited:
                     # Rate limit period has expired
@@ -274,16 +286,29 @@ class ScraperRotation:
                     continue
 
                 instagram_handle = job.get("instagram_handle")
+                cookie_attempt = job.get("cookie_attempt", 0)
                 self.status["current_job"] = instagram_handle
 
                 # Process the job - MODIFIED SECTION
                 try:
                     logger.info(f"Processing club {instagram_handle}...")
+                    self.metrics.incr("clubs_processed")
+                    self.metrics.add_member("clubs_processed", instagram_handle)
+
+                    # One session per job run; cookie rotation happens by rescheduling
+                    scrape_started = time.time()
+                    outcome = self._scrape_with_session_rotation(
+                        [instagram_handle], cookie_attempt
+                    )
+                    self.metrics.observe(
+                        "scrape_duration", time.time() - scrape_started
+                    )
+                    if outcome == "rate_limited":
+                        self.metrics.incr("rate_limit_hits")
 
-                    # Use the enhanced scrape_sequence that handles cookie rotation
-                    success = self._scrape_with_session_rotation([instagram_handle])
+                    if outcome == "success":
+                        self.metrics.incr("scrape_success")
 
-                    if success:
                         # Update last scraped time in database
                         self.update_club_last_scraped(instagram_handle)
 
@@ -324,20 +349,47 @@ class ScraperRotation:
                         # Random delay to avoid detection
                         delay = random.uniform(2, 5)
                         time.sleep(delay)
+                    elif cookie_attempt < self.max_cookie_attempts - 1:
+                        # Try the next cookie account later instead of sleeping
+                        # here, so the worker can pick up other clubs meanwhile
+                        if outcome == "rate_limited":
+                            delay = random.uniform(30, 60) * (cookie_attempt + 1)
+                        else:
+                            delay = 30
+                        logger.info(
+                            f"Rescheduling {instagram_handle} with next cookie account in {delay:.0f}s"
+                        )
+                        self.queue.reschedule_job(
+                            QueueType.SCRAPER,
+                            instagram_handle,
+                            delay,
+                            updates={
+                                "cookie_attempt": cookie_attempt + 1,
+                                # Cookie rotation is part of the same attempt
+                                "attempts": max(0, job.get("attempts", 1) - 1),
+                            },
+                        )
+                        self.status["current_job"] = None
                     else:
                         # Failed after all attempts including cookie rotation
                         logger.error(
                             f"Failed to scrape {instagram_handle} after all attempts"
                         )
+                        self._record_scrape_failure(
+                            instagram_handle,
+                            f"failed after cookie rotation ({outcome})",
+                        )
                         self.queue.mark_job_failed(
                             QueueType.SCRAPER,
                             instagram_handle,
                             error="Failed after retries with cookie rotation",
+                            updates={"cookie_attempt": 0},
                         )
                         self.status["jobs_failed"] += 1
 
                 except Exception as e:
                     logger.error(f"Error scraping {instagram_handle}: {e}")
+                    self._record_scrape_failure(instagram_handle, str(e))
                     self.queue.mark_job_failed(
                         QueueType.SCRAPER, instagram_handle, error=str(e)
                     )
@@ -378,20 +430,30 @@ class ScraperRotation:
                 try:
                     logger.info(f"Processing events for {instagram_handle}")
 
-                    # Create the event parser and calendar
-                    parser = EventParser()
-                    calendar = CalendarConnection()
+                    # Create the event parser and calendar; both reuse shared clients
+                    with span("worker.event_job_setup"):
+                        parser = EventParser()
+                        calendar = CalendarConnection()
 
                     # Parse posts and create calendar
+                    stage_started = time.time()
                     parser.parse_all_posts(instagram_handle)
+                    self.metrics.observe("parse_duration", time.time() - stage_started)
+
+                    stage_started = time.time()
                     calendar.create_calendar_file(instagram_handle)
+                    self.metrics.observe(
+                        "calendar_duration", time.time() - stage_started
+                    )
 
                     # Mark job as complete
                     self.queue.mark_job_complete(QueueType.EVENT, instagram_handle)
                     self.status["events_processed"] += 1
+                    self.metrics.incr("event_jobs_success")
 
                 except Exception as e:
                     logger.error(f"Error processing events for {instagram_handle}: {e}")
+                    self.metrics.incr("event_jobs_failed")
                     self.queue.mark_job_failed(
                         QueueType.EVENT, instagram_handle, error=str(e)
                     )
@@ -416,6 +478,10 @@ class ScraperRotation:
                 # Run pending scheduled tasks
                 schedule.run_pending()
 
+                # Move delayed jobs (retries, cooldowns) that are now due
+                self.queue.promote_due_jobs(QueueType.SCRAPER)
+                self.queue.promote_due_jobs(QueueType.EVENT)
+
                 # Process stream updates
                 if not self.paused:
                     self.process_streams()
@@ -500,33 +566,49 @@ class ScraperRotation:
     def process_streams(self):
         """Process notification and status streams from Redis"""
         try:
-            # Process notifications (10 at a time)
-            notifications = self.queue.read_notifications(
-                self.last_notification_id, count=10
+            # Process notifications (10 at a time), waiting briefly for new ones
+            notifications = self.queue.consume_stream(
+                self.queue.notification_stream,
+                self.stream_group,
+                self.consumer_name,
+                count=10,
+                block_ms=1000,
             )
 
             for notification in notifications:
-                self.last_notification_id = notification["id"]
-
-                # Process notification based on type
-                payload = notification.get("payload", {})
-                notification_type = payload.get("data", {}).get("type")
-
-                # Handle specific notification types
-                if notification_type == "command" and not self.paused:
-                    command = payload.get("data", {}).get("command")
-                    self.handle_command(command, payload.get("data", {}))
+                try:
+                    # Process notification based on type
+                    payload = notification.get("payload") or {}
+                    notification_type = payload.get("data", {}).get("type")
+
+                    # Handle specific notification types
+                    if notification_type == "command" and not self.paused:
+                        command = payload.get("data", {}).get("command")
+                        self.handle_command(command, payload.get("data", {}))
+                finally:
+                    # Ack even on failure so a bad command is not redelivered forever
+                    self.queue.ack_stream(
+                        self.queue.notification_stream,
+                        self.stream_group,
+                        notification["id"],
+                    )
 
             # Process status updates (10 at a time)
-            status_updates = self.queue.read_status_updates(
-                self.last_status_id, count=10
+            status_updates = self.queue.consume_stream(
+                self.queue.status_stream,
+                self.stream_group,
+                self.consumer_name,
+                count=10,
             )
 
-            for update in status_updates:
-                self.last_status_id = update["id"]
+            # Process status update
+            # (This could be extended with specific status handling)
 
-                # Process status update
-                # (This could be extended with specific status handling)
+            self.queue.ack_stream(
+                self.queue.status_stream,
+                self.stream_group,
+                *[update["id"] for update in status_updates],
+            )
 
         except Exception as e:
             logger.error(f"Error processing streams: {e}")
@@ -631,6 +713,9 @@ class ScraperRotation:
         # Refresh club search vector every 12 hours
         schedule.every(12).hours.do(self.refresh_club_search_vector)
 
+        # Keep Redis streams and job history within their retention limits
+        schedule.every(1).hours.do(self.queue.apply_retention)
+
     def check_recent_rate_limits(self, window_minutes=30) -> int:
         """
         Checks for recent rate limits and returns an intensity level:
@@ -638,37 +723,21 @@ class ScraperRotation:
         - 1 => Mild (1-2 rate limits recently)
         - 2 => Severe (3+ rate limits recently)
         """
-        try:
-            with open(LOG_FILE_PATH, "r") as f:
-                lines = f.readlines()
-
-            now = datetime.datetime.now()
-            count = 0
-            for line in reversed(lines):
-                if (
-                    "Possible rate limit detected" in line
-                    or "RATE LIMIT DETECTED" in line
-                ):
-                    timestamp_str = line.split(" - ")[0]
-                    try:
-                        timestamp = datetime.datetime.fromisoformat(timestamp_str)
-                        if (now - timestamp).total_seconds() <= window_minutes * 60:
-                            count += 1
-                        else:
-                            break  # No need to go further back
-                    except Exception:
-                        continue
-
-            if count >= 3:
-                return 2  # Severe
-            elif count >= 1:
-                return 1  # Mild
-            else:
-                return 0  # No rate limits
-
-        except Exception as e:
-            logger.error(f"Error checking for rate limits: {e}")
-            return 0
+        count = self.metrics.count("rate_limit_hits", window_minutes * 60)
+
+        if count >= 3:
+            return 2  # Severe
+        elif count >= 1:
+            return 1  # Mild
+        else:
+            return 0  # No rate limits
+
+    def _record_scrape_failure(self, instagram_handle: str, error: str):
+        """Count a failed scrape and keep the error for the bots to show"""
+        self.metrics.incr("scrape_failed")
+        self.metrics.record_event(
+            "scrape_errors", {"instagram_handle": instagram_handle, "error": error}
+        )
 
     def get_clubs_to_scrape(self) -> List[str]:
         """
@@ -815,7 +884,12 @@ class ScraperRotation:
                 health_data = SystemHealthMonitor.get_system_health()
 
             # Add to stream with * to auto-generate ID
-            self.redis.xadd(self.health_stream, {"payload": json.dumps(health_data)})
+            self.redis.xadd(
+                self.health_stream,
+                {"payload": serialization.dumps(health_data)},
+                maxlen=STREAM_MAXLEN,
+                approximate=True,
+            )
             logger.debug(f"Published system health metrics to {self.health_stream}")
             return True
 
@@ -842,7 +916,7 @@ class ScraperRotation:
                 for stream_name, messages in results:
                     for msg_id, msg_data in messages:
                         try:
-                            payload = json.loads(msg_data[b"payload"])
+                            payload = serialization.loads(msg_data[b"payload"])
                             metrics.append({"id": msg_id.decode(), "payload": payload})
                         except Exception as e:
                             logger.error(f"Error parsing health metric: {e}")
@@ -866,7 +940,7 @@ class ScraperRotation:
 
             if results:
                 msg_id, msg_data = results[0]
-                payload = json.dumps(msg_data[b"payload"])
+                payload = serialization.loads(msg_data[b"payload"])
                 return {"id": msg_id.decode(), "payload": payload}
 
             return {}
@@ -1037,97 +1111,82 @@ class ScraperRotation:
         except Exception as e:
             logger.error(f"Error checking health alerts: {e}")
 
-    def _scrape_with_session_rotation(self, username_list, max_cookie_attempts=2):
+    def _scrape_with_session_rotation(self, username_list, cookie_attempt=0):
         """
-        Enhanced scraping with cookie rotation - creates fresh session each time
+        Run one scraping session with a fresh driver and the cookie account
+        for this attempt.
+
+        This no longer sleeps and loops over cookie accounts itself. The
+        caller reschedules the job with the next cookie_attempt on the
+        delayed queue, which keeps the worker free in the meantime.
 
         Args:
             username_list: List of usernames to scrape (usually just one)
-            max_cookie_attempts: Number of different cookies to try
+            cookie_attempt: Which cookie account to use for this session
 
         Returns:
-            bool: True if successful, False if failed
+            str: "success", "rate_limited" or "error"
         """
-        for cookie_attempt in range(max_cookie_attempts):
-            scraper = None
-            try:
-                logger.info(
-                    f"Creating new scraper session (cookie attempt {cookie_attempt + 1}/{max_cookie_attempts})"
-                )
-
-                # Create fresh scraper instance
-                from tools.insta_scraper import InstagramScraper
-
-                scraper = InstagramScraper(
-                    os.getenv("INSTAGRAM_USERNAME"), os.getenv("INSTAGRAM_PASSWORD")
-                )
-
-                # Set the cookie index for this attempt
-                scraper.current_cookie_index = cookie_attempt % len(
-                    scraper.cookies_list
-                )
-                logger.info(f"Using cookie account #{scraper.current_cookie_index + 1}")
-
-                # Login with the selected cookie
-                scraper.login()
-                logger.info("Logged into Instagram with fresh session.")
+        scraper = None
+        try:
+            logger.info(
+                f"Creating new scraper session (cookie attempt {cookie_attempt + 1}/{self.max_cookie_attempts})"
+            )
 
-                # Process each username in the list
-                for username in username_list:
-                    logger.info(f"Starting scrape for {username}...")
+            # Create fresh scraper instance
+            from tools.insta_scraper import InstagramScraper
 
-                    # Use the existing scrape_with_retries but with cookie rotation disabled
-                    # since we're handling cookie rotation at the session level
-                    success = self._scrape_single_with_retries(
-                        scraper, username, max_retries=2
-                    )
+            scraper = InstagramScraper(
+                os.getenv("INSTAGRAM_USERNAME"), os.getenv("INSTAGRAM_PASSWORD")
+            )
 
-                    if not success:
-                        raise RateLimitDetected(
-                            f"Failed to scrape {username} - likely rate limited"
-                        )
+            # Set the cookie index for this attempt
+            scraper.current_cookie_index = cookie_attempt % len(scraper.cookies_list)
+            logger.info(f"Using cookie account #{scraper.current_cookie_index + 1}")
 
-                    logger.info(f"Finished scraping {username}.")
+            # Login with the selected cookie
+            scraper.login()
+            logger.info("Logged into Instagram with fresh session.")
 
-                # If we get here, everything succeeded
-                return True
+            # Process each username in the list
+            for username in username_list:
+                logger.info(f"Starting scrape for {username}...")
 
-            except RateLimitDetected as rl:
-                logger.warning(
-                    f"Rate limit detected with cookie #{cookie_attempt + 1}: {rl}"
+                # Spaced retries go through the delayed queue, so only try once here
+                success = self._scrape_single_with_retries(
+                    scraper, username, max_retries=1
                 )
 
-                if cookie_attempt < max_cookie_attempts - 1:
-                    logger.info(f"Will try next cookie account...")
-                    # Add delay before trying next cookie
-                    delay = random.uniform(30, 60) * (
-                        cookie_attempt + 1
-                    )  # Progressive delay
-                    time.sleep(delay)
-                else:
-                    logger.error("Rate limited with all available cookies")
-                    return False
+                if not success:
+                    raise RateLimitDetected(
+                        f"Failed to scrape {username}", detected=False
+                    )
 
-            except Exception as e:
-                logger.error(
-                    f"Session error with cookie #{cookie_attempt + 1}: {str(e)}"
-                )
+                logger.info(f"Finished scraping {username}.")
 
-                if cookie_attempt < max_cookie_attempts - 1:
-                    logger.info("Will try next cookie account...")
-                    time.sleep(30)
-                else:
-                    logger.error("Failed with all available cookies")
-                    return False
+            # If we get here, everything succeeded
+            return "success"
 
-            finally:
-                # Always clean up the session
-                if scraper:
-                    logger.info("Cleaning up scraper session...")
-                    scraper._driver_quit()
-                    scraper = None
+        except RateLimitDetected as rl:
+            if not rl.detected:
+                # Only a real rate-limit page counts towards the worker cooldown
+                logger.error(f"Scrape failed with cookie #{cookie_attempt + 1}: {rl}")
+                return "error"
+            logger.warning(
+                f"Rate limit detected with cookie #{cookie_attempt + 1}: {rl}"
+            )
+            return "rate_limited"
 
-        return False
+        except Exception as e:
+            logger.error(f"Session error with cookie #{cookie_attempt + 1}: {str(e)}")
+            return "error"
+
+        finally:
+            # Always clean up the session
+            if scraper:
+                logger.info("Cleaning up scraper session...")
+                scraper._driver_quit()
+                scraper = None
 
     def _scrape_single_with_retries(self, scraper, username, max_retries=2):
         """
@@ -1140,6 +1199,9 @@ class ScraperRotation:
 
         Returns:
             bool: True if successful, False if failed
+
+        Raises:
+            RateLimitDetected: If the scraper saw a rate-limit page
         """
         for attempt in range(max_retries):
             try:
@@ -1162,7 +1224,7 @@ class ScraperRotation:
                     f"Rate limit detected during attempt {attempt+1} for {username}: {rate_limit_exc}"
                 )
                 # Don't try cookie swapping here - let the session-level handler deal with it
-                return False
+                raise
 
             except Exception as e:
                 logger.error(f"Attempt {attempt+1} failed for {username}: {str(e)}")
@@ -0,0 +1,95 @@
+import os
+import sys
+import hashlib
+from typing import List, Optional, Tuple
+
+import redis
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from tools.logger import logger
+from tools.prometheus import record_cache
+from tools import serialization
+
+SEARCH_CACHE_TTL_SECONDS = int(os.getenv("SEARCH_CACHE_TTL_SECONDS", "300"))
+
+
+class RankedResultCache:
+    """
+    Caches the full ranked id list of a search so later pages are a slice.
+
+    Only ids and scores are stored; the club rows for a page are resolved
+    separately, so a cached ranking stays small and club edits show up on
+    the next page request. Entries are short-lived because rankings change
+    whenever embeddings are refreshed.
+    """
+
+    def __init__(
+        self,
+        redis_client: Optional[redis.Redis] = None,
+        ttl_seconds: int = SEARCH_CACHE_TTL_SECONDS,
+        prefix: str = "search:ranked",
+    ):
+        """
+        Args:
+            redis_client: Redis client to use. Defaults to a client for REDIS_URL.
+            ttl_seconds: Lifetime of a cached ranking
+            prefix: Redis key prefix
+        """
+        self._redis = redis_client
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    @property
+    def redis(self) -> redis.Redis:
+        if self._redis is None:
+            self._redis = redis.from_url(
+                os.getenv("REDIS_URL", "redis://localhost:6379")
+            )
+        return self._redis
+
+    def key(self, name: str, query: str, *params) -> str:
+        """Key for a search; the query is lowercased and whitespace-collapsed"""
+        normalized = " ".join(query.lower().split())
+        raw = "\n".join([normalized, *(str(p) for p in params)])
+        digest = hashlib.sha256(raw.encode("utf-8")).hexdigest()
+        return f"{self.prefix}:{name}:{digest}"
+
+    def get(self, key: str) -> Optional[List[Tuple[str, float]]]:
+        """
+        Cached ranking for a key
+
+        Returns:
+            Optional[List[Tuple[str, float]]]: (id, score) pairs, or None on a miss
+        """
+        try:
+            raw = self.redis.get(key)
+        except Exception as e:
+            logger.error(f"Error reading search cache: {e}")
+            return None
+        record_cache("search_ranking", raw is not None)
+        if raw is None:
+            return None
+        return [tuple(pair) for pair in serialization.loads(raw)]
+
+    def set(self, key: str, ranked: List[Tuple[str, float]]) -> None:
+        """
+        Store a ranking
+
+        Args:
+            key: Key from key()
+            ranked: (id, score) pairs, best first
+        """
+        try:
+            self.redis.set(
+                key,
+                serialization.dumps(
+                    [[i, round(s, 6) if s is not None else None] for i, s in ranked]
+                ),
+                ex=self.ttl_seconds,
+            )
+        except Exception as e:
+            logger.error(f"Error writing search cache: {e}")
+
+
+# Shared by the search endpoints
+ranked_cache = RankedResultCache()
@@ -0,0 +1,117 @@
+"""
+Serializers for payloads stored in Redis (queue jobs, log entries, stream payloads).
+
+JSON payloads are stored untagged so they stay readable by older code. Binary
+formats start with a one-byte format tag, which can never begin a JSON document,
+so loads() can read both the new and the legacy entries.
+"""
+
+import json
+import logging
+import os
+from typing import Any, Dict, Optional, Union
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional, JSON is always available
+    msgpack = None
+
+# Format tags for binary payloads (bump when the encoding changes)
+MSGPACK_V1_TAG = b"\x01"
+
+
+class JsonSerializer:
+    """Plain JSON text, the legacy format"""
+
+    name = "json"
+    tag = None
+
+    def dumps(self, obj: Any) -> str:
+        return json.dumps(obj)
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return json.loads(data)
+
+
+class MsgpackSerializer:
+    """MessagePack with a version tag byte"""
+
+    name = "msgpack"
+    tag = MSGPACK_V1_TAG
+
+    def dumps(self, obj: Any) -> bytes:
+        return self.tag + msgpack.packb(obj, use_bin_type=True)
+
+    def loads(self, data: bytes) -> Any:
+        return msgpack.unpackb(data[len(self.tag) :], raw=False)
+
+
+SERIALIZERS: Dict[str, Any] = {"json": JsonSerializer()}
+if msgpack is not None:
+    SERIALIZERS["msgpack"] = MsgpackSerializer()
+
+# Tagged formats this process can read
+_TAGGED = {s.tag: s for s in SERIALIZERS.values() if s.tag}
+
+
+def get_serializer(name: Optional[str] = None):
+    """
+    Get a serializer by name
+
+    Args:
+        name: "json" or "msgpack". Defaults to the QUEUE_SERIALIZER env var, then JSON.
+
+    Returns:
+        The serializer, falling back to JSON if the requested one is unavailable
+    """
+    name = (name or os.getenv("QUEUE_SERIALIZER", "json")).lower()
+    serializer = SERIALIZERS.get(name)
+    if serializer is None:
+        logging.getLogger(__name__).warning(
+            f"Serializer '{name}' is not available, falling back to JSON"
+        )
+        serializer = SERIALIZERS["json"]
+    return serializer
+
+
+# Serializer used for writing, chosen once per process
+default_serializer = get_serializer()
+
+
+def dumps(obj: Any) -> Union[str, bytes]:
+    """Encode an object with the configured serializer"""
+    return default_serializer.dumps(obj)
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """
+    Decode a payload written by any known serializer
+
+    Args:
+        data: Raw payload from Redis
+
+    Returns:
+        The decoded object
+    """
+    if isinstance(data, bytes) and data[:1] in _TAGGED:
+        return _TAGGED[data[:1]].loads(data)
+    if isinstance(data, bytes) and data[:1] == MSGPACK_V1_TAG:
+        raise ValueError("msgpack payload found but msgpack is not installed")
+    return json.loads(data)
+
+
+def to_text(data: Union[str, bytes]) -> str:
+    """
+    Render a payload as JSON text, for places that search or print raw entries
+
+    Args:
+        data: Raw payload from Redis
+
+    Returns:
+        str: JSON text of the payload
+    """
+    if isinstance(data, bytes) and data[:1] in _TAGGED:
+        return json.dumps(loads(data))
+    if isinstance(data, bytes):
+        return data.decode("utf-8", errors="replace")
+    return data
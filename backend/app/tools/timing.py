@@ -0,0 +1,205 @@
+import os
+import sys
+import time
+import atexit
+import inspect
+import functools
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from tools.logger import logger
+from tools.metrics import MetricsStore
+
+# Redis set holding every span name that has been exported
+SPAN_REGISTRY_KEY = "metrics:spans"
+
+
+class SpanAggregator:
+    """
+    Collects span durations in process and exports them to Redis in batches.
+
+    Recording a span only appends to an in-memory list; a daemon thread flushes
+    the collected durations into MetricsStore histograms every flush_interval
+    seconds, so instrumented code never waits on Redis.
+    """
+
+    def __init__(self, flush_interval: float = 10.0, metrics: MetricsStore = None):
+        """
+        Args:
+            flush_interval: Seconds between exports to Redis
+            metrics: Metrics store to export to. Created on first flush if not given.
+        """
+        self.flush_interval = flush_interval
+        self._metrics = metrics
+        self._durations: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+        self._flusher = None
+        self._pid = None
+        self._listeners = []
+
+    @property
+    def metrics(self) -> MetricsStore:
+        if self._metrics is None:
+            self._metrics = MetricsStore()
+        return self._metrics
+
+    def record(self, name: str, seconds: float) -> None:
+        """Add a span duration; starts the flush thread on first use"""
+        with self._lock:
+            self._durations.setdefault(name, []).append(seconds)
+        for listener in self._listeners:
+            try:
+                listener(name, seconds)
+            except Exception as e:
+                logger.error(f"Error in span listener: {e}")
+        if self._pid != os.getpid():
+            self._start_flusher()
+
+    def add_listener(self, callback) -> None:
+        """
+        Call callback(name, seconds) for every recorded span, in process
+
+        Args:
+            callback: Function to call; must be cheap as it runs inline
+        """
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def _start_flusher(self) -> None:
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._flusher = threading.Thread(
+                target=self._flush_loop, name="span-flusher", daemon=True
+            )
+            self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Export collected durations to Redis
+
+        Returns:
+            int: Number of durations exported
+        """
+        with self._lock:
+            pending, self._durations = self._durations, {}
+        if not pending:
+            return 0
+
+        try:
+            for name, values in pending.items():
+                self.metrics.observe_many(f"span:{name}", values)
+            self.metrics.redis.sadd(SPAN_REGISTRY_KEY, *pending.keys())
+        except Exception as e:
+            logger.error(f"Error exporting span timings: {e}")
+        return sum(len(v) for v in pending.values())
+
+    def summary(self, window_seconds: float = 3600) -> Dict[str, Dict]:
+        """
+        Percentiles per span over the last window_seconds, read from Redis
+
+        Args:
+            window_seconds: Length of the window
+
+        Returns:
+            Dict[str, Dict]: Span name to count, mean, p50, p95 and p99 (seconds)
+        """
+        try:
+            names = sorted(
+                n.decode() if isinstance(n, bytes) else n
+                for n in self.metrics.redis.smembers(SPAN_REGISTRY_KEY)
+            )
+        except Exception as e:
+            logger.error(f"Error reading span registry: {e}")
+            return {}
+
+        spans = {}
+        for name in names:
+            stats = self.metrics.histogram(f"span:{name}", window_seconds)
+            if stats["count"]:
+                stats.pop("bins", None)
+                spans[name] = stats
+        return spans
+
+
+# Process-wide aggregator used by span() and timed()
+aggregator = SpanAggregator()
+atexit.register(aggregator.flush)
+
+
+@contextmanager
+def span(name: str):
+    """
+    Time a block of code
+
+    Usage:
+        with span("calendar.build"):
+            ...
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        aggregator.record(name, time.perf_counter() - started)
+
+
+def timed(name: Optional[str] = None):
+    """
+    Decorator that records a span for every call (sync or async)
+
+    Args:
+        name: Span name. Defaults to the function's qualified name.
+    """
+
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    aggregator.record(span_name, time.perf_counter() - started)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                aggregator.record(span_name, time.perf_counter() - started)
+
+        return wrapper
+
+    return decorator
+
+
+def timed_methods(prefix: str):
+    """
+    Class decorator that times every public method as "{prefix}.{method}"
+
+    Args:
+        prefix: Span name prefix, e.g. "supabase"
+    """
+
+    def decorator(cls):
+        for attr, value in list(vars(cls).items()):
+            if attr.startswith("_") or not inspect.isfunction(value):
+                continue
+            setattr(cls, attr, timed(f"{prefix}.{attr}")(value))
+        return cls
+
+    return decorator
@@ -0,0 +1,424 @@
+import os
+import re
+import sys
+import time
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from tools.logger import logger
+from tools.timing import span
+
+try:
+    import hnswlib
+except ImportError:  # optional, only needed for VECTOR_INDEX_BACKEND=hnsw
+    hnswlib = None
+
+VECTOR_INDEX_BACKEND = os.getenv("VECTOR_INDEX_BACKEND", "exact")
+VECTOR_INDEX_REFRESH_SECONDS = int(os.getenv("VECTOR_INDEX_REFRESH_SECONDS", "300"))
+
+# Fields kept per club so search results can be served without another query
+CLUB_FIELDS = (
+    "id, name, instagram_handle, profile_image_path, description, "
+    "last_embedding_update, categories(name)"
+)
+
+# Postgres' english dictionary drops these from both documents and queries
+_STOPWORDS = frozenset(
+    "a about above after again against all am an and any are as at be because "
+    "been before being below between both but by can did do does doing down "
+    "during each few for from further had has have having he her here hers "
+    "herself him himself his how i if in into is it its itself just me more "
+    "most my myself no nor not now of off on once only or other our ours "
+    "ourselves out over own same she should so some such than that the their "
+    "theirs them themselves then there these they this those through to too "
+    "under until up very was we were what when where which while who whom why "
+    "will with you your yours yourself yourselves".split()
+)
+
+
+def _stem(word: str) -> str:
+    """Crude English stemmer: "clubs"/"club" and "coding"/"code" share a token"""
+    if word.endswith("ies") and len(word) > 4:
+        word = word[:-3] + "y"
+    elif word.endswith("sses"):
+        word = word[:-2]
+    elif word.endswith("s") and not word.endswith(("ss", "us")) and len(word) > 3:
+        word = word[:-1]
+    for suffix in ("ing", "ed", "ly"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[: -len(suffix)]
+            break
+    if word.endswith("e") and len(word) > 3:
+        word = word[:-1]
+    return word
+
+
+def text_tokens(text: str) -> List[str]:
+    """Lowercased, stemmed words without stopwords, like to_tsvector('english')"""
+    return [
+        _stem(word)
+        for word in re.findall(r"\w+", (text or "").lower())
+        if word not in _STOPWORDS
+    ]
+
+
+def text_rank(counts: Dict[str, int], terms: List[str]) -> float:
+    """
+    Approximate ts_rank of a document for plainto_tsquery terms
+
+    Every term must occur (plainto_tsquery ANDs them), otherwise the rank is
+    0. Each term scores like ts_rank with the default weights: 0.1 per
+    occurrence with diminishing returns, normalized so one occurrence of each
+    term ranks about 0.06.
+
+    Args:
+        counts: Token frequencies of the document
+        terms: Distinct query tokens
+
+    Returns:
+        float: Text relevance
+    """
+    if not terms or any(term not in counts for term in terms):
+        return 0.0
+    total = 0.0
+    for term in terms:
+        total += sum(0.1 / k**2 for k in range(1, counts[term] + 1)) / 1.64493406685
+    return total / len(terms)
+
+
+class _Snapshot:
+    """Immutable view of the index; searches use whichever snapshot is current"""
+
+    def __init__(self, clubs: List[Dict], vectors: List[List[float]], backend: str):
+        self.clubs = clubs
+        self.by_id = {club["id"]: club for club in clubs}
+        self.matrix = np.asarray(vectors, dtype=np.float32).reshape(len(clubs), -1)
+        norms = np.linalg.norm(self.matrix, axis=1, keepdims=True)
+        self.matrix /= np.where(norms == 0, 1, norms)
+
+        self.token_counts = [
+            Counter(
+                text_tokens(
+                    " ".join(
+                        filter(
+                            None,
+                            (
+                                c.get("name"),
+                                c.get("instagram_handle"),
+                                c.get("description"),
+                            ),
+                        )
+                    )
+                )
+            )
+            for c in clubs
+        ]
+        categories: Dict[str, List[int]] = {}
+        for row, club in enumerate(clubs):
+            for category in club.get("categories") or []:
+                categories.setdefault(category.get("name"), []).append(row)
+        self.categories = {k: np.asarray(v) for k, v in categories.items()}
+
+        self.hnsw = None
+        if backend == "hnsw" and len(clubs):
+            self.hnsw = hnswlib.Index(space="ip", dim=self.matrix.shape[1])
+            self.hnsw.init_index(max_elements=len(clubs), ef_construction=200, M=16)
+            self.hnsw.add_items(self.matrix, np.arange(len(clubs)))
+
+
+class ClubVectorIndex:
+    """
+    In-memory index of club embeddings for semantic and hybrid search.
+
+    The default backend is an exact search: one matrix-vector product over the
+    normalized embeddings, which takes a few milliseconds for thousands of
+    clubs. VECTOR_INDEX_BACKEND=hnsw switches to an approximate hnswlib index
+    when the package is installed. The index is loaded once and then refreshed
+    with only the clubs whose last_embedding_update moved past the watermark.
+    """
+
+    def __init__(self, supabase_client=None, backend: str = VECTOR_INDEX_BACKEND):
+        """
+        Args:
+            supabase_client: Supabase client. Defaults to db.supabase_client.supabase.
+            backend: "exact" or "hnsw"
+        """
+        if backend == "hnsw" and hnswlib is None:
+            logger.warning("hnswlib is not installed, using exact vector search")
+            backend = "exact"
+        self.backend = backend
+        self._supabase = supabase_client
+        self._clubs: Dict[str, Dict] = {}
+        self._vectors: Dict[str, List[float]] = {}
+        self._watermark: Optional[str] = None
+        self._snapshot: Optional[_Snapshot] = None
+        self._lock = threading.Lock()
+        self._refresher = None
+
+    @property
+    def supabase(self):
+        if self._supabase is None:
+            from db.supabase_client import supabase
+
+            self._supabase = supabase
+        return self._supabase
+
+    @property
+    def ready(self) -> bool:
+        return self._snapshot is not None
+
+    def __len__(self) -> int:
+        return len(self._snapshot.clubs) if self._snapshot else 0
+
+    # ---------- Loading ----------
+
+    def _fetch(self, since: Optional[str] = None, page_size: int = 500) -> List[Dict]:
+        """Clubs with an embedding, optionally only those updated after since"""
+        rows, offset = [], 0
+        while True:
+            query = (
+                self.supabase.table("clubs")
+                .select(f"{CLUB_FIELDS}, embedding")
+                .not_.is_("embedding", "null")
+            )
+            if since:
+                # gte: clubs written in the same instant as the watermark row
+                # may not have been visible yet when it was read
+                query = query.gte("last_embedding_update", since)
+            page = (
+                query.order("id").range(offset, offset + page_size - 1).execute().data
+                or []
+            )
+            rows.extend(page)
+            if len(page) < page_size:
+                return rows
+            offset += page_size
+
+    @staticmethod
+    def _parse_vector(value) -> Optional[List[float]]:
+        # PostgREST returns pgvector columns as "[0.1,0.2,...]" strings
+        if isinstance(value, str):
+            return [float(x) for x in value.strip("[]").split(",") if x]
+        return value
+
+    def _merge(self, rows: List[Dict]) -> None:
+        for row in rows:
+            vector = self._parse_vector(row.pop("embedding", None))
+            if not vector:
+                continue
+            self._clubs[row["id"]] = row
+            self._vectors[row["id"]] = vector
+            updated = row.get("last_embedding_update")
+            if updated and (self._watermark is None or updated > self._watermark):
+                self._watermark = updated
+
+    def _rebuild(self) -> None:
+        ids = list(self._clubs)
+        self._snapshot = _Snapshot(
+            [self._clubs[i] for i in ids],
+            [self._vectors[i] for i in ids],
+            self.backend,
+        )
+
+    def load(self) -> int:
+        """
+        Load every club embedding, replacing the current contents
+
+        Returns:
+            int: Number of clubs indexed
+        """
+        with span("vector_index.load"), self._lock:
+            rows = self._fetch()
+            self._clubs, self._vectors, self._watermark = {}, {}, None
+            self._merge(rows)
+            self._rebuild()
+        logger.info(f"Loaded {len(self)} club embeddings into the vector index")
+        return len(self)
+
+    def refresh(self) -> int:
+        """
+        Pull clubs whose embedding changed since the last load or refresh
+
+        Returns:
+            int: Number of clubs updated
+        """
+        if not self.ready:
+            return self.load()
+        with span("vector_index.refresh"), self._lock:
+            # Rows at the watermark come back every time; keep only real changes
+            rows = [
+                row
+                for row in {
+                    row["id"]: row for row in self._fetch(since=self._watermark)
+                }.values()
+                if row["id"] not in self._clubs
+                or self._clubs[row["id"]].get("last_embedding_update")
+                != row.get("last_embedding_update")
+            ]
+            if rows:
+                self._merge(rows)
+                self._rebuild()
+        if rows:
+            logger.info(f"Refreshed {len(rows)} club embeddings in the vector index")
+        return len(rows)
+
+    def start_background_refresh(
+        self, interval: float = VECTOR_INDEX_REFRESH_SECONDS
+    ) -> None:
+        """Load the index and keep refreshing it on a daemon thread"""
+        if self._refresher is not None:
+            return
+
+        def loop():
+            refreshes = 0
+            while True:
+                try:
+                    # Incremental refreshes miss deleted clubs and category edits,
+                    # so reload everything about once an hour
+                    if refreshes and refreshes % max(1, 3600 // interval) == 0:
+                        self.load()
+                    else:
+                        self.refresh()
+                except Exception as e:
+                    logger.error(f"Error refreshing vector index: {e}")
+                refreshes += 1
+                time.sleep(interval)
+
+        self._refresher = threading.Thread(
+            target=loop, name="vector-index-refresh", daemon=True
+        )
+        self._refresher.start()
+
+    # ---------- Search ----------
+
+    def get_clubs(self, club_ids: List[str]) -> Optional[List[Dict]]:
+        """
+        Club rows for a page of ids, in order
+
+        Returns:
+            Optional[List[Dict]]: Copies of the rows, or None if any id is not indexed
+        """
+        snapshot = self._snapshot
+        if snapshot is None or any(i not in snapshot.by_id for i in club_ids):
+            return None
+        return [dict(snapshot.by_id[i]) for i in club_ids]
+
+    def _candidate_rows(self, snapshot: _Snapshot, category: Optional[str]):
+        if category is None:
+            return np.arange(len(snapshot.clubs))
+        return snapshot.categories.get(category, np.arange(0))
+
+    def search(
+        self,
+        query_embedding: List[float],
+        k: int = 20,
+        category: Optional[str] = None,
+        min_score: float = 0.0,
+    ) -> List[Tuple[Dict, float]]:
+        """
+        Top-k clubs by cosine similarity
+
+        Args:
+            query_embedding: Query vector
+            k: Number of results
+            category: Only consider clubs in this category
+            min_score: Drop results below this similarity
+
+        Returns:
+            List[Tuple[Dict, float]]: (club, similarity), best first
+        """
+        snapshot = self._snapshot
+        if snapshot is None or not len(snapshot.clubs):
+            return []
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1
+        rows = self._candidate_rows(snapshot, category)
+        if not len(rows):
+            return []
+
+        if snapshot.hnsw is not None:
+            allowed = None if category is None else set(rows.tolist())
+            snapshot.hnsw.set_ef(max(50, 2 * k))
+            labels, distances = snapshot.hnsw.knn_query(
+                query,
+                k=min(k, len(rows)),
+                filter=None if allowed is None else allowed.__contains__,
+            )
+            results = [
+                (snapshot.clubs[label], 1.0 - float(distance))
+                for label, distance in zip(labels[0], distances[0])
+            ]
+            return [(club, score) for club, score in results if score >= min_score]
+
+        scores = snapshot.matrix[rows] @ query
+        if k < len(rows):
+            top = np.argpartition(-scores, k)[:k]
+            top = top[np.argsort(-scores[top])]
+        else:
+            top = np.argsort(-scores)
+        return [
+            (snapshot.clubs[rows[i]], float(scores[i]))
+            for i in top
+            if scores[i] >= min_score
+        ]
+
+    def hybrid_search(
+        self,
+        query_text: str,
+        query_embedding: List[float],
+        category: Optional[str] = None,
+        semantic_weight: float = 0.5,
+        match_threshold: float = 0.5,
+    ) -> List[Tuple[Dict, float]]:
+        """
+        Rank clubs by a weighted mix of semantic and text relevance
+
+        Mirrors the hybrid_search RPC: a club matches when its cosine similarity
+        reaches match_threshold or all query terms appear as whole (stemmed)
+        words in its name, handle and description. Text relevance approximates
+        ts_rank, see text_rank.
+
+        Args:
+            query_text: Raw search query
+            query_embedding: Embedding of the query
+            category: Only consider clubs in this category
+            semantic_weight: Weight of the semantic score (0-1)
+            match_threshold: Minimum cosine similarity for a semantic match
+
+        Returns:
+            List[Tuple[Dict, float]]: (club, combined score), best first
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return []
+
+        rows = self._candidate_rows(snapshot, category)
+        if not len(rows):
+            return []
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1
+        semantic = snapshot.matrix[rows] @ query
+
+        terms = list(dict.fromkeys(text_tokens(query_text)))
+        if terms:
+            text = np.asarray(
+                [text_rank(snapshot.token_counts[row], terms) for row in rows.tolist()],
+                dtype=np.float32,
+            )
+        else:
+            text = np.zeros(len(rows), dtype=np.float32)
+
+        combined = semantic_weight * semantic + (1 - semantic_weight) * text
+        matched = np.flatnonzero((semantic >= match_threshold) | (text > 0))
+        order = matched[np.argsort(-combined[matched], kind="stable")]
+        return [(snapshot.clubs[rows[i]], float(combined[i])) for i in order]
+
+
+# Process-wide index used by the API server
+club_index = ClubVectorIndex()